@@ -0,0 +1,41 @@
+import importlib
+
+
+def lazy_attributes(package: str, attributes: dict) -> tuple:
+    """Build module-level `__getattr__` and `__dir__` importing on access.
+
+    Heavy dependencies (geopandas, rasterio, h3ronpy, psycopg2...) are only
+    imported when one of the attributes is first used, not when the package
+    is imported.
+
+    Args:
+        package (str): Name of the package, i.e. its `__name__`.
+        attributes (dict): Public attribute name mapped to the relative
+                           module defining it, e.g. {'DBClient': '.db_client'}.
+
+    Returns:
+        tuple: (__getattr__, __dir__, __all__) for the package namespace.
+
+    Example:
+        >>> __getattr__, __dir__, __all__ = lazy_attributes(
+                __name__, {'nearest_line_join': '.nearest'}
+            )
+    """
+
+    def __getattr__(name: str):
+        module_name = attributes.get(name)
+        if module_name is None:
+            raise AttributeError(
+                f"module {package!r} has no attribute {name!r}"
+            )
+        module = importlib.import_module(module_name, package)
+        value = getattr(module, name)
+        # Cache it in the package, so later lookups skip __getattr__
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__() -> list:
+        namespace = vars(importlib.import_module(package))
+        return sorted(set(namespace) | set(attributes))
+
+    return __getattr__, __dir__, sorted(attributes)
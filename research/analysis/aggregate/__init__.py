@@ -0,0 +1,13 @@
+from ..._lazy import lazy_attributes
+
+__getattr__, __dir__, __all__ = lazy_attributes(
+    __name__,
+    {
+        "aggregate_cells": ".h3",
+        "aggregate_points": ".h3",
+        "aggregate_raster_h3": ".h3",
+        "build_rollups": ".h3",
+        "compact_uniform": ".h3",
+        "rollup": ".h3",
+    },
+)
@@ -0,0 +1,274 @@
+import h3.api.basic_int as h3_int
+import numpy as np
+import pandas as pd
+
+from ..transform.h3 import (
+    H3_NULL,
+    cells_resolution,
+    cells_to_parent,
+    points_to_h3,
+)
+
+ACCEPTED_STATS = ["count", "sum", "mean", "min", "max"]
+
+ROLLUP_STATS = ["count", "sum", "min", "max"]
+
+H3_CHILDREN = 7
+
+H3_PENTAGON_CHILDREN = 6
+
+
+def _group_sorted(cells: np.ndarray) -> tuple:
+    order = np.argsort(cells, kind="stable")
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(
+        np.r_[True, sorted_cells[1:] != sorted_cells[:-1]]
+    )
+    return order, starts, sorted_cells[starts]
+
+
+def aggregate_cells(
+    cells: np.ndarray,
+    values: np.ndarray = None,
+    stats: list = None,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    """Function to aggregate values per H3 cell with NumPy.
+
+    Rows are sorted once by their uint64 cell and each statistic is a
+    single `reduceat` over the sorted values. Null (0) cells and NaN values
+    are dropped.
+
+    Args:
+        cells (np.ndarray): H3 indexes in uint64 format.
+        values (np.ndarray, optional): Values to aggregate. If None, only
+                                       counts are computed. Defaults to None.
+        stats (list, optional): Statistics among ACCEPTED_STATS.
+                                Defaults to all of them (or just 'count'
+                                if there are no values).
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: One row per cell, sorted by cell, with the H3 column
+                      and one column per statistic.
+    """
+    cells = np.asarray(cells, dtype=np.uint64)
+    if stats is None:
+        stats = ACCEPTED_STATS if values is not None else ["count"]
+    stats = list(stats)
+    invalid = set(stats) - set(ACCEPTED_STATS)
+    if invalid:
+        raise ValueError(
+            f"Invalid stats {invalid}. Must be among {ACCEPTED_STATS}"
+        )
+    if values is None and set(stats) != {"count"}:
+        raise ValueError("Only 'count' can be computed without values")
+
+    valid = cells != H3_NULL
+    if values is not None:
+        values = np.asarray(values, dtype=np.float64)
+        valid &= ~np.isnan(values)
+        values = values[valid]
+    cells = cells[valid]
+
+    if len(cells) == 0:
+        return pd.DataFrame(
+            {h3_col_name: np.array([], dtype=np.uint64),
+             **{stat: np.array([], dtype=np.float64) for stat in stats}}
+        )
+
+    order, starts, keys = _group_sorted(cells)
+    count = np.diff(np.r_[starts, len(cells)])
+    result = {h3_col_name: keys}
+    if values is not None:
+        sorted_values = values[order]
+        total = np.add.reduceat(sorted_values, starts)
+    for stat in stats:
+        if stat == "count":
+            result[stat] = count
+        elif stat == "sum":
+            result[stat] = total
+        elif stat == "mean":
+            result[stat] = total / count
+        elif stat == "min":
+            result[stat] = np.minimum.reduceat(sorted_values, starts)
+        elif stat == "max":
+            result[stat] = np.maximum.reduceat(sorted_values, starts)
+    return pd.DataFrame(result)
+
+
+def aggregate_points(
+    points,
+    resolution: int,
+    values: np.ndarray = None,
+    stats: list = None,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    """Function to bin points (e.g. accidents) into H3 cells.
+
+    Args:
+        points (gpd.GeoSeries, np.ndarray): Points in EPSG:4326, see
+                                            `points_to_h3`.
+        resolution (int): H3 resolution.
+        values (np.ndarray, optional): Values per point. If None, points are
+                                       counted. Defaults to None.
+        stats (list, optional): Statistics among ACCEPTED_STATS.
+                                Defaults to None.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: Statistics per cell.
+    """
+    cells = np.asarray(points_to_h3(points, resolution))
+    return aggregate_cells(
+        cells, values=values, stats=stats, h3_col_name=h3_col_name
+    )
+
+
+def aggregate_raster_h3(
+    h3_df: pd.DataFrame,
+    value_col: str = "value",
+    stats: list = None,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    """Function to aggregate raster values already converted to H3 cells,
+    e.g. the output of `raster_band_to_pandas_h3` or its tiled variant.
+
+    Args:
+        h3_df (pd.DataFrame): Dataframe with uint64 H3 indexes and values.
+        value_col (str, optional): Value column. Defaults to "value".
+        stats (list, optional): Statistics among ACCEPTED_STATS.
+                                Defaults to None.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: Statistics per cell.
+    """
+    return aggregate_cells(
+        h3_df[h3_col_name].values,
+        values=h3_df[value_col].values,
+        stats=stats,
+        h3_col_name=h3_col_name,
+    )
+
+
+def rollup(
+    agg_df: pd.DataFrame, resolution: int, h3_col_name: str = "h3"
+) -> pd.DataFrame:
+    """Function to aggregate cell statistics to a coarser resolution.
+
+    Parents are combined from the child statistics, without going back to
+    the input data: counts and sums are added, minimums and maximums
+    reduced, and means recomputed from sums and counts.
+
+    Args:
+        agg_df (pd.DataFrame): Output of `aggregate_cells` (or a previous
+                               rollup) with some of 'count', 'sum', 'min'
+                               and 'max'.
+        resolution (int): Target (coarser) H3 resolution.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: Statistics per parent cell.
+    """
+    parents = cells_to_parent(agg_df[h3_col_name].values, resolution)
+    if len(parents) == 0:
+        return agg_df.iloc[:0].copy()
+    order, starts, keys = _group_sorted(parents)
+    result = {h3_col_name: keys}
+    for stat in ROLLUP_STATS:
+        if stat not in agg_df:
+            continue
+        ufunc = {"min": np.minimum, "max": np.maximum}.get(stat, np.add)
+        result[stat] = ufunc.reduceat(agg_df[stat].values[order], starts)
+    if "mean" in agg_df:
+        if "sum" not in result or "count" not in result:
+            raise ValueError("Rolling up 'mean' requires 'sum' and 'count'")
+        result["mean"] = result["sum"] / result["count"]
+    return pd.DataFrame(result)[list(agg_df.columns)]
+
+
+def build_rollups(
+    agg_df: pd.DataFrame, resolutions: list, h3_col_name: str = "h3"
+) -> dict:
+    """Function to build a pyramid of coarser resolutions.
+
+    Each level is rolled up from the next finer one, so the cost of every
+    level is proportional to the number of cells, not of input rows.
+
+    Args:
+        agg_df (pd.DataFrame): Statistics at the finest resolution.
+        resolutions (list): Coarser H3 resolutions to build.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        dict: Statistics per resolution, including the input one. Empty
+              if there are no cells.
+    """
+    if agg_df.empty:
+        return {}
+    finest = int(cells_resolution(agg_df[h3_col_name].values[:1])[0])
+    levels = {finest: agg_df}
+    current = agg_df
+    for resolution in sorted(set(resolutions), reverse=True):
+        if resolution >= finest:
+            continue
+        current = rollup(current, resolution, h3_col_name=h3_col_name)
+        levels[resolution] = current
+    return levels
+
+
+def compact_uniform(
+    df: pd.DataFrame,
+    value_col: str,
+    h3_col_name: str = "h3",
+    min_resolution: int = 0,
+) -> pd.DataFrame:
+    """Function to replace complete, uniform groups of children by their
+    parent cell, recursively.
+
+    A parent replaces its children when all of them are present and share
+    the same `value_col` value. The result mixes resolutions, like H3
+    compaction.
+
+    Args:
+        df (pd.DataFrame): Cells of a single resolution with a value column.
+        value_col (str): Column that must be uniform to compact.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+        min_resolution (int, optional): Coarsest resolution to compact to.
+                                        Defaults to 0.
+
+    Returns:
+        pd.DataFrame: Compacted cells with the H3 and value columns.
+    """
+    current = df[[h3_col_name, value_col]]
+    if current.empty:
+        return current.copy()
+    resolution = int(cells_resolution(current[h3_col_name].values[:1])[0])
+    parts = []
+    while resolution > min_resolution and not current.empty:
+        resolution -= 1
+        parents = cells_to_parent(current[h3_col_name].values, resolution)
+        values = current[value_col].values
+        order, starts, keys = _group_sorted(parents)
+        sorted_values = values[order]
+        count = np.diff(np.r_[starts, len(parents)])
+        uniform = (
+            np.minimum.reduceat(sorted_values, starts)
+            == np.maximum.reduceat(sorted_values, starts)
+        )
+        complete = count == H3_CHILDREN
+        maybe_pentagon = np.flatnonzero(count == H3_PENTAGON_CHILDREN)
+        complete[maybe_pentagon] = [
+            h3_int.is_pentagon(int(cell)) for cell in keys[maybe_pentagon]
+        ]
+        compactable = complete & uniform
+
+        kept = ~np.isin(parents, keys[compactable])
+        parts.append(current[kept])
+        current = pd.DataFrame({
+            h3_col_name: keys[compactable],
+            value_col: sorted_values[starts[compactable]],
+        })
+    parts.append(current)
+    return pd.concat(parts, ignore_index=True)
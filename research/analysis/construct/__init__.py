@@ -0,0 +1,11 @@
+from ..._lazy import lazy_attributes
+
+__getattr__, __dir__, __all__ = lazy_attributes(
+    __name__,
+    {
+        "fill_cells": ".h3",
+        "getis_ord_g_star": ".h3",
+        "h3_weights": ".h3",
+        "local_moran": ".h3",
+    },
+)
@@ -0,0 +1,254 @@
+import h3ronpy
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from scipy import sparse
+from scipy.stats import norm
+
+from ...utils.instrumentation import instrument
+
+ACCEPTED_TRANSFORMS = ["b", "r"]
+
+# Local Moran quadrants, as in esda.Moran_Local.q
+HH, LH, LL, HL = 1, 2, 3, 4
+
+
+def _unique_cells(cells: np.ndarray) -> np.ndarray:
+    cells = np.asarray(cells, dtype=np.uint64)
+    if len(np.unique(cells)) != len(cells):
+        raise ValueError("Cells must be unique, aggregate them first")
+    return cells
+
+
+@instrument("construct_fill_cells")
+def fill_cells(
+    cells: np.ndarray,
+    values: np.ndarray,
+    area_cells: np.ndarray = None,
+    k: int = 1,
+    fill_value: float = 0,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    """Function to add the empty cells of the study area to cell values.
+
+    Aggregations such as `aggregate_points` only return non-empty cells.
+    Running Gi* or local Moran on them alone drops every zero from the
+    mean and variance and from the neighbourhoods, which biases the
+    statistics. The missing cells are added with `fill_value`: every cell
+    of `area_cells` if given (e.g. the cells covering the city), and
+    otherwise every cell within `k` of a non-empty one.
+
+    Args:
+        cells (np.ndarray): Unique H3 indexes in uint64 format.
+        values (np.ndarray): Value per cell, e.g. accident counts.
+        area_cells (np.ndarray, optional): H3 indexes of the study area,
+                                           at the same resolution.
+                                           Defaults to None (k-rings).
+        k (int, optional): Grid distance of the added cells when there is
+                           no `area_cells`. Defaults to 1.
+        fill_value (float, optional): Value of the added cells.
+                                      Defaults to 0.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: One row per cell, sorted by cell, with the H3 column
+                      and 'value'.
+    """
+    cells = _unique_cells(cells)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) != len(cells):
+        raise ValueError("Values need one value per cell")
+    if area_cells is None:
+        area_cells = pa.array(
+            h3ronpy.grid_disk(cells, k, flatten=True)
+        ).to_numpy()
+    all_cells = np.union1d(np.asarray(area_cells, dtype=np.uint64), cells)
+    filled = np.full(len(all_cells), fill_value, dtype=np.float64)
+    filled[np.searchsorted(all_cells, cells)] = values
+    return pd.DataFrame({h3_col_name: all_cells, "value": filled})
+
+
+@instrument("construct_h3_weights", count_rows=False)
+def h3_weights(
+    cells: np.ndarray,
+    k: int = 1,
+    include_self: bool = False,
+    transform: str = "b",
+) -> sparse.csr_matrix:
+    """Function to build k-ring spatial weights between H3 cells.
+
+    Neighbours come from `h3ronpy.grid_disk` on the uint64 cells, so no
+    geometry is built. The k-rings are returned as one Arrow list array,
+    and its offsets and flat values give the rows and columns of the
+    matrix directly. Neighbours missing from `cells` are dropped, so pass
+    every cell of the study area (with zero counts where needed, see
+    `fill_cells`), not only the non-empty ones.
+
+    Args:
+        cells (np.ndarray): Unique H3 indexes in uint64 format, all at the
+                            same resolution. Row i of the matrix is cell i.
+        k (int, optional): Grid distance of the neighbours. Defaults to 1.
+        include_self (bool, optional): Each cell is its own neighbour, as
+                                       in Gi*. Defaults to False.
+        transform (str, optional): 'b' for binary weights or 'r' for row
+                                   standardized ones. Defaults to "b".
+
+    Returns:
+        sparse.csr_matrix: (n, n) float64 weights matrix.
+    """
+    if transform not in ACCEPTED_TRANSFORMS:
+        raise ValueError(
+            f"Invalid transform. Must be one of {ACCEPTED_TRANSFORMS}"
+        )
+    cells = _unique_cells(cells)
+    n = len(cells)
+    if n == 0:
+        return sparse.csr_matrix((0, 0))
+
+    disks = pa.array(h3ronpy.grid_disk(cells, k, flatten=False))
+    offsets = disks.offsets.to_numpy()
+    neighbours = disks.values.to_numpy()
+    rows = np.repeat(np.arange(n), np.diff(offsets))
+
+    order = np.argsort(cells)
+    positions = np.searchsorted(cells, neighbours, sorter=order)
+    positions[positions == n] = 0
+    cols = order[positions]
+    keep = cells[cols] == neighbours
+    if not include_self:
+        keep &= cols != rows
+    rows, cols = rows[keep], cols[keep]
+
+    data = np.ones(len(rows))
+    if transform == "r":
+        cardinalities = np.bincount(rows, minlength=n)
+        data /= cardinalities[rows]
+    weights = sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+    weights.sort_indices()
+    return weights
+
+
+@instrument("construct_getis_ord_g_star")
+def getis_ord_g_star(
+    cells: np.ndarray,
+    values: np.ndarray,
+    k: int = 1,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    """Function to compute Getis-Ord Gi* hotspots on H3 cells.
+
+    Uses binary k-ring weights including each cell, and the analytical
+    z-scores of Getis & Ord (1995), so the cost is a single sparse
+    matrix-vector product.
+
+    Args:
+        cells (np.ndarray): Unique H3 indexes in uint64 format.
+        values (np.ndarray): Value per cell, e.g. accident counts.
+        k (int, optional): Grid distance of the neighbours. Defaults to 1.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: One row per cell with the value, the Gi* z-score
+                      ('z', positive for hotspots) and its two-sided
+                      p-value ('p').
+
+    Example:
+        >>> counts_df = aggregate_points(accidents_gdf.geometry, 9)
+        >>> cells_df = fill_cells(counts_df.h3, counts_df['count'], k=2)
+        >>> hotspots_df = getis_ord_g_star(cells_df.h3, cells_df.value)
+    """
+    cells = _unique_cells(cells)
+    values = np.asarray(values, dtype=np.float64)
+    weights = h3_weights(cells, k=k, include_self=True)
+    n = len(values)
+
+    mean = values.mean()
+    std = np.sqrt((values**2).mean() - mean**2)
+    weights_sum = np.asarray(weights.sum(axis=1)).ravel()
+    # Binary weights, so the sum of squared weights is the same
+    denominator = std * np.sqrt(
+        (n * weights_sum - weights_sum**2) / (n - 1)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (weights @ values - mean * weights_sum) / denominator
+    return pd.DataFrame(
+        {
+            h3_col_name: cells,
+            "value": values,
+            "z": z,
+            "p": 2 * norm.sf(np.abs(z)),
+        }
+    )
+
+
+@instrument("construct_local_moran")
+def local_moran(
+    cells: np.ndarray,
+    values: np.ndarray,
+    k: int = 1,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    """Function to compute local Moran's I clusters on H3 cells.
+
+    Uses row standardized k-ring weights and the analytical moments of
+    Anselin (1995) under randomization instead of conditional permutations,
+    which keeps it linear in the number of cells.
+
+    Args:
+        cells (np.ndarray): Unique H3 indexes in uint64 format.
+        values (np.ndarray): Value per cell, e.g. accident counts.
+        k (int, optional): Grid distance of the neighbours. Defaults to 1.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: One row per cell with the value, the local I ('I'),
+                      its z-score ('z'), two-sided p-value ('p') and
+                      Moran scatterplot quadrant ('q', 1 HH, 2 LH, 3 LL,
+                      4 HL).
+
+    Example:
+        >>> cells_df = fill_cells(
+                counts_df.h3, counts_df['count'], area_cells=madrid_cells
+            )
+        >>> clusters_df = local_moran(cells_df.h3, cells_df.value)
+    """
+    cells = _unique_cells(cells)
+    values = np.asarray(values, dtype=np.float64)
+    weights = h3_weights(cells, k=k, transform="r")
+    n = len(values)
+
+    deviations = values - values.mean()
+    m2 = (deviations**2).mean()
+    lag = weights @ deviations
+    with np.errstate(divide="ignore", invalid="ignore"):
+        local_i = deviations / m2 * lag
+
+        b2 = (deviations**4).mean() / m2**2
+        weights_sum = np.asarray(weights.sum(axis=1)).ravel()
+        squares_sum = np.asarray(weights.power(2).sum(axis=1)).ravel()
+        expected = -weights_sum / (n - 1)
+        variance = (
+            squares_sum * (n - b2) / (n - 1)
+            + (weights_sum**2 - squares_sum)
+            * (2 * b2 - n)
+            / ((n - 1) * (n - 2))
+            - expected**2
+        )
+        z = (local_i - expected) / np.sqrt(variance)
+
+    high, high_lag = deviations > 0, lag > 0
+    quadrant = np.select(
+        [high & high_lag, ~high & high_lag, ~high & ~high_lag],
+        [HH, LH, LL],
+        default=HL,
+    )
+    return pd.DataFrame(
+        {
+            h3_col_name: cells,
+            "value": values,
+            "I": local_i,
+            "z": z,
+            "p": 2 * norm.sf(np.abs(z)),
+            "q": quadrant,
+        }
+    )
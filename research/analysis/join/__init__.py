@@ -0,0 +1,8 @@
+from ..._lazy import lazy_attributes
+
+__getattr__, __dir__, __all__ = lazy_attributes(
+    __name__,
+    {
+        "nearest_line_join": ".nearest",
+    },
+)
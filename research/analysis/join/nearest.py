@@ -0,0 +1,179 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# ETRS89 / UTM zone 30N, metric CRS covering Madrid
+DEFAULT_METRIC_CRS = "EPSG:25830"
+
+DEFAULT_CHUNKSIZE = 100_000
+
+DEFAULT_DISTANCE_COL_NAME = "distancia"
+
+# Bike lane attributes returned for each accident, as in the PostGIS query
+DEFAULT_LINE_COLUMNS = {
+    "TIPO_VIA": "tipo_via_cercana",
+    "ID_VIA": "id_via",
+    "id_segmento": "id_carril",
+}
+
+# Notebook threshold: accidents farther than this are not on a bike lane
+DEFAULT_DISTANCE_THRESHOLD = 25
+
+# Values set past the threshold, as in the notebook
+DEFAULT_BEYOND_THRESHOLD = {"tipo_via_cercana": "Ninguna", "id_carril": np.nan}
+
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+_worker_tree = None
+
+
+def _init_worker(lines_wkb: np.ndarray):
+    global _worker_tree
+    _worker_tree = shapely.STRtree(shapely.from_wkb(lines_wkb))
+
+
+def _query_nearest(
+    tree: shapely.STRtree, points: np.ndarray, max_distance: float = None
+) -> tuple:
+    (point_idx, line_idx), distances = tree.query_nearest(
+        points,
+        max_distance=max_distance,
+        return_distance=True,
+        all_matches=False,
+    )
+    return point_idx, line_idx, distances
+
+
+def _worker_query_nearest(
+    points_wkb: np.ndarray, max_distance: float = None
+) -> tuple:
+    return _query_nearest(
+        _worker_tree, shapely.from_wkb(points_wkb), max_distance
+    )
+
+
+def nearest_line_join(
+    points_gdf: gpd.GeoDataFrame,
+    lines_gdf: gpd.GeoDataFrame,
+    max_distance: float = None,
+    threshold: float = DEFAULT_DISTANCE_THRESHOLD,
+    beyond_threshold: dict = None,
+    line_columns: dict = None,
+    distance_col_name: str = DEFAULT_DISTANCE_COL_NAME,
+    metric_crs: str = DEFAULT_METRIC_CRS,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    n_workers: int = None,
+) -> gpd.GeoDataFrame:
+    """Function to assign each point to its nearest line.
+
+    In-process equivalent of a PostGIS `JOIN LATERAL (... ORDER BY
+    a.geometry <-> b.geometry LIMIT 1)` query, built on a shapely STRtree.
+    Both layers are projected to `metric_crs` so distances are in metres.
+    Points are queried in chunks, optionally spread over a process pool
+    that builds the tree once per worker.
+
+    As in the notebook, points farther than `threshold` metres from their
+    nearest line keep the distance and the line attributes, except those
+    in `beyond_threshold` (by default 'tipo_via_cercana' becomes 'Ninguna'
+    and 'id_carril' NaN).
+
+    Args:
+        points_gdf (gpd.GeoDataFrame): Points to assign (e.g. accidents).
+        lines_gdf (gpd.GeoDataFrame): Candidate lines (e.g. bike lanes).
+        max_distance (float, optional): Search radius in metres. Points with
+                                        no line within it get null
+                                        attributes and distance.
+                                        Defaults to None (no limit).
+        threshold (float, optional): Distance in metres past which the
+                                     `beyond_threshold` values are set. If
+                                     None, none are set.
+                                     Defaults to DEFAULT_DISTANCE_THRESHOLD.
+        beyond_threshold (dict, optional): Output column mapped to the value
+                                           set past the threshold.
+                                           Defaults to
+                                           DEFAULT_BEYOND_THRESHOLD.
+        line_columns (dict, optional): Line columns to return, mapped to
+                                       their output names.
+                                       Defaults to DEFAULT_LINE_COLUMNS.
+        distance_col_name (str, optional): Name of the distance column.
+                                           Defaults to "distancia".
+        metric_crs (str, optional): Projected CRS used to measure distances.
+                                    Defaults to DEFAULT_METRIC_CRS.
+        chunksize (int, optional): Points queried at once.
+                                   Defaults to DEFAULT_CHUNKSIZE.
+        n_workers (int, optional): Process pool size.
+                                   Defaults to None (no pool).
+
+    Returns:
+        gpd.GeoDataFrame: Copy of `points_gdf` with the nearest line
+                          attributes and the distance in metres.
+
+    Example:
+        >>> accidentes_carril_gdf = nearest_line_join(
+                accidentes_gdf,
+                carriles_gdf[carriles_gdf['TIPO_VIA'].notna()],
+            )
+    """
+    if line_columns is None:
+        line_columns = DEFAULT_LINE_COLUMNS
+    points = points_gdf.geometry.to_crs(metric_crs).values
+    lines = lines_gdf.geometry.to_crs(metric_crs).values
+
+    chunks = [
+        np.asarray(points[start:start + chunksize])
+        for start in range(0, len(points), chunksize)
+    ]
+    if n_workers and n_workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=_MP_CONTEXT,
+            initializer=_init_worker,
+            initargs=(shapely.to_wkb(np.asarray(lines)),),
+        ) as executor:
+            results = list(executor.map(
+                _worker_query_nearest,
+                [shapely.to_wkb(chunk) for chunk in chunks],
+                [max_distance] * len(chunks),
+            ))
+    else:
+        tree = shapely.STRtree(np.asarray(lines))
+        results = [
+            _query_nearest(tree, chunk, max_distance) for chunk in chunks
+        ]
+
+    offsets = np.cumsum([0] + [len(chunk) for chunk in chunks[:-1]])
+    point_idx = np.concatenate(
+        [np.asarray(r[0]) + offset for r, offset in zip(results, offsets)]
+        or [np.array([], dtype=np.intp)]
+    )
+    line_idx = np.concatenate(
+        [r[1] for r in results] or [np.array([], dtype=np.intp)]
+    )
+    distances = np.concatenate(
+        [r[2] for r in results] or [np.array([], dtype=np.float64)]
+    )
+
+    matches = lines_gdf[list(line_columns)].iloc[line_idx].rename(
+        columns=line_columns
+    )
+    matches.index = point_idx
+    matches[distance_col_name] = distances
+    matches = matches.reindex(pd.RangeIndex(len(points_gdf)))
+    matches.index = points_gdf.index
+
+    if threshold is not None:
+        if beyond_threshold is None:
+            beyond_threshold = DEFAULT_BEYOND_THRESHOLD
+        beyond = matches[distance_col_name] > threshold
+        for col, value in beyond_threshold.items():
+            if col in matches:
+                matches[col] = matches[col].where(~beyond, value)
+
+    result = points_gdf.copy()
+    for col in matches.columns:
+        result[col] = matches[col]
+    return result
@@ -1,6 +1,19 @@
-from .h3 import point_to_h3, raster_band_to_pandas_h3
+from ..._lazy import lazy_attributes
 
-__all__ = [
-    point_to_h3,
-    raster_band_to_pandas_h3,
-]
+__getattr__, __dir__, __all__ = lazy_attributes(
+    __name__,
+    {
+        "cells_resolution": ".h3",
+        "cells_to_geometry": ".h3",
+        "cells_to_parent": ".h3",
+        "cells_to_str": ".h3",
+        "h3_column_to_str": ".h3",
+        "iter_raster_h3_tiles": ".h3",
+        "point_to_h3": ".h3",
+        "points_to_h3": ".h3",
+        "raster_to_h3_parquet": ".h3",
+        "raster_band_to_pandas_h3": ".h3",
+        "raster_bands_to_pandas_h3": ".h3",
+        "resolve_h3_resolution": ".h3",
+    },
+)
@@ -1,12 +1,58 @@
+import multiprocessing
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+from functools import lru_cache
+
+import geopandas as gpd
 import h3
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import rasterio
 import shapely
 
+from h3ronpy import DEFAULT_CELL_COLUMN_NAME
 from h3ronpy.raster import nearest_h3_resolution, raster_to_dataframe
+from h3ronpy.vector import (
+    cells_to_coordinates,
+    cells_to_wkb_polygons,
+    coordinates_to_cells,
+)
+from rasterio.windows import Window
+
+from ...utils.instrumentation import instrument, metrics
+from ...utils.utils import init_logger
+
+DEFAULT_H3RONPY_H3_COL_NAME = DEFAULT_CELL_COLUMN_NAME
+
+DEFAULT_H3RONPY_VALUE_COL_NAME = "value"
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+# Windows submitted ahead of the consumer per worker in iter_raster_h3_tiles
+PENDING_WINDOWS_PER_WORKER = 2
+
+RESOLUTION_CACHE_SIZE = 128
+
+# h3ronpy runs its own thread pool, which does not survive a fork
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+H3_NULL = np.uint64(0)
 
-DEFAULT_H3RONPY_H3_COL_NAME = "h3index"
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+H3_RES_OFFSET = np.uint64(52)
+
+H3_RES_MASK = np.uint64(0xF) << H3_RES_OFFSET
+
+H3_MAX_RES = 15
+
+# Valid H3 indexes have a zero top nibble, so their hex form has 15 digits
+_H3_NIBBLE_SHIFTS = np.arange(56, -4, -4, dtype=np.uint64)
 
 
 def point_to_h3(point: shapely.Point, resolution: int) -> str:
@@ -22,44 +68,548 @@ def point_to_h3(point: shapely.Point, resolution: int) -> str:
     return h3.latlng_to_cell(point.y, point.x, resolution)
 
 
+def cells_to_str(
+    cells: np.ndarray, chunksize: int = DEFAULT_CHUNKSIZE
+) -> np.ndarray:
+    """Function to format H3 uint64 indexes as strings, vectorized.
+
+    Args:
+        cells (np.ndarray): H3 indexes in uint64 format.
+        chunksize (int, optional): Indexes formatted at once.
+                                   Defaults to DEFAULT_CHUNKSIZE.
+
+    Returns:
+        np.ndarray: Object array of H3 strings, None for null (0) indexes.
+    """
+    cells = np.asarray(cells, dtype=np.uint64).ravel()
+    out = np.empty(len(cells), dtype=object)
+    for start in range(0, len(cells), chunksize):
+        chunk = cells[start:start + chunksize]
+        nibbles = (chunk[:, None] >> _H3_NIBBLE_SHIFTS) & np.uint64(0xF)
+        chars = np.ascontiguousarray(_HEX_DIGITS[nibbles.astype(np.intp)])
+        out[start:start + chunksize] = chars.view("S15").ravel().astype(str)
+    out[cells == H3_NULL] = None
+    return out
+
+
+def cells_resolution(cells: np.ndarray) -> np.ndarray:
+    """Function to get the resolution of H3 uint64 indexes, vectorized.
+
+    Args:
+        cells (np.ndarray): H3 indexes in uint64 format.
+
+    Returns:
+        np.ndarray: Resolutions as uint8.
+    """
+    cells = np.asarray(cells, dtype=np.uint64)
+    return ((cells & H3_RES_MASK) >> H3_RES_OFFSET).astype(np.uint8)
+
+
+def cells_to_parent(cells: np.ndarray, resolution: int) -> np.ndarray:
+    """Function to get the parents of H3 uint64 indexes, vectorized.
+
+    The parent is obtained by rewriting the resolution bits and setting the
+    digits finer than `resolution` to 7, as H3 does. Null (0) indexes are
+    kept as 0.
+
+    Args:
+        cells (np.ndarray): H3 indexes in uint64 format, all at a resolution
+                            equal or finer than `resolution`.
+        resolution (int): Parent H3 resolution.
+
+    Returns:
+        np.ndarray: Parent H3 indexes in uint64 format.
+    """
+    cells = np.asarray(cells, dtype=np.uint64)
+    unused_digits = (np.uint64(1) << np.uint64(
+        (H3_MAX_RES - resolution) * 3
+    )) - np.uint64(1)
+    parents = (
+        (cells & ~H3_RES_MASK)
+        | (np.uint64(resolution) << H3_RES_OFFSET)
+        | unused_digits
+    )
+    return np.where(cells == H3_NULL, H3_NULL, parents)
+
+
+def _coordinates_to_cells(lat: np.ndarray, lng: np.ndarray, resolution: int):
+    return np.asarray(coordinates_to_cells(lat, lng, resolution))
+
+
+@instrument("h3_points_to_h3")
+def points_to_h3(
+    points,
+    resolution: int,
+    as_str: bool = False,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    n_workers: int = None,
+):
+    """Function to convert many points to H3 indexes at once.
+
+    Coordinates are pulled with shapely and converted in chunks by h3ronpy,
+    avoiding a Python call per point. Null, empty, non-point or non-finite
+    geometries get a null index (0, or None if `as_str`).
+
+    Args:
+        points (gpd.GeoSeries, np.ndarray): Points to convert, either
+            shapely geometries or an (N, 2) array of x (lng), y (lat).
+        resolution (int): H3 resolution.
+        as_str (bool, optional): Return H3 indexes in string format.
+                                 Defaults to False.
+        chunksize (int, optional): Points converted at once.
+                                   Defaults to DEFAULT_CHUNKSIZE.
+        n_workers (int, optional): Convert chunks in a process pool of this
+                                   size. Defaults to None (no pool).
+
+    Returns:
+        pd.Series or np.ndarray: uint64 (or string) H3 indexes, as a Series
+                                 aligned to the input index if a Series was
+                                 given.
+    """
+    index = points.index if isinstance(points, pd.Series) else None
+    values = np.asarray(points)
+    if values.dtype == object:
+        n_points = len(values)
+        point_idx = np.flatnonzero(shapely.get_type_id(values) == 0)
+        point_idx = point_idx[~shapely.is_empty(values[point_idx])]
+        coords = shapely.get_coordinates(values[point_idx])
+    else:
+        coords = values.astype(np.float64, copy=False).reshape(-1, 2)
+        n_points = len(coords)
+        point_idx = np.arange(n_points)
+
+    finite = np.isfinite(coords).all(axis=1)
+    valid_idx, coords = point_idx[finite], coords[finite]
+    chunks = [
+        (coords[start:start + chunksize, 1],
+         coords[start:start + chunksize, 0])
+        for start in range(0, len(coords), chunksize)
+    ]
+    if n_workers and n_workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=_MP_CONTEXT
+        ) as executor:
+            results = list(executor.map(
+                _coordinates_to_cells,
+                *zip(*chunks),
+                [resolution] * len(chunks),
+            ))
+    else:
+        results = [
+            _coordinates_to_cells(lat, lng, resolution)
+            for lat, lng in chunks
+        ]
+
+    cells = np.zeros(n_points, dtype=np.uint64)
+    if results:
+        cells[valid_idx] = np.concatenate(results)
+
+    if as_str is True:
+        cells = cells_to_str(cells, chunksize=chunksize)
+    if index is not None:
+        return pd.Series(cells, index=index, name="h3")
+    return cells
+
+
+def h3_column_to_str(
+    df: pd.DataFrame, h3_col_name: str = "h3"
+) -> pd.DataFrame:
+    """Function to format a uint64 H3 column as strings for display or export.
+
+    Keep H3 indexes as uint64 for joins, aggregations and parquet files and
+    only call this at the output boundary.
+
+    Args:
+        df (pd.DataFrame): Dataframe with a uint64 H3 column.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Returns:
+        pd.DataFrame: Copy of the dataframe with H3 indexes as strings.
+    """
+    return df.assign(**{h3_col_name: cells_to_str(df[h3_col_name].values)})
+
+
+def cells_to_geometry(cells: np.ndarray) -> np.ndarray:
+    """Function to build H3 cell boundary polygons, vectorized.
+
+    Args:
+        cells (np.ndarray): H3 indexes in uint64 format.
+
+    Returns:
+        np.ndarray: Shapely polygons.
+    """
+    wkb = pa.array(
+        cells_to_wkb_polygons(np.asarray(cells, dtype=np.uint64))
+    ).to_numpy(zero_copy_only=False)
+    return shapely.from_wkb(wkb)
+
+
+@lru_cache(maxsize=RESOLUTION_CACHE_SIZE)
+def _cached_h3_resolution(shape, transform, crs, search_mode):
+    init_logger().info(
+        "Looking for raster band H3 resolution "
+        f"using search_mode {search_mode}..."
+    )
+    return nearest_h3_resolution(shape, transform, search_mode=search_mode)
+
+
+def resolve_h3_resolution(
+    shape: tuple,
+    transform,
+    crs=None,
+    search_mode: str = "min_diff",
+) -> int:
+    """Function to find the H3 resolution closest to a raster grid.
+
+    Results are memoized on (shape, transform, CRS, search_mode), so
+    converting many bands or tiles of the same grid searches only once.
+
+    Args:
+        shape (tuple): Raster (rows, cols) shape.
+        transform (affine.Affine): Raster affine transform.
+        crs (rasterio.crs.CRS, optional): Raster CRS. Defaults to None.
+        search_mode (str, optional): 'min_diff' or 'smaller_than_pixel'.
+                                     Defaults to "min_diff".
+
+    Returns:
+        int: H3 resolution.
+    """
+    hits = (
+        _cached_h3_resolution.cache_info().hits if metrics.enabled else None
+    )
+    resolution = _cached_h3_resolution(
+        tuple(shape[-2:]),
+        transform,
+        crs.to_string() if crs is not None else None,
+        search_mode,
+    )
+    if hits is not None:
+        metrics.record_cache(
+            "h3_resolution", _cached_h3_resolution.cache_info().hits > hits
+        )
+    return resolution
+
+
+@instrument("h3_raster_band_to_pandas_h3")
 def raster_band_to_pandas_h3(
     band: np.array,
     raster: rasterio.io.DatasetReader,
     res: int = None,
-    search_mode: str = "nearest",
-    h3_as_str: bool = True,
+    search_mode: str = "min_diff",
+    h3_as_str: bool = False,
     h3_col_name: str = "h3",
     add_geom: bool = False,
 ) -> pd.DataFrame:
     """Function to convert a raster band to a pandas dataframe with H3 indices.
 
+    Pixels equal to the raster nodata value are dropped, as are NaN pixels
+    of float bands without a nodata value, like `raster_bands_to_pandas_h3`
+    does.
+
     Args:
         band (np.array): Raster band to convert to H3 dataframe.
         raster (rasterio.io.DatasetReader): Rasterio raster object.
         res (int, optional): H3 Resolution. Defaults to None.
                              If not provided, will be inferred from raster.
-        search_mode (str, optional): Search mode to infer H3 resolution.
-                                     Defaults to "nearest".
+        search_mode (str, optional): Search mode to infer H3 resolution,
+                                     'min_diff' or 'smaller_than_pixel'.
+                                     Defaults to "min_diff".
         h3_as_str (bool, optional): Return H3 indexes in string format.
-                                    Defaults to True.
+                                    Prefer uint64 indexes and format them
+                                    with `h3_column_to_str` when exporting.
+                                    Defaults to False.
         h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
         add_geom (bool, optional): Add H3 boundary geometry. Defaults to False.
 
     Returns:
-        pd.DataFrame: Pandas dataframe with H3 indexes and band information.
+        pd.DataFrame: Pandas dataframe with H3 indexes and band information,
+                      or a GeoDataFrame if `add_geom` is True.
     """
     if not res:
-        print(
-            "Looking for raster band H3 resolution "
-            f"using search_mode {search_mode}..."
-        )
-        res = nearest_h3_resolution(
-            band.shape, raster.transform, search_mode=search_mode
+        res = resolve_h3_resolution(
+            band.shape,
+            raster.transform,
+            crs=getattr(raster, "crs", None),
+            search_mode=search_mode,
         )
 
+    nodata = _nodata_value(band.dtype, getattr(raster, "nodata", None))
     h3_df = raster_to_dataframe(
-        band, raster.transform, res, compacted=False, geo=add_geom
-    ).rename(columns={DEFAULT_H3RONPY_H3_COL_NAME: h3_col_name})
+        band, raster.transform, res, nodata_value=nodata, compact=False
+    ).to_pandas().rename(columns={DEFAULT_H3RONPY_H3_COL_NAME: h3_col_name})
+    if add_geom is True:
+        h3_df = gpd.GeoDataFrame(
+            h3_df,
+            geometry=cells_to_geometry(h3_df[h3_col_name].values),
+            crs="EPSG:4326",
+        )
+    if h3_as_str is True:
+        h3_df = h3_column_to_str(h3_df, h3_col_name=h3_col_name)
+    return h3_df
+
+
+def _nodata_value(dtype, nodata):
+    """nodata value for h3ronpy, dropping the same pixels as `_nodata_mask`"""
+    dtype = np.dtype(dtype)
+    if nodata is not None and not np.isnan(nodata):
+        # h3ronpy rejects a float nodata for integer bands
+        return dtype.type(nodata)
+    if np.issubdtype(dtype, np.floating):
+        return dtype.type(np.nan)
+    return None
+
+
+def _nodata_mask(values: np.ndarray, nodata) -> np.ndarray:
+    if nodata is not None and not np.isnan(nodata):
+        return values == nodata
+    if np.issubdtype(values.dtype, np.floating):
+        return np.isnan(values)
+    return np.zeros(len(values), dtype=bool)
+
+
+@instrument("h3_raster_bands_to_pandas_h3")
+def raster_bands_to_pandas_h3(
+    raster: rasterio.io.DatasetReader,
+    bands: list = None,
+    res: int = None,
+    search_mode: str = "min_diff",
+    h3_as_str: bool = False,
+    h3_col_name: str = "h3",
+    band_col_names: list = None,
+) -> pd.DataFrame:
+    """Function to convert several raster bands to H3 in a single pass.
+
+    The pixel to cell mapping is computed once, on a raster of pixel
+    positions, and every band is then gathered through it, instead of
+    running the H3 conversion once per band. Cells where all bands are
+    nodata are dropped.
+
+    Args:
+        raster (rasterio.io.DatasetReader): Rasterio raster object.
+        bands (list, optional): Band indexes to convert (1-based).
+                                Defaults to None (all bands).
+        res (int, optional): H3 Resolution. Defaults to None.
+                             If not provided, will be inferred from raster.
+        search_mode (str, optional): Search mode to infer H3 resolution.
+                                     Defaults to "min_diff".
+        h3_as_str (bool, optional): Return H3 indexes in string format.
+                                    Defaults to False.
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+        band_col_names (list, optional): Names of the band columns.
+                                         Defaults to 'band_<index>'.
+
+    Returns:
+        pd.DataFrame: Pandas dataframe with H3 indexes and one column
+                      per band.
+    """
+    bands = list(bands or raster.indexes)
+    band_col_names = band_col_names or [f"band_{i}" for i in bands]
+    if len(band_col_names) != len(bands):
+        raise ValueError("band_col_names must have one name per band")
+    if not res:
+        res = resolve_h3_resolution(
+            raster.shape,
+            raster.transform,
+            crs=raster.crs,
+            search_mode=search_mode,
+        )
+
+    data = raster.read(bands)
+    n_pixels = data.shape[1] * data.shape[2]
+    pixel_dtype = np.uint32 if n_pixels < 2 ** 32 else np.uint64
+    pixel_ids = np.arange(n_pixels, dtype=pixel_dtype).reshape(data.shape[1:])
+    mapping = raster_to_dataframe(
+        pixel_ids, raster.transform, res, compact=False
+    ).to_pandas()
+    pixels = mapping[DEFAULT_H3RONPY_VALUE_COL_NAME].values
+    values = data.reshape(len(bands), -1)[:, pixels]
+
+    is_nodata = np.ones(len(pixels), dtype=bool)
+    for band_values, band in zip(values, bands):
+        is_nodata &= _nodata_mask(band_values, raster.nodatavals[band - 1])
+
+    h3_df = pd.DataFrame({
+        h3_col_name: mapping[DEFAULT_H3RONPY_H3_COL_NAME].values,
+        **dict(zip(band_col_names, values)),
+    })[~is_nodata].reset_index(drop=True)
     if h3_as_str is True:
-        h3_df[h3_col_name] = h3_df[h3_col_name].apply(h3.int_to_str)
+        h3_df = h3_column_to_str(h3_df, h3_col_name=h3_col_name)
     return h3_df
+
+
+def _raster_tile_windows(
+    raster: rasterio.io.DatasetReader,
+    tile_size: int = None,
+    band_index: int = 1,
+) -> list:
+    if tile_size is None:
+        return [window for _, window in raster.block_windows(band_index)]
+    return [
+        Window(col_off, row_off,
+               min(tile_size, raster.width - col_off),
+               min(tile_size, raster.height - row_off))
+        for row_off in range(0, raster.height, tile_size)
+        for col_off in range(0, raster.width, tile_size)
+    ]
+
+
+def _raster_window_to_h3(
+    raster_path: str,
+    window: Window,
+    res: int,
+    band_index: int = 1,
+    overlap: int = 0,
+    h3_col_name: str = "h3",
+) -> pd.DataFrame:
+    with rasterio.open(raster_path) as raster:
+        read_window = Window(
+            window.col_off - overlap,
+            window.row_off - overlap,
+            window.width + 2 * overlap,
+            window.height + 2 * overlap,
+        ).intersection(Window(0, 0, raster.width, raster.height))
+        band = raster.read(band_index, window=read_window)
+        h3_df = raster_to_dataframe(
+            band,
+            rasterio.windows.transform(read_window, raster.transform),
+            res,
+            nodata_value=_nodata_value(band.dtype, raster.nodata),
+            compact=False,
+        ).to_pandas().rename(
+            columns={DEFAULT_H3RONPY_H3_COL_NAME: h3_col_name}
+        )
+        transform = raster.transform
+        width, height = raster.width, raster.height
+
+    # Each cell is owned by the window containing its center, so cells
+    # produced by several (overlapping) windows are emitted exactly once.
+    # Edge windows also own the centers falling outside the raster.
+    centers = pa.table(
+        cells_to_coordinates(h3_df[h3_col_name].values)
+    ).to_pandas()
+    cols, rows = ~transform * (centers["lng"].values, centers["lat"].values)
+    col_start, row_start = window.col_off, window.row_off
+    col_end, row_end = col_start + window.width, row_start + window.height
+    owned = (
+        ((cols >= col_start) | (col_start == 0))
+        & ((cols < col_end) | (col_end >= width))
+        & ((rows >= row_start) | (row_start == 0))
+        & ((rows < row_end) | (row_end >= height))
+    )
+    return h3_df[owned].reset_index(drop=True)
+
+
+def iter_raster_h3_tiles(
+    raster_path: str,
+    res: int = None,
+    band_index: int = 1,
+    tile_size: int = 1024,
+    overlap: int = 0,
+    n_workers: int = None,
+    search_mode: str = "min_diff",
+    h3_col_name: str = "h3",
+):
+    """Function to convert a raster to H3 window by window.
+
+    Only a few windows are held in memory at a time, so rasters larger
+    than memory can be converted. Windows are converted in a process pool
+    when `n_workers` is set, and results are yielded as they complete. At
+    most `PENDING_WINDOWS_PER_WORKER` windows per worker are submitted
+    ahead of the consumer, so a slow consumer throttles the workers.
+
+    Args:
+        raster_path (str): Path to a raster readable by rasterio.
+        res (int, optional): H3 Resolution. Defaults to None.
+                             If not provided, will be inferred from raster.
+        band_index (int, optional): Band to convert. Defaults to 1.
+        tile_size (int, optional): Window size in pixels. If None, the
+                                   raster's internal blocks are used.
+                                   Defaults to 1024.
+        overlap (int, optional): Extra pixels read around each window so
+                                 cells on its edges see their full
+                                 neighbourhood. Defaults to 0.
+        n_workers (int, optional): Process pool size.
+                                   Defaults to None (no pool).
+        search_mode (str, optional): Search mode to infer H3 resolution.
+                                     Defaults to "min_diff".
+        h3_col_name (str, optional): Name of the H3 column. Defaults to "h3".
+
+    Yields:
+        pd.DataFrame: uint64 H3 indexes and band values of one window.
+    """
+    with rasterio.open(raster_path) as raster:
+        if not res:
+            res = resolve_h3_resolution(
+                raster.shape,
+                raster.transform,
+                crs=raster.crs,
+                search_mode=search_mode,
+            )
+        windows = _raster_tile_windows(raster, tile_size, band_index)
+
+    kwargs = dict(
+        res=res, band_index=band_index, overlap=overlap,
+        h3_col_name=h3_col_name,
+    )
+    if n_workers and n_workers > 1:
+        max_pending = n_workers * PENDING_WINDOWS_PER_WORKER
+        windows = iter(windows)
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=_MP_CONTEXT
+        ) as executor:
+            pending = set()
+            try:
+                while True:
+                    for window in windows:
+                        pending.add(
+                            executor.submit(
+                                _raster_window_to_h3,
+                                raster_path,
+                                window,
+                                **kwargs,
+                            )
+                        )
+                        if len(pending) >= max_pending:
+                            break
+                    if not pending:
+                        break
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    # Drop each future once yielded, releasing its frame
+                    while done:
+                        yield done.pop().result()
+            finally:
+                # Stop converting windows nobody will consume
+                for future in pending:
+                    future.cancel()
+    else:
+        for window in windows:
+            yield _raster_window_to_h3(raster_path, window, **kwargs)
+
+
+@instrument("h3_raster_to_h3_parquet", count_rows=False)
+def raster_to_h3_parquet(
+    raster_path: str,
+    output_dir: str,
+    **kwargs,
+) -> list:
+    """Function to convert a raster to H3 as a partitioned parquet dataset.
+
+    Args:
+        raster_path (str): Path to a raster readable by rasterio.
+        output_dir (str): Directory where one parquet file per window
+                          is written.
+        **kwargs: Passed to `iter_raster_h3_tiles`.
+
+    Returns:
+        list: Paths of the written parquet files.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i, h3_df in enumerate(iter_raster_h3_tiles(raster_path, **kwargs)):
+        if h3_df.empty:
+            continue
+        path = os.path.join(output_dir, f"part-{i:05d}.parquet")
+        h3_df.to_parquet(path, index=False)
+        paths.append(path)
+        metrics.increment("h3_raster_to_h3_parquet_rows_total", len(h3_df))
+    return paths
@@ -1 +1,13 @@
-from .db_client import DBClient
\ No newline at end of file
+from .._lazy import lazy_attributes
+
+__getattr__, __dir__, __all__ = lazy_attributes(
+    __name__,
+    {
+        "AsyncDBClient": ".async_db_client",
+        "DBClient": ".db_client",
+        "DatasetCache": ".dataset_cache",
+        "DerivedTable": ".materialize",
+        "MaterializationPipeline": ".materialize",
+        "QueryCache": ".query_cache",
+    },
+)
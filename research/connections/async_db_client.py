@@ -0,0 +1,296 @@
+import asyncio
+import os
+
+import asyncpg
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+from ..utils.instrumentation import metrics
+from ..utils.utils import init_logger
+from .db_client import (
+    DEFAULT_MAX_OVERFLOW,
+    DEFAULT_POOL_RECYCLE,
+    DEFAULT_POOL_SIZE,
+    DBClient,
+    _env_int,
+)
+
+GEOMETRY_SCHEMA_SQL = """
+    SELECT n.nspname
+    FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace
+    WHERE t.typname = 'geometry'
+"""
+
+
+async def _register_geometry_codec(connection):
+    """Receive PostGIS geometries as EWKB bytes, in binary format, instead
+    of hex text. Databases without PostGIS are left untouched."""
+    schema = await connection.fetchval(GEOMETRY_SCHEMA_SQL)
+    if schema is not None:
+        await connection.set_type_codec(
+            "geometry",
+            schema=schema,
+            encoder=bytes,
+            decoder=bytes,
+            format="binary",
+        )
+
+
+class AsyncDBClient:
+    """Asynchronous PostgreSQL client on an asyncpg connection pool.
+
+    Independent queries (e.g. one per district or tile) run concurrently
+    on the pool, so wall time is bound by the slowest query instead of
+    their sum. The pool is created on first use with between `pool_size`
+    and `pool_size + max_overflow` connections, defaulting to the same
+    DB_* env vars as `DBClient`. Idle connections are closed after
+    `pool_recycle` seconds. Use the client as an async context manager or
+    await `close()` to release every connection.
+
+    Queries take positional %s parameters, as in `DBClient`, and are sent
+    as server-side prepared statements.
+
+        Example:
+            >>> async with AsyncDBClient() as db_client:
+                    districts_gdf, counts_df = await db_client.gather_queries(
+                        [
+                            {'query': 'SELECT * FROM distritos',
+                             'geom_col': 'geometry'},
+                            'SELECT distrito, count(*) FROM accidentes '
+                            'GROUP BY distrito',
+                        ],
+                        max_concurrency=4,
+                    )
+    """
+
+    def __init__(
+        self,
+        host=None,
+        database=None,
+        user=None,
+        password=None,
+        pool_size=None,
+        max_overflow=None,
+        pool_recycle=None,
+    ):
+        self._logger = init_logger()
+        self.host = host or os.environ.get("DB_HOST")
+        self.database = database or os.environ.get("DB_DATABASE")
+        self.user = user or os.environ.get("DB_USER")
+        self.password = password or os.environ.get("DB_PASSWORD")
+        self.pool_size = (
+            pool_size if pool_size is not None
+            else _env_int("DB_POOL_SIZE", DEFAULT_POOL_SIZE)
+        )
+        self.max_overflow = (
+            max_overflow if max_overflow is not None
+            else _env_int("DB_MAX_OVERFLOW", DEFAULT_MAX_OVERFLOW)
+        )
+        self.pool_recycle = (
+            pool_recycle if pool_recycle is not None
+            else _env_int("DB_POOL_RECYCLE", DEFAULT_POOL_RECYCLE)
+        )
+        self._pool = None
+        self._pool_lock = None
+        self._pool_loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def max_connections(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    def _check_loop(self):
+        """Drop the pool and lock if they belong to another event loop."""
+        loop = asyncio.get_running_loop()
+        if self._pool_loop is loop:
+            return
+        if self._pool is not None:
+            self._logger.warning(
+                "Event loop changed, re-creating the connection pool"
+            )
+            pool, self._pool = self._pool, None
+            try:
+                pool.terminate()
+            except RuntimeError:
+                # Its loop is already closed, and so are the connections
+                pass
+        self._pool_lock = asyncio.Lock()
+        self._pool_loop = loop
+
+    async def pool(self) -> asyncpg.Pool:
+        """Connection pool, created on first use on the current loop."""
+        self._check_loop()
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        host=self.host,
+                        database=self.database,
+                        user=self.user,
+                        password=self.password,
+                        min_size=self.pool_size,
+                        max_size=self.max_connections,
+                        max_inactive_connection_lifetime=self.pool_recycle,
+                        init=_register_geometry_codec,
+                    )
+        return self._pool
+
+    def pool_stats(self) -> dict:
+        """
+        Returns usage statistics for the pool, or None if it has not been
+        created yet.
+        """
+        if self._pool is None:
+            return None
+        return {
+            "max_size": self._pool.get_max_size(),
+            "size": self._pool.get_size(),
+            "idle": self._pool.get_idle_size(),
+        }
+
+    async def close(self):
+        """Closes every pooled connection. The pool is re-created on next
+        use."""
+        self._check_loop()
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    @staticmethod
+    def _prepare_args(query, params) -> tuple:
+        query, n_params = DBClient._to_prepared_statement(query)
+        params = tuple(params or ())
+        if len(params) != n_params:
+            raise ValueError(
+                f"Query has {n_params} parameters but {len(params)} "
+                "were given"
+            )
+        return query, params
+
+    async def run(self, query, params=None):
+        """
+        Runs a SQL statement within a PostgreSQL transaction
+                Args:
+                    query (str): SQL statement to be executed.
+                    params (tuple): Positional %s query parameters.
+                                    Default: None
+                Returns:
+                    list: Rows as dicts, or None if the statement does not
+                          return rows.
+                Example:
+                    >>> await db_client.run(
+                        "UPDATE table_name SET column_1 = %s", ('value',)
+                        )
+        """
+        query, params = self._prepare_args(query, params)
+        pool = await self.pool()
+        with metrics.timer("db_async_run") as timer:
+            async with pool.acquire() as connection:
+                async with connection.transaction():
+                    statement = await connection.prepare(query)
+                    rows = await statement.fetch(*params)
+                    has_results = bool(statement.get_attributes())
+            timer.rows = len(rows)
+        return [dict(row) for row in rows] if has_results else None
+
+    async def read_sql(
+        self,
+        query,
+        geom_col=None,
+        crs="EPSG:4326",
+        parse_dates=None,
+        params=None,
+    ) -> gpd.GeoDataFrame:
+        """
+        Reads the output from a SQL query and returns a Geopandas GeoDataFrame
+            Args:
+                query (str): SQL query to be executed.
+                geom_col (string): Geometry (or WKB) column from the output
+                                   table, parsed with vectorized
+                                   shapely.from_wkb. The CRS is inferred
+                                   from the geometry SRID when it is set.
+                                   If None, a standard DataFrame is returned.
+                                   Default: None.
+                crs (string): Coordinate Reference System to use when the
+                              geometries have no SRID.
+                              Default: 'EPSG:4326'
+                parse_dates (list): List of date column names.
+                                    Default None
+                params (tuple): Positional %s query parameters.
+                                Default: None
+            Example:
+                >>> await db_client.read_sql(
+                        'SELECT * FROM accidentes WHERE distrito = %s',
+                        geom_col='geometry', params=('CENTRO',)
+                    )
+        """
+        query, params = self._prepare_args(query, params)
+        pool = await self.pool()
+        with metrics.timer("db_async_read_sql") as timer:
+            async with pool.acquire() as connection:
+                statement = await connection.prepare(query)
+                rows = await statement.fetch(*params)
+                columns = [attr.name for attr in statement.get_attributes()]
+            timer.rows = len(rows)
+
+        if geom_col and geom_col not in columns:
+            raise ValueError(f"Column '{geom_col}' not found in query output")
+        gdf = DBClient._rows_to_gdf(
+            [tuple(row) for row in rows], columns, geom_col=geom_col, crs=None
+        )
+        if geom_col:
+            srids = shapely.get_srid(gdf.geometry.dropna().values)
+            srid = int(srids[srids > 0][0]) if (srids > 0).any() else 0
+            gdf = gdf.set_crs(f"EPSG:{srid}" if srid else crs)
+        for col in parse_dates or []:
+            gdf[col] = pd.to_datetime(gdf[col])
+        return gdf
+
+    async def gather_queries(
+        self, queries, max_concurrency=None, return_exceptions=False
+    ) -> list:
+        """
+        Runs several read queries concurrently and returns their results in
+        the same order.
+            Args:
+                queries (iterable): SQL query strings, or dicts of
+                                    `read_sql` keyword arguments.
+                max_concurrency (int): Queries in flight at once. Extra
+                                       queries wait for a free slot.
+                                       Default: the pool maximum size.
+                return_exceptions (bool): Return exceptions as results
+                                          instead of raising the first one.
+                                          Default: False
+            Returns:
+                list: GeoDataFrame (or exception) per query.
+            Example:
+                >>> await db_client.gather_queries(
+                        [{'query': 'SELECT * FROM accidentes '
+                                   'WHERE distrito = %s',
+                          'params': (distrito,)}
+                         for distrito in distritos],
+                        max_concurrency=8,
+                    )
+        """
+        semaphore = asyncio.Semaphore(
+            max_concurrency or self.max_connections
+        )
+
+        async def read(kwargs):
+            async with semaphore:
+                return await self.read_sql(**kwargs)
+
+        tasks = [
+            read(query if isinstance(query, dict) else {"query": query})
+            for query in queries
+        ]
+        self._logger.info(f"Gathering {len(tasks)} queries")
+        return await asyncio.gather(
+            *tasks, return_exceptions=return_exceptions
+        )
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import fsspec
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from ..utils.utils import init_logger
+
+DEFAULT_ROW_GROUP_SIZE = 50_000
+
+HASH_CHUNKSIZE = 8 * 1024 * 1024
+
+# File info fields holding a hash of the contents (GCS, S3, Azure...)
+CONTENT_HASH_FIELDS = ["md5Hash", "crc32c", "ETag", "etag", "content_md5"]
+
+# File info fields changing whenever the contents are rewritten
+MODIFIED_FIELDS = [
+    "mtime", "updated", "LastModified", "last_modified", "created"
+]
+
+INDEX_FILE_NAME = "index.json"
+
+
+def _read_source(local_path: str, read_kwargs: dict):
+    if local_path.endswith(".parquet"):
+        try:
+            return gpd.read_parquet(local_path, **read_kwargs)
+        except ValueError:
+            # Plain parquet without GeoParquet metadata
+            return pd.read_parquet(local_path, **read_kwargs)
+    if local_path.endswith(".csv"):
+        return pd.read_csv(local_path, **read_kwargs)
+    return gpd.read_file(local_path, **read_kwargs)
+
+
+def _sort_spatially(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Order rows along a Hilbert curve so each row group covers a small
+    area and bbox filters can skip most of them."""
+    geoms = gdf.geometry
+    valid = ~(geoms.isna() | geoms.is_empty)
+    if not valid.any():
+        return gdf
+    distances = np.full(len(gdf), np.iinfo(np.uint32).max, dtype=np.int64)
+    distances[valid.to_numpy()] = geoms[valid].hilbert_distance(
+        total_bounds=geoms[valid].total_bounds
+    )
+    return gdf.iloc[np.argsort(distances, kind="stable")]
+
+
+class DatasetCache:
+    """Local GeoParquet cache of remote or slow-to-parse datasets.
+
+    Any source readable by geopandas or pandas (shapefile zips, GeoJSON,
+    CSV, parquet...) on any fsspec filesystem is converted once into a
+    local (Geo)Parquet file keyed by a hash of its contents and the read
+    options. Geometries are written sorted along a Hilbert curve with a
+    bbox covering column, so bbox reads only decode the row groups
+    intersecting it.
+
+    Content hashes are taken from the file info when the filesystem
+    provides them (e.g. GCS md5Hash), and otherwise computed from the
+    bytes once per size and modification time.
+
+    Args:
+        directory (str): Local cache directory.
+        filesystem (fsspec.AbstractFileSystem, optional): Filesystem of
+            the sources. If None, it is inferred from each source URI
+            (e.g. gs:// uses gcsfs). A local or in-memory filesystem can
+            stand in for GCS.
+        row_group_size (int, optional): Rows per parquet row group.
+                                        Defaults to DEFAULT_ROW_GROUP_SIZE.
+
+    Example:
+        >>> datasets = DatasetCache('/tmp/datasets')
+        >>> carriles_gdf = datasets.load(
+                f'{gcs_bucket}/Infraestructura_Ciclista.zip',
+                columns=['TIPO_VIA', 'geometry'],
+                bbox=(-3.72, 40.40, -3.68, 40.43),
+            )
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        filesystem=None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    ):
+        self._logger = init_logger()
+        self.directory = directory
+        self.filesystem = filesystem
+        self.row_group_size = row_group_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _resolve(self, source: str) -> tuple:
+        if self.filesystem is not None:
+            return self.filesystem, self.filesystem._strip_protocol(source)
+        return fsspec.core.url_to_fs(source)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILE_NAME)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path) as fp:
+                return json.load(fp)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_index(self, index: dict):
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(index, fp)
+        os.replace(tmp_path, self._index_path)
+
+    def content_hash(self, source: str) -> str:
+        """Hash of the contents of a source.
+
+        Args:
+            source (str): Source path or URI.
+
+        Returns:
+            str: Content hash.
+        """
+        fs, path = self._resolve(source)
+        info = fs.info(path)
+        for field in CONTENT_HASH_FIELDS:
+            if info.get(field):
+                return f"{field}:{info[field]}"
+
+        stamp = [info.get("size")] + [
+            str(info[field]) for field in MODIFIED_FIELDS if field in info
+        ]
+        index_key = fs.unstrip_protocol(path)
+        with self._lock:
+            entry = self._read_index().get(index_key)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["hash"]
+
+        digest = hashlib.sha256()
+        with fs.open(path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(HASH_CHUNKSIZE), b""):
+                digest.update(chunk)
+        content_hash = f"sha256:{digest.hexdigest()}"
+        with self._lock:
+            index = self._read_index()
+            index[index_key] = {"stamp": stamp, "hash": content_hash}
+            self._write_index(index)
+        return content_hash
+
+    def cache_path(self, source: str, read_kwargs: dict = None) -> str:
+        """Local parquet file of a source, converting it on a miss.
+
+        Args:
+            source (str): Source path or URI.
+            read_kwargs (dict, optional): Passed to the geopandas/pandas
+                                          reader. Part of the cache key.
+
+        Returns:
+            str: Path of the cached parquet file.
+        """
+        read_kwargs = read_kwargs or {}
+        key = hashlib.sha256(
+            json.dumps(
+                {
+                    "content": self.content_hash(source),
+                    "name": os.path.basename(source),
+                    "read_kwargs": read_kwargs,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+        path = os.path.join(self.directory, f"{key}.parquet")
+        if not os.path.exists(path):
+            self._convert(source, path, read_kwargs)
+        return path
+
+    def _convert(self, source: str, path: str, read_kwargs: dict):
+        self._logger.info(f"Converting '{source}' into the dataset cache")
+        fs, source_path = self._resolve(source)
+        with tempfile.TemporaryDirectory(dir=self.directory) as tmp_dir:
+            local_path = os.path.join(tmp_dir, os.path.basename(source_path))
+            fs.get(source_path, local_path)
+            data = _read_source(local_path, read_kwargs)
+
+            tmp_path = os.path.join(tmp_dir, "data.parquet")
+            if (
+                isinstance(data, gpd.GeoDataFrame)
+                and data._geometry_column_name in data
+            ):
+                _sort_spatially(data).to_parquet(
+                    tmp_path,
+                    write_covering_bbox=True,
+                    row_group_size=self.row_group_size,
+                )
+            else:
+                pd.DataFrame(data).to_parquet(
+                    tmp_path, row_group_size=self.row_group_size
+                )
+            os.replace(tmp_path, path)
+
+    def load(
+        self,
+        source: str,
+        columns: list = None,
+        bbox: tuple = None,
+        memory_map: bool = True,
+        read_kwargs: dict = None,
+    ):
+        """Load a dataset through the cache.
+
+        Args:
+            source (str): Source path or URI.
+            columns (list, optional): Columns to read. Defaults to None (all).
+            bbox (tuple, optional): (minx, miny, maxx, maxy) in the dataset
+                                    CRS. Only rows whose bounding box
+                                    intersects it are returned.
+                                    Defaults to None.
+            memory_map (bool, optional): Memory-map the cached file.
+                                         Defaults to True.
+            read_kwargs (dict, optional): Passed to the geopandas/pandas
+                                          reader on conversion.
+
+        Returns:
+            gpd.GeoDataFrame or pd.DataFrame: Dataset, a DataFrame if it
+                                              has no geometry column or
+                                              `columns` excludes it.
+        """
+        path = self.cache_path(source, read_kwargs)
+        metadata = pq.read_schema(path).metadata or {}
+        geo = json.loads(metadata[b"geo"]) if b"geo" in metadata else None
+        geom_col = geo["primary_column"] if geo else None
+
+        projected_out = columns is not None and geom_col not in columns
+        if geom_col is None or projected_out:
+            if bbox is not None:
+                raise ValueError("bbox requires reading the geometry column")
+            return pd.read_parquet(
+                path, columns=columns, memory_map=memory_map
+            )
+        return gpd.read_parquet(
+            path, columns=columns, bbox=bbox, memory_map=memory_map
+        )
+
+    def clear(self):
+        """Remove every cached dataset."""
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith(".parquet") or name == INDEX_FILE_NAME:
+                    os.remove(os.path.join(self.directory, name))
@@ -1,26 +1,174 @@
+import io
 import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 
 import geopandas as gpd
 import pandas as pd
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import shapely
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_batch, execute_values
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import QueuePool
 
+from ..utils.instrumentation import instrument, metrics
 from ..utils.utils import init_logger
+from .query_cache import QueryCache, TABLE_FINGERPRINT_SQL, referenced_tables
+
+DEFAULT_POOL_SIZE = 5
+
+DEFAULT_MAX_OVERFLOW = 10
+
+DEFAULT_POOL_RECYCLE = 3600
+
+DEFAULT_POOL_TIMEOUT = 30
+
+DEFAULT_COPY_CHUNKSIZE = 100_000
+
+DEFAULT_READ_CHUNKSIZE = 50_000
+
+DEFAULT_PAGE_SIZE = 1000
+
+VALUES_PLACEHOLDER_PATTERN = re.compile(r"\bVALUES\s+%s", re.IGNORECASE)
+
+POSITIONAL_PLACEHOLDER_PATTERN = re.compile(r"%%|%s")
+
+ACCEPTED_IF_EXISTS = ["fail", "replace", "append"]
+
+COPY_NULL = "\\N"
+
+
+SRID_COLUMN = "__geom_srid"
+
+
+def _cast_bytea_to_bytes(value, cursor):
+    value = psycopg2.BINARY(value, cursor)
+    return value.tobytes() if value is not None else None
+
+
+# Shapely parses bytes, not the memoryview psycopg2 returns for bytea
+BYTEA_AS_BYTES = psycopg2.extensions.new_type(
+    psycopg2.BINARY.values, "BYTEA_AS_BYTES", _cast_bytea_to_bytes
+)
+
+
+def _postgres_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "DOUBLE PRECISION"
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return "TIMESTAMPTZ"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _table_identifier(table: str) -> sql.Identifier:
+    return sql.Identifier(*table.split("."))
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+class _LazyConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool keeping up to `minconn` idle connections, but
+    opening them on demand instead of all of them on creation."""
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(0, maxconn, *args, **kwargs)
+        self.minconn = int(minconn)
 
 
 class DBClient:
+    """PostgreSQL client sharing one SQLAlchemy engine and one psycopg2
+    connection pool across calls.
+
+    Both pools are created lazily on first use and open connections on
+    demand, keeping up to `pool_size` of them idle. Pool size, overflow,
+    recycle time and timeout (seconds) default to the DB_POOL_SIZE,
+    DB_MAX_OVERFLOW, DB_POOL_RECYCLE and DB_POOL_TIMEOUT env vars. Once
+    `pool_size + max_overflow` connections are checked out, callers block
+    for up to `pool_timeout` seconds waiting for one to be returned, and
+    then raise PoolError. Open `read_sql_iter` generators hold their
+    connection until they are exhausted or closed. Use the client as a
+    context manager or call `close()` to release every connection.
+
+    Pass a `QueryCache` as `query_cache` to reuse `read_sql` results across
+    sessions. Entries are keyed on the normalized query, its parameters and
+    the modification counters of the tables it reads. PostgreSQL flushes
+    those counters asynchronously, so call `query_cache.invalidate` after
+    writes that must be visible immediately (`write_gdf` does it for you).
+
+        Example:
+            >>> with DBClient(pool_size=2) as db_client:
+                    db_client.read_sql('SELECT 1')
+    """
     NO_CURSOR_RESULTS_PATTERN = ["no", "results", "to", "fetch"]
 
-    def __init__(self, host=None, database=None, user=None, password=None):
+    def __init__(
+        self,
+        host=None,
+        database=None,
+        user=None,
+        password=None,
+        pool_size=None,
+        max_overflow=None,
+        pool_recycle=None,
+        pool_timeout=None,
+        query_cache: QueryCache = None,
+    ):
         self._logger = init_logger()
         self.host = host or os.environ.get("DB_HOST")
         self.database = database or os.environ.get("DB_DATABASE")
         self.user = user or os.environ.get("DB_USER")
         self.password = password or os.environ.get("DB_PASSWORD")
+        self.pool_size = (
+            pool_size if pool_size is not None
+            else _env_int("DB_POOL_SIZE", DEFAULT_POOL_SIZE)
+        )
+        self.max_overflow = (
+            max_overflow if max_overflow is not None
+            else _env_int("DB_MAX_OVERFLOW", DEFAULT_MAX_OVERFLOW)
+        )
+        self.pool_recycle = (
+            pool_recycle if pool_recycle is not None
+            else _env_int("DB_POOL_RECYCLE", DEFAULT_POOL_RECYCLE)
+        )
+        self.pool_timeout = (
+            pool_timeout if pool_timeout is not None
+            else _env_int("DB_POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT)
+        )
+        self.query_cache = query_cache
+        self._engine = None
+        self._pool = None
+        self._connection_created_at = {}
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises instead of waiting when exhausted
+        self._pool_slots = threading.BoundedSemaphore(
+            self.pool_size + self.max_overflow
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @property
     def connection(self):
+        """Standalone psycopg2 connection, not managed by the pool.
+        The caller is responsible for closing it."""
         conn = psycopg2.connect(
             host=self.host,
             database=self.database,
@@ -31,58 +179,272 @@ class DBClient:
 
     @property
     def engine(self):
-        return create_engine(
-            "postgresql+psycopg2://"
-            f"{self.user}:{self.password}@"
-            f"{self.host}/{self.database}"
+        if self._engine is None:
+            with self._pool_lock:
+                if self._engine is None:
+                    self._engine = create_engine(
+                        URL.create(
+                            "postgresql+psycopg2",
+                            username=self.user,
+                            password=self.password,
+                            host=self.host,
+                            database=self.database,
+                        ),
+                        poolclass=QueuePool,
+                        pool_size=self.pool_size,
+                        max_overflow=self.max_overflow,
+                        pool_recycle=self.pool_recycle,
+                        pool_timeout=self.pool_timeout,
+                        pool_pre_ping=True,
+                    )
+        return self._engine
+
+    @property
+    def pool(self) -> ThreadedConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = _LazyConnectionPool(
+                        minconn=self.pool_size,
+                        maxconn=self.pool_size + self.max_overflow,
+                        host=self.host,
+                        database=self.database,
+                        user=self.user,
+                        password=self.password,
+                    )
+        return self._pool
+
+    def _acquire_connection(self):
+        if not self._pool_slots.acquire(timeout=self.pool_timeout):
+            raise PoolError(
+                f"No connection available after {self.pool_timeout}s, "
+                f"all {self.pool_size + self.max_overflow} are in use"
+            )
+        try:
+            return self._checkout_connection()
+        except BaseException:
+            self._pool_slots.release()
+            raise
+
+    def _checkout_connection(self):
+        pool = self.pool
+        connection = pool.getconn()
+        created_at = self._connection_created_at.setdefault(
+            id(connection), time.monotonic()
         )
+        expired = (
+            self.pool_recycle is not None
+            and self.pool_recycle >= 0
+            and time.monotonic() - created_at > self.pool_recycle
+        )
+        if connection.closed or expired:
+            self._connection_created_at.pop(id(connection), None)
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+            self._connection_created_at[id(connection)] = time.monotonic()
+        return connection
+
+    def _release_connection(self, connection):
+        try:
+            if self._pool is None or self._pool.closed:
+                connection.close()
+                return
+            if connection.closed:
+                self._connection_created_at.pop(id(connection), None)
+            self._pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            self._pool_slots.release()
 
-    def _get_cursor(self):
-        connection = self.connection
-        return connection.cursor(cursor_factory=RealDictCursor), connection
+    @contextmanager
+    def raw_connection(self):
+        """
+        Borrows a psycopg2 connection from the pool and returns it on exit.
+        Uncommitted work is rolled back if an exception is raised.
+            Example:
+                >>> with db_client.raw_connection() as conn:
+                        conn.cursor().execute('SELECT 1')
+        """
+        connection = self._acquire_connection()
+        try:
+            yield connection
+        except Exception:
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            self._release_connection(connection)
 
-    def run_in_transaction(self, query):
+    def pool_stats(self) -> dict:
+        """
+        Returns usage statistics for the SQLAlchemy and psycopg2 pools.
+        Pools that have not been created yet are reported as None.
+        """
+        engine_stats = None
+        if self._engine is not None:
+            engine_pool = self._engine.pool
+            engine_stats = {
+                "size": engine_pool.size(),
+                "checked_in": engine_pool.checkedin(),
+                "checked_out": engine_pool.checkedout(),
+                "overflow": engine_pool.overflow(),
+            }
+        raw_stats = None
+        if self._pool is not None:
+            raw_stats = {
+                "maxconn": self._pool.maxconn,
+                "in_use": len(self._pool._used),
+                "idle": len(self._pool._pool),
+            }
+        return {"engine": engine_stats, "raw": raw_stats}
+
+    def close(self):
+        """Closes every pooled connection. Pools are re-created on next use.
+        """
+        with self._pool_lock:
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
+            if self._pool is not None:
+                if not self._pool.closed:
+                    self._pool.closeall()
+                self._pool = None
+            self._connection_created_at.clear()
+
+    def run_in_transaction(self, query, params=None):
         """
         Runs a SQL query within a PosgtreSQL transaction
                 Args:
                     query (str): SQL query to be executed.
+                    params (tuple or dict): Query parameters, bound by the
+                                            driver. Default: None
                 Example:
                     >>> db_client.run_in_transaction(
-                        "UPDATE table_name SET column_1 = 'value'"
+                        "UPDATE table_name SET column_1 = %s", ('value',)
                         )
         """
-        cursor, connection = self._get_cursor()
-        cursor.execute(query)
-        try:
-            results = cursor.fetchall()
-        except Exception as e:
-            results = None
-            if not all(
-                msg in str(e) for msg in self.NO_CURSOR_RESULTS_PATTERN
-            ):
-                self._logger.warning(
-                    f"Could not fetch results from cursor: {e}"
-                )
-        connection.commit()
-        cursor.close()
-        connection.close()
+        with metrics.timer("db_run_in_transaction") as timer, \
+                self.raw_connection() as connection:
+            cursor = connection.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(query, params)
+            try:
+                results = cursor.fetchall()
+            except Exception as e:
+                results = None
+                if not all(
+                    msg in str(e) for msg in self.NO_CURSOR_RESULTS_PATTERN
+                ):
+                    self._logger.warning(
+                        f"Could not fetch results from cursor: {e}"
+                    )
+            connection.commit()
+            cursor.close()
+            timer.rows = len(results) if results else 0
         return results
 
     @staticmethod
-    def _sql_format(value):
-        if isinstance(value, str):
-            return "'{}'".format(value)
-        if isinstance(value, bool):
-            return "TRUE" if value else "FALSE"
-        return str(value)
+    def _to_prepared_statement(query):
+        count = 0
 
-    def _row_values_format(self, row_values):
-        return "({})".format(
-            ",".join([self._sql_format(value) for value in row_values])
-        )
+        def replace(match):
+            nonlocal count
+            if match.group(0) == "%%":
+                return "%"
+            count += 1
+            return f"${count}"
+
+        if "%(" in query:
+            raise ValueError(
+                "Prepared statements only support positional %s parameters"
+            )
+        return POSITIONAL_PLACEHOLDER_PATTERN.sub(replace, query), count
+
+    @instrument("db_execute_many", count_rows=False)
+    def execute_many(
+        self,
+        query,
+        rows,
+        page_size=DEFAULT_PAGE_SIZE,
+        template=None,
+        prepared=False,
+    ) -> int:
+        """
+        Executes a SQL statement for many rows using batched round trips
+        within a single transaction.
+        Queries with a single 'VALUES %s' placeholder are sent through
+        psycopg2 execute_values, which packs each page into one multi-row
+        VALUES list. Any other query is run once per row with
+        execute_batch, or through a server-side prepared statement if
+        'prepared' is True.
+            Args:
+                query (str): SQL statement with %s placeholders.
+                rows (iterable): Sequence of row parameter tuples or dicts.
+                page_size (int): Rows sent per round trip.
+                                 Default: DEFAULT_PAGE_SIZE.
+                template (str): Row template for execute_values,
+                                e.g. '(%s, %s::int)'. Default: None.
+                prepared (bool): PREPARE the statement once and EXECUTE it
+                                 for each row. Only positional %s
+                                 parameters are supported. Default: False.
+            Returns:
+                int: Number of rows sent.
+            Example:
+                >>> db_client.execute_many(
+                        "INSERT INTO table_name (id, name) VALUES %s",
+                        [(1, 'a'), (2, 'b')]
+                        )
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.raw_connection() as connection:
+            cursor = connection.cursor()
+            if prepared:
+                statement = f"execute_many_{uuid.uuid4().hex}"
+                prepared_query, n_params = self._to_prepared_statement(query)
+                cursor.execute(f"PREPARE {statement} AS {prepared_query}")
+                try:
+                    execute_batch(
+                        cursor,
+                        f"EXECUTE {statement} "
+                        f"({', '.join(['%s'] * n_params)})"
+                        if n_params
+                        else f"EXECUTE {statement}",
+                        rows,
+                        page_size=page_size,
+                    )
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    # Prepared statements outlive the transaction, so they
+                    # would leak on the pooled connection
+                    if not connection.closed:
+                        cursor.execute(f"DEALLOCATE {statement}")
+            elif VALUES_PLACEHOLDER_PATTERN.search(query):
+                execute_values(
+                    cursor,
+                    query,
+                    rows,
+                    template=template,
+                    page_size=page_size,
+                )
+            else:
+                execute_batch(cursor, query, rows, page_size=page_size)
+            connection.commit()
+            cursor.close()
+        metrics.increment("db_execute_many_rows_total", len(rows))
+        return len(rows)
 
     def read_sql(
-        self, query, geom_col=None, crs="EPSG:4326", parse_dates=None
+        self,
+        query,
+        geom_col=None,
+        crs="EPSG:4326",
+        parse_dates=None,
+        binary_geom=False,
+        params=None,
+        cache=True,
+        cache_tables=None,
     ) -> gpd.GeoDataFrame:
         """
         Reads the output from a SQL query and returns a Geopandas GeoDataFrame
@@ -97,22 +459,397 @@ class DBClient:
                               Default: 'EPSG:4326'
                 parse_dates (list or dict): List of date column names.
                                 Default None
+                binary_geom (bool): Transfer the geometry column as WKB
+                                    bytes (ST_AsBinary) and parse it with
+                                    vectorized shapely.from_wkb. The CRS is
+                                    inferred from the geometry SRID when it
+                                    is set, falling back to 'crs'.
+                                    Used in combination with 'geom_col'.
+                                    Default: False
+                params (list or dict): Query parameters, passed to the
+                                       driver. Default: None
+                cache (bool): Use the client query cache, if configured.
+                              Default: True
+                cache_tables (list): Tables whose modification counters are
+                                     part of the cache key. If None, they
+                                     are parsed from the FROM/JOIN clauses.
+                                     The result is not cached when none of
+                                     them is an existing table (e.g.
+                                     set-returning functions) or when any
+                                     of them has no modification counters
+                                     (e.g. views).
+                                     Default: None
             Example:
                 >>> db_client.read_sql('SELECT * FROM my_table')
         """
+        if cache is not True or self.query_cache is None:
+            return self._read_sql(
+                query, geom_col, crs, parse_dates, binary_geom, params
+            )
+
+        fingerprint = self.table_fingerprint(
+            cache_tables or referenced_tables(query)
+        )
+        untracked = [
+            table for table, *_, tracked in fingerprint if not tracked
+        ]
+        if untracked or (not fingerprint and cache_tables is None):
+            # Nothing would ever invalidate the entry
+            self._logger.warning(
+                "Not caching query result: "
+                + (
+                    f"no modification counters for {', '.join(untracked)}, "
+                    "pass its base tables as cache_tables to cache it"
+                    if untracked
+                    else "no source table found, "
+                    "pass cache_tables to cache it"
+                )
+            )
+            return self._read_sql(
+                query, geom_col, crs, parse_dates, binary_geom, params
+            )
+        key = self.query_cache.make_key(
+            query,
+            params=params,
+            fingerprint=fingerprint,
+            geom_col=geom_col,
+            crs=crs,
+            parse_dates=parse_dates,
+            binary_geom=binary_geom,
+        )
+        result = self.query_cache.get(key)
+        metrics.record_cache("db_query", result is not None)
+        if result is not None:
+            self._logger.info("Returning cached query result")
+            return result
+        result = self._read_sql(
+            query, geom_col, crs, parse_dates, binary_geom, params
+        )
+        try:
+            self.query_cache.set(
+                key, result, tables=[table for table, *_ in fingerprint]
+            )
+        except Exception as e:
+            # The query itself succeeded, only caching it failed
+            self._logger.warning(f"Could not cache query result: {e}")
+        return result
+
+    def table_fingerprint(self, tables) -> list:
+        """
+        Returns a cheap version marker for each existing table: its oid,
+        relfilenode and insert/update/delete counters from
+        pg_stat_user_tables. Names that are not relations are ignored.
+        Relations without counters (e.g. views) are returned with
+        tracked False.
+            Args:
+                tables (list): Table names, optionally schema-qualified.
+            Returns:
+                list: (table, oid, relfilenode, n_tup_ins, n_tup_upd,
+                       n_tup_del, tracked) tuples sorted by table name.
+        """
+        if not tables:
+            return []
+        with self.raw_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(TABLE_FINGERPRINT_SQL, (list(tables),))
+            fingerprint = [tuple(row) for row in cursor.fetchall()]
+            connection.commit()
+            cursor.close()
+        return fingerprint
+
+    @instrument("db_read_sql")
+    def _read_sql(
+        self,
+        query,
+        geom_col=None,
+        crs="EPSG:4326",
+        parse_dates=None,
+        binary_geom=False,
+        params=None,
+    ):
+        if geom_col and binary_geom:
+            return self._read_sql_binary(
+                query,
+                geom_col=geom_col,
+                crs=crs,
+                parse_dates=parse_dates,
+                params=params,
+            )
         if geom_col:
             return gpd.GeoDataFrame.from_postgis(
                 sql=query,
                 con=self.engine,
                 geom_col=geom_col,
                 crs=crs,
-                parse_dates=None
+                parse_dates=None,
+                params=params,
             )
         else:
             return gpd.GeoDataFrame(
                 pd.read_sql(
                     sql=query,
                     con=self.engine,
-                    parse_dates=parse_dates
+                    parse_dates=parse_dates,
+                    params=params,
+                )
+            )
+
+    def _read_sql_binary(
+        self, query, geom_col, crs, parse_dates=None, params=None
+    ):
+        subquery = sql.SQL(query.strip().rstrip(";"))
+        with self.raw_connection() as connection:
+            cursor = connection.cursor()
+            psycopg2.extensions.register_type(BYTEA_AS_BYTES, cursor)
+            cursor.execute(
+                sql.SQL("SELECT * FROM ({}) AS q LIMIT 0").format(subquery),
+                params,
+            )
+            columns = [desc.name for desc in cursor.description]
+            if geom_col not in columns:
+                raise ValueError(
+                    f"Column '{geom_col}' not found in query output"
+                )
+            select_list = [
+                sql.SQL("ST_AsBinary(q.{col}) AS {col}").format(
+                    col=sql.Identifier(col)
                 )
+                if col == geom_col
+                else sql.SQL("q.{}").format(sql.Identifier(col))
+                for col in columns
+            ] + [
+                sql.SQL("ST_SRID(q.{}) AS {}").format(
+                    sql.Identifier(geom_col), sql.Identifier(SRID_COLUMN)
+                )
+            ]
+            cursor.execute(
+                sql.SQL("SELECT {} FROM ({}) AS q").format(
+                    sql.SQL(", ").join(select_list), subquery
+                ),
+                params,
+            )
+            rows = cursor.fetchall()
+            connection.commit()
+            cursor.close()
+
+        if metrics.enabled:
+            geom_idx = columns.index(geom_col)
+            metrics.increment(
+                "db_read_sql_bytes_total",
+                sum(len(row[geom_idx] or b"") for row in rows),
             )
+        gdf = self._set_crs_from_srid(
+            self._rows_to_gdf(
+                rows, columns + [SRID_COLUMN], geom_col=geom_col, crs=None
+            ),
+            crs,
+        )
+        for col in parse_dates or []:
+            gdf[col] = pd.to_datetime(gdf[col])
+        return gdf
+
+    @staticmethod
+    def _set_crs_from_srid(gdf, crs):
+        # ST_SRID is 0 (or NULL) for geometries without one
+        srids = gdf.pop(SRID_COLUMN).dropna()
+        srids = srids[srids > 0]
+        srid = int(srids.iloc[0]) if len(srids) else 0
+        return gdf.set_crs(f"EPSG:{srid}" if srid else crs)
+
+    @staticmethod
+    def _rows_to_gdf(rows, columns, geom_col=None, crs="EPSG:4326"):
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        if not geom_col:
+            return gpd.GeoDataFrame(df)
+        df[geom_col] = gpd.GeoSeries(
+            shapely.from_wkb(df[geom_col].to_numpy(), on_invalid="warn"),
+            index=df.index,
+        )
+        return gpd.GeoDataFrame(df, geometry=geom_col, crs=crs)
+
+    def read_sql_iter(
+        self,
+        query,
+        chunksize=DEFAULT_READ_CHUNKSIZE,
+        geom_col=None,
+        crs="EPSG:4326",
+        params=None,
+    ):
+        """
+        Reads the output from a SQL query in batches using a server-side
+        cursor, so only one chunk is held in client memory at a time.
+            Args:
+                query (str): SQL query to be executed.
+                chunksize (int): Rows per batch.
+                                 Default: DEFAULT_READ_CHUNKSIZE.
+                geom_col (string): Geometry column from the output table,
+                                   parsed from WKB on each batch.
+                                   If None, standard DataFrames are yielded.
+                                   Default: None.
+                crs (string): Coordinate Reference System to use
+                              for the GeoDataFrame batches.
+                              Default: 'EPSG:4326'
+                params (list or dict): Query parameters, passed to the
+                                       driver. Default: None
+            Yields:
+                gpd.GeoDataFrame: Batch of at most `chunksize` rows.
+            Example:
+                >>> for batch in db_client.read_sql_iter(
+                        'SELECT * FROM my_table', geom_col='geometry'
+                        ):
+                        total += len(batch)
+        """
+        with self.raw_connection() as connection:
+            cursor = connection.cursor(
+                name=f"read_sql_iter_{uuid.uuid4().hex}"
+            )
+            cursor.itersize = chunksize
+            try:
+                cursor.execute(query, params)
+                columns = None
+                while True:
+                    rows = cursor.fetchmany(chunksize)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [desc.name for desc in cursor.description]
+                    metrics.increment("db_read_sql_iter_rows_total", len(rows))
+                    yield self._rows_to_gdf(rows, columns, geom_col, crs)
+            finally:
+                cursor.close()
+                connection.rollback()
+
+    def _table_exists(self, cursor, table: str) -> bool:
+        # Quoted like the DDL, so mixed-case names are not folded
+        cursor.execute(
+            "SELECT to_regclass(%s) IS NOT NULL AS exists",
+            (_table_identifier(table).as_string(cursor),),
+        )
+        return cursor.fetchone()[0]
+
+    def _create_table_sql(self, gdf, table, geom_col, srid):
+        columns = [
+            sql.SQL("{} {}").format(
+                sql.Identifier(col),
+                sql.SQL(
+                    f"geometry(Geometry, {srid})"
+                    if col == geom_col
+                    else _postgres_type(dtype)
+                ),
+            )
+            for col, dtype in gdf.dtypes.items()
+        ]
+        return sql.SQL("CREATE TABLE {} ({})").format(
+            _table_identifier(table), sql.SQL(", ").join(columns)
+        )
+
+    @staticmethod
+    def _copy_chunk_buffer(chunk, geom_col, srid) -> io.StringIO:
+        geoms = shapely.set_srid(chunk[geom_col].values, srid)
+        chunk = pd.DataFrame(chunk).assign(
+            **{geom_col: shapely.to_wkb(geoms, hex=True, include_srid=True)}
+        )
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, header=False, index=False, na_rep=COPY_NULL)
+        buffer.seek(0)
+        return buffer
+
+    def write_gdf(
+        self,
+        gdf: gpd.GeoDataFrame,
+        table: str,
+        if_exists: str = "fail",
+        srid: int = None,
+        chunksize: int = DEFAULT_COPY_CHUNKSIZE,
+        create_index: bool = True,
+        analyze: bool = True,
+    ) -> int:
+        """
+        Bulk loads a GeoDataFrame into a PostGIS table using COPY FROM STDIN.
+        Geometries are sent as hex EWKB and rows are streamed in chunks
+        within a single transaction.
+            Args:
+                gdf (gpd.GeoDataFrame): GeoDataFrame to be loaded.
+                table (str): Target table name, optionally schema-qualified.
+                if_exists (str): 'fail', 'replace' or 'append'.
+                                 Default: 'fail'.
+                srid (int): SRID of the geometry column. If None, it is
+                            taken from the GeoDataFrame CRS. Default: None.
+                chunksize (int): Rows sent per COPY call.
+                                 Default: DEFAULT_COPY_CHUNKSIZE.
+                create_index (bool): Create a GIST index on the geometry
+                                     column. Default: True.
+                analyze (bool): Run ANALYZE after the load. Default: True.
+            Returns:
+                int: Number of rows written.
+            Example:
+                >>> db_client.write_gdf(
+                        accidentes_gdf, 'accidentes_bicicletas',
+                        if_exists='replace'
+                        )
+        """
+        if if_exists not in ACCEPTED_IF_EXISTS:
+            raise ValueError(
+                f"Invalid if_exists value. Must be one of {ACCEPTED_IF_EXISTS}"
+            )
+        geom_col = gdf.geometry.name
+        if srid is None:
+            srid = (gdf.crs.to_epsg() if gdf.crs is not None else None) or 0
+        table_id = _table_identifier(table)
+
+        with metrics.timer("db_write_gdf") as timer, \
+                self.raw_connection() as connection:
+            cursor = connection.cursor()
+            exists = self._table_exists(cursor, table)
+            if exists and if_exists == "fail":
+                raise ValueError(f"Table '{table}' already exists")
+            if exists and if_exists == "replace":
+                cursor.execute(
+                    sql.SQL("DROP TABLE {}").format(table_id)
+                )
+            if not exists or if_exists == "replace":
+                cursor.execute(
+                    self._create_table_sql(gdf, table, geom_col, srid)
+                )
+
+            copy_sql = sql.SQL(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {})"
+            ).format(
+                table_id,
+                sql.SQL(", ").join(map(sql.Identifier, gdf.columns)),
+                sql.Literal(COPY_NULL),
+            ).as_string(connection)
+            copied_bytes = 0
+            for start in range(0, len(gdf), chunksize):
+                chunk = gdf.iloc[start:start + chunksize]
+                buffer = self._copy_chunk_buffer(chunk, geom_col, srid)
+                if metrics.enabled:
+                    copied_bytes += buffer.seek(0, io.SEEK_END)
+                    buffer.seek(0)
+                cursor.copy_expert(copy_sql, buffer)
+                self._logger.info(
+                    f"Copied {start + len(chunk)}/{len(gdf)} rows "
+                    f"into '{table}'"
+                )
+            timer.rows, timer.bytes = len(gdf), copied_bytes
+
+            if create_index:
+                cursor.execute(
+                    sql.SQL(
+                        "CREATE INDEX IF NOT EXISTS {} ON {} USING GIST ({})"
+                    ).format(
+                        sql.Identifier(
+                            f"{table.split('.')[-1]}_{geom_col}_idx"
+                        ),
+                        table_id,
+                        sql.Identifier(geom_col),
+                    )
+                )
+            connection.commit()
+            if analyze:
+                cursor.execute(sql.SQL("ANALYZE {}").format(table_id))
+                connection.commit()
+            cursor.close()
+        if self.query_cache is not None:
+            self.query_cache.invalidate(table=table)
+        return len(gdf)
@@ -0,0 +1,334 @@
+import hashlib
+import json
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..utils.utils import (
+    init_logger,
+    wrap_incremental_refresh_sql,
+    wrap_replace_rows_sql,
+    wrap_swap_table_sql,
+)
+from .query_cache import referenced_tables
+
+DEFAULT_STATE_TABLE = "materialization_state"
+
+DEFAULT_MAX_WORKERS = 4
+
+BUILT = "built"
+REFRESHED = "refreshed"
+SKIPPED = "skipped"
+FAILED = "failed"
+UPSTREAM_FAILED = "upstream_failed"
+
+# Views (rewrite rules) of other relations referencing a table
+DEPENDENT_VIEWS_SQL = """
+    SELECT EXISTS (
+        SELECT 1
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.refobjid = to_regclass(%s) AND r.ev_class <> d.refobjid
+    ) AS exists
+"""
+
+
+class DerivedTable:
+    """Declaration of a table materialized from a SQL query.
+
+    Args:
+        name (str): Table name, optionally schema-qualified.
+        sql (str): Query producing the table contents.
+        depends_on (list, optional): Names of other derived tables read by
+                                     `sql`. Defaults to None.
+        sources (list, optional): Base tables read by `sql`. If None, they
+                                  are parsed from its FROM/JOIN clauses.
+        keys (list, optional): Columns identifying a row. They are indexed
+                               and used to replace updated rows on
+                               incremental refreshes. Defaults to None.
+        watermark_column (str, optional): Monotonically increasing column.
+                                          When set, existing tables are
+                                          refreshed by inserting only rows
+                                          newer than its maximum.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sql: str,
+        depends_on: list = None,
+        sources: list = None,
+        keys: list = None,
+        watermark_column: str = None,
+    ):
+        self.name = name
+        self.sql = sql
+        self.depends_on = list(depends_on or [])
+        self.sources = (
+            list(sources) if sources is not None else referenced_tables(sql)
+        )
+        self.keys = list(keys or [])
+        self.watermark_column = watermark_column
+
+    def __repr__(self):
+        return f"DerivedTable(name={self.name!r})"
+
+
+class MaterializationPipeline:
+    """Builds derived tables in dependency order.
+
+    Tables whose dependencies are satisfied are built concurrently, up to
+    `max_workers` at a time. Full builds go into a temporary table that is
+    swapped in atomically, keeping its privileges. Tables with dependent
+    views have their rows replaced in place instead, as the views would
+    prevent dropping the previous version. Tables with a watermark column
+    are refreshed incrementally once they exist. A table is skipped when
+    its SQL and the modification counters of its inputs match the last
+    successful run, which are recorded in `state_table`.
+
+    Args:
+        db_client (DBClient): Database client.
+        tables (list, optional): Derived tables. Defaults to None.
+        max_workers (int, optional): Concurrent builds.
+                                     Defaults to DEFAULT_MAX_WORKERS.
+        state_table (str, optional): Table storing run signatures.
+                                     Defaults to DEFAULT_STATE_TABLE.
+
+    Example:
+        >>> pipeline = MaterializationPipeline(db_client, [
+                DerivedTable('accidentes_carril', sql_query),
+                DerivedTable('accidentes_por_carril', agg_query,
+                             depends_on=['accidentes_carril']),
+            ])
+        >>> pipeline.run()
+    """
+
+    def __init__(
+        self,
+        db_client,
+        tables: list = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        state_table: str = DEFAULT_STATE_TABLE,
+    ):
+        self._logger = init_logger()
+        self.db_client = db_client
+        self.max_workers = max_workers
+        self.state_table = state_table
+        self.tables = {}
+        for table in tables or []:
+            self.add(table)
+
+    def add(self, table: DerivedTable):
+        if table.name in self.tables:
+            raise ValueError(f"Table '{table.name}' is already declared")
+        self.tables[table.name] = table
+
+    def build_order(self) -> list:
+        """Group the declared tables in dependency levels.
+
+        Returns:
+            list: Lists of table names; each level only depends on
+                  previous ones.
+
+        Raises:
+            ValueError: If a dependency is undeclared or there is a cycle.
+        """
+        pending = {}
+        for name, table in self.tables.items():
+            missing = set(table.depends_on) - set(self.tables)
+            if missing:
+                raise ValueError(
+                    f"Table '{name}' depends on undeclared tables {missing}"
+                )
+            pending[name] = set(table.depends_on)
+
+        levels = []
+        while pending:
+            ready = sorted(name for name, deps in pending.items() if not deps)
+            if not ready:
+                raise ValueError(
+                    f"Dependency cycle between tables {sorted(pending)}"
+                )
+            levels.append(ready)
+            for name in ready:
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return levels
+
+    def _ensure_state_table(self):
+        self.db_client.run_in_transaction(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.state_table} (
+                table_name TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+
+    def _stored_signatures(self) -> dict:
+        rows = self.db_client.run_in_transaction(
+            f"SELECT table_name, signature FROM {self.state_table}"
+        )
+        return {row["table_name"]: row["signature"] for row in rows or []}
+
+    def _signature(self, table: DerivedTable) -> str:
+        inputs = sorted(set(table.sources) | set(table.depends_on))
+        payload = json.dumps(
+            {
+                "sql": " ".join(table.sql.split()),
+                "keys": table.keys,
+                "watermark_column": table.watermark_column,
+                "inputs": self.db_client.table_fingerprint(inputs),
+            },
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _table_exists(self, name: str) -> bool:
+        rows = self.db_client.run_in_transaction(
+            "SELECT to_regclass(%s) IS NOT NULL AS exists", (name,)
+        )
+        return rows[0]["exists"]
+
+    def _has_dependent_views(self, name: str) -> bool:
+        rows = self.db_client.run_in_transaction(
+            DEPENDENT_VIEWS_SQL, (name,)
+        )
+        return rows[0]["exists"]
+
+    def _build(self, table: DerivedTable, full_refresh: bool) -> str:
+        incremental = (
+            table.watermark_column is not None
+            and not full_refresh
+            and self._table_exists(table.name)
+        )
+        if incremental:
+            self._logger.info(f"Refreshing '{table.name}' incrementally")
+            self.db_client.run_in_transaction(
+                wrap_incremental_refresh_sql(
+                    table.name,
+                    table.sql,
+                    table.watermark_column,
+                    keys=table.keys,
+                )
+            )
+            return REFRESHED
+
+        if self._has_dependent_views(table.name):
+            # The swap cannot drop the previous version under the views
+            self._logger.info(f"Rebuilding '{table.name}' in place")
+            self.db_client.run_in_transaction(
+                wrap_replace_rows_sql(table.name, table.sql)
+            )
+            return BUILT
+
+        self._logger.info(f"Building '{table.name}'")
+        self.db_client.run_in_transaction(
+            wrap_swap_table_sql(
+                table.name,
+                table.sql,
+                build_id=uuid.uuid4().hex[:8],
+                index_columns=table.keys,
+            )
+        )
+        return BUILT
+
+    def _record(self, table: DerivedTable, signature: str):
+        self.db_client.run_in_transaction(
+            f"""
+            INSERT INTO {self.state_table} (table_name, signature)
+            VALUES (%s, %s)
+            ON CONFLICT (table_name) DO UPDATE
+            SET signature = EXCLUDED.signature, refreshed_at = now()
+            """,
+            (table.name, signature),
+        )
+
+    def _run_table(
+        self,
+        table: DerivedTable,
+        stored_signature: str,
+        upstream_changed: bool,
+        full_refresh: bool,
+    ) -> str:
+        # Computed before building, so changes made meanwhile trigger a
+        # rebuild on the next run
+        signature = self._signature(table)
+        if (
+            not full_refresh
+            and not upstream_changed
+            and stored_signature == signature
+        ):
+            self._logger.info(f"Skipping '{table.name}', inputs unchanged")
+            return SKIPPED
+        status = self._build(table, full_refresh)
+        self._record(table, signature)
+        if self.db_client.query_cache is not None:
+            self.db_client.query_cache.invalidate(table=table.name)
+        return status
+
+    def run(self, tables: list = None, full_refresh: bool = False) -> dict:
+        """Build or refresh the declared tables.
+
+        Args:
+            tables (list, optional): Only run these tables (their
+                                     dependencies must be up to date).
+                                     Defaults to None (all tables).
+            full_refresh (bool, optional): Rebuild every table from scratch,
+                                           ignoring watermarks and stored
+                                           signatures. Defaults to False.
+
+        Returns:
+            dict: Status per table name: 'built', 'refreshed', 'skipped',
+                  'failed' or 'upstream_failed'.
+        """
+        levels = self.build_order()
+        selected = set(tables) if tables is not None else set(self.tables)
+        self._ensure_state_table()
+        stored = self._stored_signatures()
+
+        statuses = {}
+        remaining = [name for level in levels for name in level]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                for name in list(remaining):
+                    table = self.tables[name]
+                    deps = table.depends_on
+                    if any(dep not in statuses for dep in deps):
+                        continue
+                    remaining.remove(name)
+                    if any(
+                        statuses[dep] in (FAILED, UPSTREAM_FAILED)
+                        for dep in deps
+                    ):
+                        statuses[name] = UPSTREAM_FAILED
+                        continue
+                    if name not in selected:
+                        statuses[name] = SKIPPED
+                        continue
+                    upstream_changed = any(
+                        statuses[dep] in (BUILT, REFRESHED) for dep in deps
+                    )
+                    future = executor.submit(
+                        self._run_table,
+                        table,
+                        stored.get(name),
+                        upstream_changed,
+                        full_refresh,
+                    )
+                    running[future] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        statuses[name] = future.result()
+                    except Exception as e:
+                        self._logger.error(
+                            f"Some error occurred building '{name}': {e}"
+                        )
+                        statuses[name] = FAILED
+        return statuses
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from ..utils.utils import init_logger
+
+DEFAULT_QUERY_CACHE_MAX_BYTES = 1024 ** 3
+
+FROM_JOIN_PATTERN = re.compile(r"\b(?:FROM|JOIN)\b", re.IGNORECASE)
+
+IDENTIFIER = r'(?:"(?:[^"]|"")+"|\w+)'
+
+RELATION_PATTERN = re.compile(
+    rf"\s*({IDENTIFIER})(?:\s*\.\s*({IDENTIFIER}))?"
+)
+
+LATERAL_PATTERN = re.compile(r"\s*(?:LATERAL\b)?", re.IGNORECASE)
+
+ALIAS_PATTERN = re.compile(rf"\s*(?:AS\s+)?({IDENTIFIER})", re.IGNORECASE)
+
+# Words that can follow a FROM item and must not be read as its alias
+NON_ALIAS_KEYWORDS = {
+    "where", "group", "having", "order", "limit", "offset", "fetch",
+    "window", "union", "intersect", "except", "join", "inner", "left",
+    "right", "full", "cross", "natural", "on", "using", "for", "lateral",
+    "tablesample", "returning", "with", "set",
+}
+
+TABLE_FINGERPRINT_SQL = """
+    SELECT c.oid::regclass::text AS table_name,
+           c.oid::bigint AS oid,
+           c.relfilenode::bigint AS relfilenode,
+           COALESCE(s.n_tup_ins, 0) AS n_tup_ins,
+           COALESCE(s.n_tup_upd, 0) AS n_tup_upd,
+           COALESCE(s.n_tup_del, 0) AS n_tup_del,
+           s.relid IS NOT NULL AS tracked
+    FROM unnest(%s::text[]) AS t(name)
+    JOIN pg_class c ON c.oid = to_regclass(t.name)
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    ORDER BY 1
+"""
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and trailing semicolons in a SQL query.
+
+    Args:
+        query (str): SQL query.
+
+    Returns:
+        str: Normalized query.
+    """
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def _skip_parentheses(query: str, pos: int) -> int:
+    """Position after the parenthesized group starting at `pos`"""
+    depth = 0
+    for i in range(pos, len(query)):
+        if query[i] == "(":
+            depth += 1
+        elif query[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(query)
+
+
+def _from_items(query: str, pos: int):
+    """Relation names of the comma-separated FROM items starting at `pos`"""
+    while True:
+        pos = LATERAL_PATTERN.match(query, pos).end()
+        if query[pos:].lstrip().startswith("("):
+            # Subquery or VALUES list, its own FROM clauses are scanned
+            pos = _skip_parentheses(query, query.index("(", pos))
+        else:
+            match = RELATION_PATTERN.match(query, pos)
+            if match is None or match.group(1).lower() in NON_ALIAS_KEYWORDS:
+                return
+            pos = match.end()
+            if query[pos:].lstrip().startswith("("):
+                # Set-returning function call
+                pos = _skip_parentheses(query, query.index("(", pos))
+            else:
+                yield ".".join(name for name in match.groups() if name)
+        alias = ALIAS_PATTERN.match(query, pos)
+        if alias and alias.group(1).lower() not in NON_ALIAS_KEYWORDS:
+            pos = alias.end()
+            if query[pos:].lstrip().startswith("("):
+                # Column aliases, e.g. AS t(a, b)
+                pos = _skip_parentheses(query, query.index("(", pos))
+        if not query[pos:].lstrip().startswith(","):
+            return
+        pos = query.index(",", pos) + 1
+
+
+def referenced_tables(query: str) -> list:
+    """Extract the relation names in the FROM/JOIN clauses of a SQL query.
+
+    Every comma-separated FROM item is included, e.g. both tables of
+    `FROM a, b`. Names that are not tables (e.g. CTEs) are filtered out
+    later when resolving them in the database.
+
+    Args:
+        query (str): SQL query.
+
+    Returns:
+        list: Sorted, deduplicated relation names.
+    """
+    tables = set()
+    for match in FROM_JOIN_PATTERN.finditer(query):
+        tables.update(_from_items(query, match.end()))
+    return sorted(tables)
+
+
+class QueryCache:
+    """On-disk cache of query results stored as (Geo)Parquet files.
+
+    Each entry is a parquet file plus a JSON sidecar holding the tables it
+    was computed from. Once the directory grows past `max_bytes`, the least
+    recently read entries are evicted.
+
+    Args:
+        directory (str): Directory where results are stored.
+        max_bytes (int, optional): Maximum cache size in bytes.
+                                   Defaults to DEFAULT_QUERY_CACHE_MAX_BYTES.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = DEFAULT_QUERY_CACHE_MAX_BYTES
+    ):
+        self._logger = init_logger()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(query: str, params=None, fingerprint=None, **options) -> str:
+        payload = json.dumps(
+            {
+                "query": normalize_query(query),
+                "params": params,
+                "fingerprint": fingerprint,
+                "options": options,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _data_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str):
+        """Read a cached result.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            gpd.GeoDataFrame: Cached result, or None on a miss.
+        """
+        import geopandas as gpd
+        import pandas as pd
+
+        with self._lock:
+            try:
+                with open(self._meta_path(key)) as fp:
+                    meta = json.load(fp)
+                if meta.get("geom_col"):
+                    result = gpd.read_parquet(self._data_path(key))
+                else:
+                    result = gpd.GeoDataFrame(
+                        pd.read_parquet(self._data_path(key))
+                    )
+            except (FileNotFoundError, ValueError) as e:
+                if not isinstance(e, FileNotFoundError):
+                    self._logger.warning(f"Dropping unreadable entry: {e}")
+                    self._delete(key)
+                return None
+            now = time.time()
+            os.utime(self._data_path(key), (now, now))
+            return result
+
+    def set(self, key: str, result, tables: list = None):
+        """Store a query result.
+
+        Args:
+            key (str): Cache key.
+            result (gpd.GeoDataFrame or pd.DataFrame): Query result.
+            tables (list, optional): Tables the result depends on,
+                                     used by `invalidate`. Defaults to None.
+
+        Raises:
+            Exception: When the result cannot be written (e.g. object
+                       columns with mixed types), no entry is stored.
+        """
+        import geopandas as gpd
+        import pandas as pd
+
+        geom_col = (
+            result.geometry.name
+            if isinstance(result, gpd.GeoDataFrame)
+            and result._geometry_column_name is not None
+            else None
+        )
+        with self._lock:
+            try:
+                if geom_col:
+                    result.to_parquet(self._data_path(key))
+                else:
+                    pd.DataFrame(result).to_parquet(self._data_path(key))
+                with open(self._meta_path(key), "w") as fp:
+                    json.dump(
+                        {"tables": tables or [], "geom_col": geom_col}, fp
+                    )
+            except Exception:
+                # Do not leave a partially written entry behind
+                self._delete(key)
+                raise
+            self._evict()
+
+    def _delete(self, key: str):
+        for path in (self._data_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _entries(self) -> list:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".parquet"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name[:-8]))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.max_bytes:
+            _, size, key = entries.pop(0)
+            self._delete(key)
+            total -= size
+
+    def invalidate(self, key: str = None, table: str = None):
+        """Remove cached results.
+
+        Args:
+            key (str, optional): Remove the entry with this key.
+            table (str, optional): Remove every entry depending on this
+                                   table (matched case-insensitively,
+                                   ignoring quotes and schema).
+        """
+        with self._lock:
+            if key is not None:
+                self._delete(key)
+            if table is not None:
+                target = table.replace('"', "").split(".")[-1].lower()
+                for _, _, entry_key in self._entries():
+                    try:
+                        with open(self._meta_path(entry_key)) as fp:
+                            tables = json.load(fp)["tables"]
+                    except (FileNotFoundError, ValueError, KeyError):
+                        tables = []
+                    names = {
+                        t.replace('"', "").split(".")[-1].lower()
+                        for t in tables
+                    }
+                    if target in names:
+                        self._delete(entry_key)
+
+    def clear(self):
+        """Remove every cached result."""
+        with self._lock:
+            for _, _, key in self._entries():
+                self._delete(key)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
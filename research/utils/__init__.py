@@ -1,2 +1,2 @@
-import imp
-from .utils import safe_run, wrap_materialize_table_sql
\ No newline at end of file
+from .instrumentation import instrument, metrics
+from .utils import safe_run, wrap_materialize_table_sql
@@ -0,0 +1,245 @@
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+MISSING = object()
+
+DEFAULT_LRU_MAXSIZE = 10_000
+
+
+def normalize_address(name: str) -> str:
+    """Normalize an address so equivalent spellings share a cache entry.
+
+    Args:
+        name (str): Address to normalize.
+
+    Returns:
+        str: Lowercased address with collapsed whitespace.
+    """
+    return " ".join(str(name).lower().split())
+
+
+def make_cache_key(name: str, provider: str) -> str:
+    """Build a cache key from an address and its geocoding provider.
+
+    Args:
+        name (str): Address to geocode.
+        provider (str): Geocoding provider name.
+
+    Returns:
+        str: Cache key.
+    """
+    return f"{provider}|{normalize_address(name)}"
+
+
+class BaseCache(ABC):
+    """Key/value cache interface with optional per-entry expiration.
+
+    Subclasses implement `_get`, `_set`, `_delete` and `clear`. Values are
+    stored alongside an absolute expiration timestamp (or None).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def _get(self, key: str):
+        """Return the (value, expires_at) entry of a key, or None."""
+
+    @abstractmethod
+    def _set(self, key: str, value, expires_at: float):
+        """Store a (value, expires_at) entry."""
+
+    @abstractmethod
+    def _delete(self, key: str):
+        """Remove a key, if present."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every entry."""
+
+    def _lookup(self, key: str):
+        entry = self._get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._delete(key)
+            return MISSING
+        return value
+
+    def get(self, key: str, default=MISSING):
+        """Fetch a value from the cache.
+
+        Args:
+            key (str): Cache key.
+            default (optional): Value returned on a miss. Defaults to MISSING.
+
+        Returns:
+            Cached value, or `default` if absent or expired.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        """Store a value in the cache.
+
+        Args:
+            key (str): Cache key.
+            value: Value to store. None is a valid (negative) value.
+            ttl (float, optional): Time to live in seconds.
+                                   Defaults to None (never expires).
+        """
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._set(key, value, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._delete(key)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __contains__(self, key: str) -> bool:
+        # Membership checks are not lookups, so they skip the hit counters
+        with self._lock:
+            return self._lookup(key) is not MISSING
+
+
+class LRUCache(BaseCache):
+    """In-memory cache bounded to `maxsize` entries with LRU eviction."""
+
+    def __init__(self, maxsize: int = DEFAULT_LRU_MAXSIZE):
+        super().__init__()
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("maxsize needs to be higher than 0")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def _get(self, key: str):
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def _set(self, key: str, value, expires_at: float):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(BaseCache):
+    """Persistent cache backed by a SQLite file.
+
+    Values are pickled, so any picklable object (e.g. shapely geometries)
+    can be stored. When `maxsize` is set, the least recently accessed
+    entries are evicted once the table grows past it.
+    """
+
+    def __init__(self, path: str, maxsize: int = None):
+        super().__init__()
+        self.path = path
+        self.maxsize = maxsize
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                expires_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed_at_idx "
+            "ON cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def _get(self, key: str):
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self.maxsize is not None:
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+        return pickle.loads(row[0]), row[1]
+
+    def _set(self, key: str, value, expires_at: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value), expires_at, time.time()),
+        )
+        if self.maxsize is not None:
+            self._conn.execute(
+                """
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache
+                    ORDER BY accessed_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.maxsize,),
+            )
+        self._conn.commit()
+
+    def _delete(self, key: str):
+        self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Remove every expired entry from the cache file."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL "
+                "AND expires_at <= ?",
+                (time.time(),),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM cache"
+            ).fetchone()[0]
@@ -1,53 +1,291 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable
+
+import geopandas as gpd
+import pandas as pd
+
+from .cache import (
+    DEFAULT_LRU_MAXSIZE,
+    MISSING,
+    BaseCache,
+    LRUCache,
+    SQLiteCache,
+    make_cache_key,
+)
+from .instrumentation import metrics
 from .utils import init_logger
 from geopandas.tools import geocode
 from shapely.geometry.point import Point
 
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60
+
+DEFAULT_MAX_WORKERS = 8
+
+DEFAULT_MAX_RETRIES = 3
+
+DEFAULT_BACKOFF = 0.5
+
+# Requests per second allowed by each provider's usage policy
+DEFAULT_RATE_LIMITS = {
+    "Nominatim": 1.0,
+    "Photon": 5.0,
+    "GoogleV3": 50.0,
+}
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at least `1 / rate` seconds apart.
+
+    Args:
+        rate (float): Maximum calls per second. None or 0 disables it.
+    """
+
+    def __init__(self, rate: float = None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_call = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
 
 class Geocoder:
     """Geocoder class to geocode addresses using geopandas.
+
+    Results are cached by normalized address and provider. By default an
+    in-memory LRU cache of `cache_size` entries is used; pass `cache_path`
+    to persist results in a SQLite file, or `cache` to plug in any
+    `BaseCache` backend. Addresses the provider could not find are cached
+    as None for `negative_ttl` seconds so bad addresses are not retried on
+    every row. Errors (timeouts, rate limits, bad API keys...) are not
+    cached, so the address is retried on the next call.
+
+    `geocode_func` replaces the geopandas lookup with any callable taking an
+    address and returning a Point (e.g. a local stub provider). Calls are
+    throttled to `rate_limit` requests per second, shared by every Geocoder
+    using the same provider.
     """
 
-    def __init__(self, provider: str, *args, **kwargs):
+    _rate_limiters = {}
+    _rate_limiters_lock = threading.Lock()
+
+    def __init__(
+        self,
+        provider: str,
+        *args,
+        cache: BaseCache = None,
+        cache_size: int = DEFAULT_LRU_MAXSIZE,
+        cache_path: str = None,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        geocode_func: Callable[[str], Point] = None,
+        rate_limit: float = None,
+        **kwargs,
+    ):
         self._logger = init_logger()
-        self.cache = {}
+        if cache is None:
+            cache = (
+                SQLiteCache(cache_path, maxsize=cache_size)
+                if cache_path
+                else LRUCache(maxsize=cache_size)
+            )
+        self.cache = cache
+        self.negative_ttl = negative_ttl
         self.provider = provider
+        self.geocode_func = geocode_func
+        self._rate_limiter = self._get_rate_limiter(
+            provider,
+            rate_limit
+            if rate_limit is not None
+            else DEFAULT_RATE_LIMITS.get(provider),
+        )
         self.api_key = kwargs.get("api_key") or self._authenticate()
 
+    @classmethod
+    def _get_rate_limiter(cls, provider: str, rate: float) -> RateLimiter:
+        with cls._rate_limiters_lock:
+            limiter = cls._rate_limiters.get(provider)
+            if limiter is None or limiter.interval != (
+                1.0 / rate if rate else 0.0
+            ):
+                limiter = RateLimiter(rate)
+                cls._rate_limiters[provider] = limiter
+            return limiter
+
     def _authenticate(self):
         if self.provider == "GoogleV3":
             import os
             return os.environ["GOOGLE_GEOCODING_API_KEY"]
 
+    def _cache_key(self, name: str) -> str:
+        return make_cache_key(name, self.provider)
+
     def _fetch_cache(self, name: str):
-        return self.cache.get(name)
+        return self.cache.get(self._cache_key(name))
 
     def _cache_point(self, name: str, point: Point):
-        self.cache[name] = point
-
-    def geocode_address(self, name: str, cached: bool = True) -> Point:
-        try:
-            if cached is True:
-                cached_result = self._fetch_cache(name)
-                if cached_result is not None:
-                    return cached_result
+        if point is None or point.is_empty:
+            self.cache.set(self._cache_key(name), None, ttl=self.negative_ttl)
+        else:
+            self.cache.set(self._cache_key(name), point)
 
+    def _geocode(self, name: str) -> Point:
+        self._rate_limiter.wait()
+        with metrics.timer("geocoder_geocode"):
+            if self.geocode_func is not None:
+                return self.geocode_func(name)
             if self.provider == "GoogleV3":
                 self._logger.info(
                     f"Geocoding '{name}' using GoogleV3 API"
                 )
-                point = geocode(
+                return geocode(
                     name,
                     provider=self.provider,
                     api_key=self.api_key
                 ).geometry[0]
-            else:
-                point = geocode(
-                    name,
-                    provider=self.provider,
-                ).geometry[0]
+            return geocode(
+                name,
+                provider=self.provider,
+            ).geometry[0]
+
+    def _geocode_with_retry(
+        self, name: str, max_retries: int, backoff: float
+    ) -> Point:
+        for attempt in range(max_retries + 1):
+            try:
+                return self._geocode(name)
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                delay = backoff * 2 ** attempt
+                self._logger.warning(
+                    f"Retrying '{name}' in {delay:.1f}s after error: {e}"
+                )
+                time.sleep(delay)
+
+    def geocode_address(self, name: str, cached: bool = True) -> Point:
+        try:
+            if cached is True:
+                cached_result = self._fetch_cache(name)
+                metrics.record_cache("geocoder", cached_result is not MISSING)
+                if cached_result is not MISSING:
+                    return cached_result
+
+            point = self._geocode(name)
             self._cache_point(name=name, point=point)
             return point
         except Exception as e:
             self._logger.error(
                 f"Some error occurred trying to geocode '{name}': {e}"
             )
+
+    def geocode_many(
+        self,
+        addresses: Iterable[str],
+        cached: bool = True,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        progress: Callable[[int, int], None] = None,
+    ) -> list:
+        """Geocode many addresses concurrently.
+
+        Addresses are deduplicated on their cache key, so each distinct
+        address is resolved at most once. Uncached addresses are geocoded in
+        a bounded thread pool, honouring the provider rate limit and
+        retrying failures with exponential backoff.
+
+        Args:
+            addresses (Iterable[str]): Addresses to geocode.
+            cached (bool, optional): Use the cache. Defaults to True.
+            max_workers (int, optional): Thread pool size.
+                                         Defaults to DEFAULT_MAX_WORKERS.
+            max_retries (int, optional): Retries per address.
+                                         Defaults to DEFAULT_MAX_RETRIES.
+            backoff (float, optional): Base backoff delay in seconds.
+                                       Defaults to DEFAULT_BACKOFF.
+            progress (Callable[[int, int], None], optional): Called with
+                (done, total) after each geocoded address. If not provided,
+                progress is logged every 10%.
+
+        Returns:
+            list: Points (or None on failure) in the order of `addresses`.
+        """
+        addresses = list(addresses)
+        keys = [self._cache_key(name) for name in addresses]
+
+        results = {}
+        pending = {}
+        for name, key in zip(addresses, keys):
+            if key in results or key in pending:
+                continue
+            cached_result = (
+                self.cache.get(key) if cached is True else MISSING
+            )
+            if cached is True:
+                metrics.record_cache(
+                    "geocoder", cached_result is not MISSING
+                )
+            if cached_result is not MISSING:
+                results[key] = cached_result
+            else:
+                pending[key] = name
+
+        total = len(pending)
+        if total:
+            self._logger.info(
+                f"Geocoding {total} unique addresses "
+                f"({len(addresses)} inputs, {len(results)} cached) "
+                f"using {self.provider}"
+            )
+        log_step = max(total // 10, 1)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._geocode_with_retry, name, max_retries, backoff
+                ): (key, name)
+                for key, name in pending.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                key, name = futures[future]
+                try:
+                    point = future.result()
+                    self._cache_point(name=name, point=point)
+                except Exception as e:
+                    self._logger.error(
+                        f"Some error occurred trying to geocode '{name}': {e}"
+                    )
+                    point = None
+                results[key] = point
+                if progress is not None:
+                    progress(done, total)
+                elif done % log_step == 0 or done == total:
+                    self._logger.info(f"Geocoded {done}/{total} addresses")
+
+        return [results[key] for key in keys]
+
+    def geocode_series(
+        self, series: pd.Series, crs: str = "EPSG:4326", **kwargs
+    ) -> gpd.GeoSeries:
+        """Geocode a Series of addresses concurrently.
+
+        Args:
+            series (pd.Series): Addresses to geocode.
+            crs (str, optional): CRS of the geocoded points.
+                                 Defaults to 'EPSG:4326'.
+            **kwargs: Passed to `geocode_many`.
+
+        Returns:
+            gpd.GeoSeries: Geocoded points aligned to the input index.
+        """
+        points = self.geocode_many(series.tolist(), **kwargs)
+        return gpd.GeoSeries(points, index=series.index, crs=crs)
@@ -0,0 +1,315 @@
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, math.inf
+)
+
+DEFAULT_DUMP_INTERVAL = 60
+
+ACCEPTED_DUMP_FORMATS = ["json", "prometheus"]
+
+METRICS_ENV_VAR = "RESEARCH_METRICS"
+
+
+class Histogram:
+    """Cumulative histogram of observed values, as in Prometheus.
+
+    Args:
+        buckets (tuple, optional): Sorted bucket upper bounds, ending in
+                                   infinity. Defaults to DEFAULT_BUCKETS.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        cumulative, total = [], 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {
+                "+Inf" if math.isinf(bound) else str(bound): count
+                for bound, count in zip(self.buckets, cumulative)
+            },
+        }
+
+
+class _Timer:
+    """Times a block and records it, with its rows and bytes, on exit."""
+
+    __slots__ = ("_metrics", "_name", "_start", "rows", "bytes")
+
+    def __init__(self, metrics, name: str):
+        self._metrics = metrics
+        self._name = name
+        self.rows = None
+        self.bytes = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._metrics.observe(
+            f"{self._name}_seconds", time.perf_counter() - self._start
+        )
+        self._metrics.increment(f"{self._name}_calls_total")
+        if exc_type is not None:
+            self._metrics.increment(f"{self._name}_errors_total")
+        if self.rows is not None:
+            self._metrics.increment(f"{self._name}_rows_total", self.rows)
+        if self.bytes is not None:
+            self._metrics.increment(f"{self._name}_bytes_total", self.bytes)
+        return False
+
+
+class _NoOpTimer:
+    """Shared timer used while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP_TIMER = _NoOpTimer()
+
+
+class Metrics:
+    """In-process registry of latency histograms and counters.
+
+    While disabled every recording call returns immediately, so
+    instrumented hot paths only pay an attribute lookup.
+
+    Args:
+        enabled (bool, optional): Record metrics. Defaults to False.
+
+    Example:
+        >>> metrics.enable()
+        >>> with metrics.timer('db_read_sql') as timer:
+                result = run_query()
+                timer.rows = len(result)
+        >>> metrics.dump('metrics.prom')
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._dump_stop = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def observe(self, name: str, value: float, buckets: tuple = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = Histogram(buckets or DEFAULT_BUCKETS)
+                self._histograms[name] = histogram
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_cache(self, name: str, hit: bool):
+        if not self.enabled:
+            return
+        self.increment(
+            f"{name}_cache_hits_total" if hit else f"{name}_cache_misses_total"
+        )
+
+    def timer(self, name: str):
+        """Context manager recording the wall time of a block.
+
+        Set `rows` and `bytes` on the returned timer to also count them.
+
+        Args:
+            name (str): Metric name prefix.
+
+        Returns:
+            Context manager.
+        """
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, name)
+
+    def snapshot(self) -> dict:
+        """Current histograms, counters and cache hit ratios.
+
+        Returns:
+            dict: JSON-serializable metrics.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                name: histogram.to_dict()
+                for name, histogram in self._histograms.items()
+            }
+        hit_ratios = {}
+        for name, hits in counters.items():
+            if name.endswith("_cache_hits_total"):
+                prefix = name[:-len("_cache_hits_total")]
+                misses = counters.get(f"{prefix}_cache_misses_total", 0)
+                hit_ratios[prefix] = hits / (hits + misses)
+        return {
+            "timestamp": time.time(),
+            "histograms": histograms,
+            "counters": counters,
+            "cache_hit_ratios": hit_ratios,
+        }
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{name}_sum {histogram['sum']}")
+            lines.append(f"{name}_count {histogram['count']}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        for name, ratio in sorted(snapshot["cache_hit_ratios"].items()):
+            lines.append(f"# TYPE {name}_cache_hit_ratio gauge")
+            lines.append(f"{name}_cache_hit_ratio {ratio}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: str = None):
+        """Write the metrics to a file, replacing it atomically.
+
+        Args:
+            path (str): Output file.
+            fmt (str, optional): 'json' or 'prometheus'. If None, it is
+                                 'json' for .json files and 'prometheus'
+                                 otherwise.
+        """
+        fmt = fmt or ("json" if path.endswith(".json") else "prometheus")
+        if fmt not in ACCEPTED_DUMP_FORMATS:
+            raise ValueError(
+                f"Invalid dump format. Must be one of {ACCEPTED_DUMP_FORMATS}"
+            )
+        content = (
+            json.dumps(self.snapshot(), indent=2)
+            if fmt == "json"
+            else self.to_prometheus()
+        )
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as fp:
+            fp.write(content)
+        os.replace(tmp_path, path)
+
+    def start_periodic_dump(
+        self,
+        path: str,
+        interval: float = DEFAULT_DUMP_INTERVAL,
+        fmt: str = None,
+    ):
+        """Dump the metrics every `interval` seconds in a daemon thread.
+
+        Args:
+            path (str): Output file.
+            interval (float, optional): Seconds between dumps.
+                                        Defaults to DEFAULT_DUMP_INTERVAL.
+            fmt (str, optional): See `dump`.
+        """
+        self.stop_periodic_dump()
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.dump(path, fmt)
+                except OSError as e:
+                    logging.getLogger(__name__).warning(
+                        f"Could not dump metrics to '{path}': {e}"
+                    )
+
+        threading.Thread(target=run, daemon=True).start()
+        self._dump_stop = stop
+
+    def stop_periodic_dump(self):
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_stop = None
+
+
+metrics = Metrics(
+    enabled=os.environ.get(METRICS_ENV_VAR, "").lower() in ("1", "true")
+)
+
+
+def instrument(name: str = None, count_rows: bool = True):
+    """Decorator recording the wall time, calls and errors of a function.
+
+    Args:
+        name (str, optional): Metric name prefix. Defaults to the function
+                              qualified name.
+        count_rows (bool, optional): Count the length of the returned
+                                     value as rows. Defaults to True.
+
+    Returns:
+        function: Decorator
+    """
+
+    def decorator(func):
+        metric_name = name or func.__qualname__.replace(".", "_").lower()
+
+        @wraps(func)
+        def new_func(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with metrics.timer(metric_name) as timer:
+                result = func(*args, **kwargs)
+                if count_rows and hasattr(result, "__len__"):
+                    timer.rows = len(result)
+                return result
+
+        return new_func
+
+    return decorator
@@ -1,38 +1,61 @@
 import logging
 from functools import wraps
 
+from .instrumentation import instrument
 
-def init_logger() -> logging.RootLogger:
-    """Initialize logger object.
+LOGGER_NAME = "research"
+
+LOG_FORMAT = " %(asctime)s - %(levelname)s - %(message)s"
+
+LOG_DATE_FORMAT = "%I:%M:%S %p"
+
+
+def _configure_logger() -> logging.Logger:
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(
+            logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        )
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+# Configured once for the whole package, on first import
+_logger = _configure_logger()
+
+
+def init_logger() -> logging.Logger:
+    """Get the package logger object.
 
     Returns:
-        logging.RootLogger: Logger object
+        logging.Logger: Logger object
     """
-    logging.basicConfig(
-        level="INFO",
-        format=" %(asctime)s - %(levelname)s - %(message)s",
-        datefmt="%I:%M:%S %p",
-    )
-    logger = logging.getLogger()
-    return logger
+    return _logger
 
 
 def safe_run(func):
     """Decorator to catch exceptions and log them.
 
+    Calls, errors and wall time are recorded in the instrumentation
+    metrics under the function name.
+
     Args:
         func (function): Function to be wrapped
 
     Returns:
         function: Wrapped function
     """
+    instrumented_func = instrument(count_rows=False)(func)
+
     @wraps(func)
     def new_func(self, *args, **kwargs):
-        logger = init_logger()
         try:
-            return func(self, *args, **kwargs)
+            return instrumented_func(self, *args, **kwargs)
         except Exception as e:
-            logger.error(f"Some error occurred running {func.__name__}: {e}")
+            _logger.error(f"Some error occurred running {func.__name__}: {e}")
 
     return new_func
 
@@ -49,3 +72,143 @@ def wrap_materialize_table_sql(
             ({sql_query})
         """
     return create_sql
+
+
+def _split_table_name(table_name: str) -> tuple:
+    schema, _, name = table_name.rpartition(".")
+    return (f"{schema}." if schema else ""), name
+
+
+def _copy_grants_sql(source_table: str, target_table: str) -> str:
+    return f"""
+            DO $$
+            DECLARE
+                acl record;
+            BEGIN
+                FOR acl IN
+                    SELECT a.privilege_type, a.is_grantable,
+                           CASE WHEN a.grantee = 0 THEN 'PUBLIC'
+                           ELSE quote_ident(pg_get_userbyid(a.grantee))
+                           END AS grantee
+                    FROM pg_class c, aclexplode(c.relacl) a
+                    WHERE c.oid = to_regclass('{source_table}')
+                LOOP
+                    EXECUTE format(
+                        'GRANT %s ON {target_table} TO %s %s',
+                        acl.privilege_type,
+                        acl.grantee,
+                        CASE WHEN acl.is_grantable
+                        THEN 'WITH GRANT OPTION' ELSE '' END
+                    );
+                END LOOP;
+            END $$;
+        """
+
+
+def wrap_swap_table_sql(
+    table_name: str,
+    sql_query: str,
+    build_id: str,
+    index_columns: list = None,
+) -> str:
+    """Build a table into a temporary name and swap it in atomically.
+
+    Readers keep using the previous version while the new one is built;
+    the exclusive lock is only taken for the final renames. Privileges
+    granted on the previous version are granted again on the new one.
+    Views depending on the table follow it through the rename, so the
+    previous version cannot be dropped while they exist: use
+    `wrap_replace_rows_sql` for tables with dependent views.
+
+    Args:
+        table_name (str): Target table, optionally schema-qualified.
+        sql_query (str): Query producing the table contents.
+        build_id (str): Unique suffix for the temporary table and index.
+        index_columns (list, optional): Columns to index on the new table.
+                                        Defaults to None.
+
+    Returns:
+        str: SQL statements to run within a single transaction.
+    """
+    schema, name = _split_table_name(table_name)
+    tmp_name = f"{name}__new_{build_id}"
+    old_name = f"{name}__old_{build_id}"
+    index_sql = (
+        f"CREATE INDEX {name}__idx_{build_id} "
+        f"ON {schema}{tmp_name} ({', '.join(index_columns)});"
+        if index_columns else ''
+    )
+    swap_sql = f"""
+            CREATE TABLE {schema}{tmp_name} AS
+            ({sql_query});
+            {index_sql}
+            {_copy_grants_sql(table_name, f"{schema}{tmp_name}")}
+            ALTER TABLE IF EXISTS {table_name} RENAME TO {old_name};
+            ALTER TABLE {schema}{tmp_name} RENAME TO {name};
+            DROP TABLE IF EXISTS {schema}{old_name};
+        """
+    return swap_sql
+
+
+def wrap_incremental_refresh_sql(
+    table_name: str,
+    sql_query: str,
+    watermark_column: str,
+    keys: list = None,
+) -> str:
+    """Append the rows of a query newer than the table watermark.
+
+    Rows whose `watermark_column` is greater than the current maximum in
+    `table_name` are inserted. If `keys` are given, existing rows sharing
+    those keys are replaced instead of duplicated. Rows with a NULL
+    watermark are only loaded while the table is empty, as they cannot be
+    told apart from rows inserted on a previous refresh.
+
+    Args:
+        table_name (str): Target table, optionally schema-qualified.
+        sql_query (str): Query producing the full table contents.
+        watermark_column (str): Monotonically increasing column.
+        keys (list, optional): Columns identifying a row. Defaults to None.
+
+    Returns:
+        str: SQL statements to run within a single transaction.
+    """
+    _, name = _split_table_name(table_name)
+    new_rows = f"{name}__incremental"
+    delete_sql = (
+        f"""DELETE FROM {table_name} t USING {new_rows} n
+            WHERE {' AND '.join(f't.{k} = n.{k}' for k in keys)};"""
+        if keys else ''
+    )
+    refresh_sql = f"""
+            CREATE TEMPORARY TABLE {new_rows} ON COMMIT DROP AS
+            SELECT * FROM ({sql_query}) AS q
+            WHERE NOT EXISTS (SELECT 1 FROM {table_name})
+            OR q.{watermark_column} >
+            (SELECT MAX(t.{watermark_column}) FROM {table_name} t);
+            {delete_sql}
+            INSERT INTO {table_name} SELECT * FROM {new_rows};
+        """
+    return refresh_sql
+
+
+def wrap_replace_rows_sql(table_name: str, sql_query: str) -> str:
+    """Replace the rows of an existing table in place.
+
+    Unlike `wrap_swap_table_sql`, the table itself is kept, so dependent
+    views and privileges are untouched. Readers keep seeing the previous
+    rows until the transaction commits. The query must produce the same
+    columns as the table.
+
+    Args:
+        table_name (str): Target table, optionally schema-qualified.
+        sql_query (str): Query producing the table contents.
+
+    Returns:
+        str: SQL statements to run within a single transaction.
+    """
+    replace_sql = f"""
+            DELETE FROM {table_name};
+            INSERT INTO {table_name} SELECT * FROM ({sql_query}) AS q;
+        """
+    return replace_sql
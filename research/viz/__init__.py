@@ -0,0 +1,11 @@
+from .._lazy import lazy_attributes
+
+__getattr__, __dir__, __all__ = lazy_attributes(
+    __name__,
+    {
+        "LevelOfDetail": ".lod",
+        "gdf_to_layer_data": ".layers",
+        "meters_per_pixel": ".lod",
+        "payload_size": ".layers",
+    },
+)
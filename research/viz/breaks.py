@@ -0,0 +1,325 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SAMPLE_SIZE = 100_000
+
+DEFAULT_STREAMING_CHUNKSIZE = 1_000_000
+
+DEFAULT_COMPRESSION = 500
+
+# Fisher-Jenks is quadratic in the number of values, so it runs on evenly
+# spaced order statistics of the data
+DEFAULT_JENKS_SAMPLE_SIZE = 1_000
+
+SORTED_CACHE_SIZE = 4
+
+ACCEPTED_BREAKS_MODES = ['exact', 'sample', 'streaming']
+
+_sorted_cache = OrderedDict()
+
+_sorted_cache_lock = threading.Lock()
+
+
+def _lerp(a, b, t):
+    # Same interpolation as np.quantile's 'linear' method
+    diff_b_a = b - a
+    lerp = a + diff_b_a * t
+    return np.where(t >= 0.5, b - diff_b_a * (1 - t), lerp)
+
+
+class SortedValues:
+    """Sorted non-null values of a column, sorted once and queried many
+    times.
+
+    Args:
+        values (np.ndarray): Sorted float values without NaNs.
+    """
+
+    def __init__(self, values: np.ndarray):
+        if not len(values):
+            raise ValueError("Cannot compute breaks of an empty column")
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values) -> "SortedValues":
+        values = np.asarray(values, dtype=float)
+        return cls(np.sort(values[~np.isnan(values)]))
+
+    @property
+    def count(self) -> int:
+        return len(self.values)
+
+    @property
+    def min(self) -> float:
+        return self.values[0]
+
+    @property
+    def max(self) -> float:
+        return self.values[-1]
+
+    def quantile(self, q) -> np.ndarray:
+        """Linearly interpolated quantiles, matching np.quantile.
+
+        Args:
+            q (array-like): Quantiles between 0 and 1.
+
+        Returns:
+            np.ndarray: Quantile values.
+        """
+        positions = np.asarray(q, dtype=float) * (self.count - 1)
+        lower = np.floor(positions).astype(int)
+        upper = np.minimum(lower + 1, self.count - 1)
+        return _lerp(
+            self.values[lower], self.values[upper], positions - lower
+        )
+
+    def order_statistics(self, size: int) -> np.ndarray:
+        """Evenly spaced order statistics, at most `size` of them.
+
+        Args:
+            size (int): Maximum number of values.
+
+        Returns:
+            np.ndarray: Sorted subset preserving the distribution.
+        """
+        if self.count <= size:
+            return self.values
+        return self.values[np.linspace(0, self.count - 1, size, dtype=int)]
+
+
+class QuantileSketch:
+    """Streaming quantile estimator in the style of a merging t-digest.
+
+    Values are summarized by weighted centroids that are small near the
+    tails and large around the median, so memory stays bounded by
+    `compression` while extreme quantiles remain accurate.
+
+    Args:
+        compression (int, optional): Controls the number of centroids
+                                     (about compression / 2).
+                                     Defaults to DEFAULT_COMPRESSION.
+    """
+
+    def __init__(self, compression: int = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return self.weights.sum()
+
+    def update(self, values) -> "QuantileSketch":
+        """Merge a batch of values into the sketch.
+
+        Args:
+            values (array-like): Numeric values, NaNs are ignored.
+
+        Returns:
+            QuantileSketch: The sketch itself.
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(len(values))])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # k1 scale function: each centroid covers at most one unit of k
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        groups = np.floor(k)
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        return self
+
+    def quantile(self, q) -> np.ndarray:
+        """Estimate quantiles by interpolating between centroids.
+
+        Args:
+            q (array-like): Quantiles between 0 and 1.
+
+        Returns:
+            np.ndarray: Estimated quantile values.
+        """
+        if not len(self.weights):
+            raise ValueError("Cannot compute breaks of an empty column")
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - self.weights / 2
+        return np.interp(
+            np.asarray(q, dtype=float) * cumulative[-1],
+            np.r_[0, centers, cumulative[-1]],
+            np.r_[self.min, self.means, self.max],
+        )
+
+
+def _values_key(values: np.ndarray) -> tuple:
+    # Sum of per-value hashes: independent of the row order, like the
+    # sorted values themselves
+    hashes = pd.util.hash_array(values)
+    return len(values), int(hashes.sum())
+
+
+def get_sorted_values(
+    series,
+    mode: str = 'exact',
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    chunksize: int = DEFAULT_STREAMING_CHUNKSIZE,
+    compression: int = DEFAULT_COMPRESSION,
+):
+    """Function to get the sorted summary of a column used to compute breaks
+
+    Results for in-memory columns are kept in a small LRU cache keyed by
+    the column contents, so every classification method and break count
+    computed on the same data sorts it only once.
+
+    Args:
+        series (pd.Series or Iterable[pd.Series]): Column values. Iterables
+                                                   of chunks are only
+                                                   accepted with 'streaming'.
+        mode (str, optional): 'exact' sorts every value, 'sample' sorts a
+                              random sample of `sample_size` values and
+                              'streaming' feeds chunks of `chunksize` values
+                              to a QuantileSketch. Defaults to 'exact'.
+        sample_size (int, optional): Values sampled in 'sample' mode.
+                                     Defaults to DEFAULT_SAMPLE_SIZE.
+        chunksize (int, optional): Chunk size in 'streaming' mode.
+                                   Defaults to DEFAULT_STREAMING_CHUNKSIZE.
+        compression (int, optional): Sketch compression in 'streaming' mode.
+                                     Defaults to DEFAULT_COMPRESSION.
+
+    Returns:
+        SortedValues or QuantileSketch: Sorted summary of the values.
+    """
+    if mode not in ACCEPTED_BREAKS_MODES:
+        raise ValueError(
+            f"Invalid breaks mode. Must be one of {ACCEPTED_BREAKS_MODES}")
+
+    if not isinstance(series, pd.Series):
+        if mode != 'streaming':
+            raise ValueError("Chunked input is only accepted in 'streaming'")
+        sketch = QuantileSketch(compression=compression)
+        for chunk in series:
+            sketch.update(chunk)
+        return sketch
+
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    key = (mode, sample_size, chunksize, compression) + _values_key(values)
+    with _sorted_cache_lock:
+        if key in _sorted_cache:
+            _sorted_cache.move_to_end(key)
+            return _sorted_cache[key]
+
+    if mode == 'exact':
+        result = SortedValues.from_values(values)
+    elif mode == 'sample':
+        values = values[~np.isnan(values)]
+        if len(values) > sample_size:
+            rng = np.random.default_rng(0)
+            # Keep the extremes so every value falls within the breaks
+            values = np.r_[
+                values.min(),
+                rng.choice(values, sample_size - 2, replace=False),
+                values.max(),
+            ]
+        result = SortedValues.from_values(values)
+    else:
+        result = QuantileSketch(compression=compression)
+        for start in range(0, len(values), chunksize):
+            result.update(values[start:start + chunksize])
+
+    with _sorted_cache_lock:
+        _sorted_cache[key] = result
+        while len(_sorted_cache) > SORTED_CACHE_SIZE:
+            _sorted_cache.popitem(last=False)
+    return result
+
+
+def quantile_breaks(sorted_values, breaks: int) -> np.ndarray:
+    """Function to get deduplicated equal-size breaks
+
+    Equivalent to the bins of `pd.qcut(q=breaks, duplicates='drop')`.
+
+    Args:
+        sorted_values (SortedValues or QuantileSketch): Sorted summary
+        breaks (int): Number of quantile intervals
+
+    Returns:
+        np.ndarray: Unique breaks values, from minimum to maximum. As in
+                    pandas, a single interval keeps both edges even when
+                    they are equal (a constant column).
+    """
+    quantiles = np.linspace(0, 1, breaks + 1)
+    # Round up rather than to nearest if not representable in base 2
+    np.putmask(
+        quantiles,
+        breaks * quantiles != np.arange(breaks + 1),
+        np.nextafter(quantiles, 1),
+    )
+    breaks_values = sorted_values.quantile(quantiles)
+    if len(breaks_values) == 2:
+        return breaks_values
+    return np.unique(breaks_values)
+
+
+def interval_breaks(sorted_values, breaks: int) -> np.ndarray:
+    """Function to get equal-interval breaks
+
+    Equivalent to the bins of `pd.cut(bins=breaks)`: the lowest edge is
+    lowered by 0.1% of the range so the minimum falls in the first bin.
+
+    Args:
+        sorted_values (SortedValues or QuantileSketch): Sorted summary
+        breaks (int): Number of intervals
+
+    Returns:
+        np.ndarray: Breaks values
+    """
+    mn, mx = sorted_values.min, sorted_values.max
+    if np.isinf(mn) or np.isinf(mx):
+        raise ValueError("Cannot compute breaks of infinite values")
+    if mn == mx:
+        mn -= 0.001 * abs(mn) if mn != 0 else 0.001
+        mx += 0.001 * abs(mx) if mx != 0 else 0.001
+        return np.linspace(mn, mx, breaks + 1, endpoint=True)
+    bins = np.linspace(mn, mx, breaks + 1, endpoint=True)
+    bins[0] -= (mx - mn) * 0.001
+    return bins
+
+
+def jenks_breaks(
+    sorted_values, breaks: int, sample_size: int = DEFAULT_JENKS_SAMPLE_SIZE
+) -> np.ndarray:
+    """Function to get Jenks natural breaks using mapclassify
+
+    Args:
+        sorted_values (SortedValues): Sorted values
+        breaks (int): Number of classes
+        sample_size (int, optional): Maximum number of order statistics
+                                     classified.
+                                     Defaults to DEFAULT_JENKS_SAMPLE_SIZE.
+
+    Returns:
+        np.ndarray: Minimum followed by the upper bound of each class
+    """
+    if not isinstance(sorted_values, SortedValues):
+        raise ValueError("Jenks breaks are not available in 'streaming'")
+    # Deferred, mapclassify pulls in scipy and scikit-learn
+    import mapclassify
+
+    values = sorted_values.order_statistics(sample_size)
+    classifier = mapclassify.FisherJenks(values, k=breaks)
+    return np.r_[sorted_values.min, classifier.bins]
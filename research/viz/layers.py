@@ -0,0 +1,130 @@
+import json
+import re
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+POINT_TYPES = ["Point", "MultiPoint"]
+
+PATH_TYPES = ["LineString", "MultiLineString"]
+
+WGS84_CRS = "EPSG:4326"
+
+
+def _accessor_column(accessor: str) -> str:
+    """Column name for a deck.gl accessor, e.g. getFillColor -> fill_color"""
+    name = re.sub(r"^get_?", "", accessor)
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _column_values(gdf, value, row_idx: np.ndarray) -> list:
+    values = gdf[value].to_numpy() if isinstance(value, str) else value
+    if values.dtype == bool:
+        values = values.astype(np.uint8)
+    # tolist returns Python scalars and nested lists, which are JSON safe
+    return values[row_idx].tolist()
+
+
+def gdf_to_layer_data(
+    gdf: gpd.GeoDataFrame,
+    attributes: dict = None,
+    quantize: int = None,
+) -> tuple:
+    """Function to convert a GeoDataFrame into compact pydeck layer data
+
+    Instead of one GeoJSON feature per row, with its geometry type and
+    every column as properties, each row becomes a record with a bare
+    coordinate list ('position' for points, 'path' for lines) and the
+    accessor values only, for ScatterplotLayer and PathLayer. The records
+    are plain dicts, lists and numbers, so `Deck.to_html` embeds them as
+    is, whatever DataFrame types the installed pydeck recognizes.
+    Multi-part geometries are split into parts sharing the attributes of
+    their row; null and empty geometries are dropped.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Points or lines. Reprojected to EPSG:4326
+                                if needed.
+        attributes (dict, optional): deck.gl accessor name mapped to a
+                                     column name or an array aligned with
+                                     the rows, e.g.
+                                     {'getFillColor': colors,
+                                      'getRadius': 'n_accidentes'}.
+                                     Defaults to None.
+        quantize (int, optional): Round coordinates to this number of
+                                  decimal degrees, which shortens every
+                                  number in the payload (5 decimals are
+                                  about 1 m). Defaults to None (full
+                                  precision).
+
+    Raises:
+        ValueError: If geometries are not all points or all lines, or an
+                    attribute array is not aligned with the rows.
+
+    Returns:
+        tuple: (data, layer_props). `data` is a list of records with one
+               key per accessor and `layer_props` maps each accessor to its
+               key, e.g. pdk.Layer('PathLayer', data=data, **layer_props).
+    """
+    if gdf.crs is not None and not gdf.crs.equals(WGS84_CRS):
+        gdf = gdf.to_crs(WGS84_CRS)
+
+    attributes = {
+        name: value if isinstance(value, str) else np.asarray(value)
+        for name, value in (attributes or {}).items()
+    }
+    if any(
+        not isinstance(value, str) and len(value) != len(gdf)
+        for value in attributes.values()
+    ):
+        raise ValueError("Attributes need one value per row")
+
+    geoms = gdf.geometry.values
+    valid = ~(shapely.is_missing(geoms) | shapely.is_empty(geoms))
+    gdf = gdf[valid]
+    attributes = {
+        name: value if isinstance(value, str) else value[valid]
+        for name, value in attributes.items()
+    }
+
+    geom_types = set(gdf.geom_type.unique())
+    parts, row_idx = shapely.get_parts(gdf.geometry.values, return_index=True)
+    coords = shapely.get_coordinates(parts)
+    if quantize is not None:
+        coords = np.round(coords, quantize)
+
+    if geom_types <= set(POINT_TYPES):
+        position_accessor = "getPosition"
+        positions = coords.tolist()
+    elif geom_types <= set(PATH_TYPES):
+        position_accessor = "getPath"
+        vertices = coords.tolist()
+        ends = np.cumsum(shapely.get_num_coordinates(parts)).tolist()
+        positions = [
+            vertices[start:end] for start, end in zip([0] + ends, ends)
+        ]
+    else:
+        raise ValueError(
+            f"Geometries must be all {POINT_TYPES} or all {PATH_TYPES}, "
+            f"got {sorted(geom_types)}"
+        )
+
+    columns = {_accessor_column(position_accessor): positions}
+    layer_props = {position_accessor: _accessor_column(position_accessor)}
+    for name, value in attributes.items():
+        columns[_accessor_column(name)] = _column_values(gdf, value, row_idx)
+        layer_props[name] = _accessor_column(name)
+    data = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    return data, layer_props
+
+
+def payload_size(data: list) -> int:
+    """Function to get the size in bytes of layer data serialized as JSON
+
+    Args:
+        data (list): Layer data from `gdf_to_layer_data`
+
+    Returns:
+        int: Bytes of compact JSON text
+    """
+    return len(json.dumps(data, separators=(",", ":")).encode())
@@ -0,0 +1,189 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from ..analysis.join.nearest import DEFAULT_METRIC_CRS
+from ..utils.utils import init_logger
+
+# Earth circumference at the equator and deck.gl / Mapbox GL tile size
+EARTH_CIRCUMFERENCE = 40_075_016.686
+
+DEFAULT_TILE_SIZE = 512
+
+# Tolerance in screen pixels, half a pixel keeps simplification invisible
+DEFAULT_PIXEL_TOLERANCE = 0.5
+
+DEFAULT_ZOOMS = [10, 11, 12, 13, 14]
+
+WGS84_CRS = "EPSG:4326"
+
+
+def meters_per_pixel(
+    zoom: float, latitude: float, tile_size: int = DEFAULT_TILE_SIZE
+) -> float:
+    """Function to get the ground size of a screen pixel in Web Mercator
+
+    Args:
+        zoom (float): Map zoom level
+        latitude (float): Latitude in degrees
+        tile_size (int, optional): Tile size in pixels.
+                                   Defaults to DEFAULT_TILE_SIZE.
+
+    Returns:
+        float: Meters per pixel
+    """
+    return (
+        EARTH_CIRCUMFERENCE
+        * np.cos(np.radians(latitude))
+        / (tile_size * 2 ** zoom)
+    )
+
+
+def _wkb_size(geoms: np.ndarray) -> int:
+    return sum(len(wkb) for wkb in shapely.to_wkb(geoms) if wkb is not None)
+
+
+class LevelOfDetail:
+    """Zoom-dependent simplified versions of a GeoDataFrame.
+
+    Geometries are projected once to a metric CRS. For each zoom level they
+    are simplified with a tolerance of `pixels` screen pixels, preserving
+    topology, and features whose bounding box is smaller than a pixel are
+    dropped. Tiers are cached per tolerance, so zooms sharing a tolerance
+    (or repeated renders) reuse them.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Features to render.
+        metric_crs (str, optional): CRS used to simplify, in meters.
+                                    Defaults to DEFAULT_METRIC_CRS.
+        pixels (float, optional): Simplification tolerance in pixels.
+                                  Defaults to DEFAULT_PIXEL_TOLERANCE.
+        tile_size (int, optional): Tile size in pixels.
+                                   Defaults to DEFAULT_TILE_SIZE.
+
+    Raises:
+        ValueError: If `gdf` has no CRS.
+
+    Example:
+        >>> lod = LevelOfDetail(carriles_gdf)
+        >>> lod.report([12, 13, 14])
+        >>> pdk.Layer('GeoJsonLayer', data=lod.at_zoom(13))
+    """
+
+    def __init__(
+        self,
+        gdf: gpd.GeoDataFrame,
+        metric_crs: str = DEFAULT_METRIC_CRS,
+        pixels: float = DEFAULT_PIXEL_TOLERANCE,
+        tile_size: int = DEFAULT_TILE_SIZE,
+    ):
+        if gdf.crs is None:
+            raise ValueError(
+                "gdf has no CRS, set it first, e.g. gdf.set_crs('EPSG:4326')"
+            )
+        self._logger = init_logger()
+        self.gdf = gdf
+        self.output_crs = gdf.crs
+        self.pixels = pixels
+        self.tile_size = tile_size
+        self._metric_geoms = gdf.geometry.to_crs(metric_crs).values
+        bounds = gdf.geometry.to_crs(WGS84_CRS).total_bounds
+        self.latitude = (bounds[1] + bounds[3]) / 2
+        self._sizes = self._feature_sizes(self._metric_geoms)
+        self._cache = {}
+
+    @staticmethod
+    def _feature_sizes(geoms: np.ndarray) -> np.ndarray:
+        bounds = shapely.bounds(geoms)
+        sizes = np.fmax(
+            bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]
+        )
+        # Points have no extent but are always drawn
+        is_point = np.isin(shapely.get_type_id(geoms), [0, 4])
+        return np.where(is_point, np.inf, sizes)
+
+    def tolerance(self, zoom: float) -> float:
+        """Simplification tolerance in meters for a zoom level.
+
+        Args:
+            zoom (float): Map zoom level.
+
+        Returns:
+            float: Tolerance in meters.
+        """
+        return self.pixels * meters_per_pixel(
+            zoom, self.latitude, self.tile_size
+        )
+
+    def at_zoom(self, zoom: float) -> gpd.GeoDataFrame:
+        """Simplified features for a zoom level.
+
+        Args:
+            zoom (float): Map zoom level.
+
+        Returns:
+            gpd.GeoDataFrame: Features larger than a pixel, simplified and
+                              in the input CRS.
+        """
+        tolerance = round(self.tolerance(zoom), 6)
+        if tolerance not in self._cache:
+            pixel = tolerance / self.pixels
+            keep = ~(self._sizes < pixel)
+            simplified = shapely.simplify(
+                self._metric_geoms[keep], tolerance, preserve_topology=True
+            )
+            tier = self.gdf[keep].copy()
+            tier[tier.geometry.name] = gpd.GeoSeries(
+                simplified, index=tier.index, crs=self._metric_geoms.crs
+            ).to_crs(self.output_crs)
+            self._cache[tolerance] = tier
+        return self._cache[tolerance]
+
+    def tiers(self, zooms: list = None) -> dict:
+        """Simplified features for several zoom levels.
+
+        Args:
+            zooms (list, optional): Zoom levels. Defaults to DEFAULT_ZOOMS.
+
+        Returns:
+            dict: GeoDataFrame per zoom level.
+        """
+        return {zoom: self.at_zoom(zoom) for zoom in zooms or DEFAULT_ZOOMS}
+
+    def report(self, zooms: list = None) -> pd.DataFrame:
+        """Feature, vertex and payload reduction per zoom level.
+
+        Payload is measured as the WKB size of the geometries.
+
+        Args:
+            zooms (list, optional): Zoom levels. Defaults to DEFAULT_ZOOMS.
+
+        Returns:
+            pd.DataFrame: One row per zoom level.
+        """
+        geoms = self.gdf.geometry.values
+        vertices = shapely.get_num_coordinates(geoms).sum()
+        payload = _wkb_size(geoms)
+        rows = []
+        for zoom, tier in self.tiers(zooms).items():
+            tier_geoms = tier.geometry.values
+            tier_vertices = shapely.get_num_coordinates(tier_geoms).sum()
+            tier_payload = _wkb_size(tier_geoms)
+            rows.append(
+                {
+                    "zoom": zoom,
+                    "tolerance_m": self.tolerance(zoom),
+                    "features": len(tier),
+                    "dropped_features": len(self.gdf) - len(tier),
+                    "vertices": tier_vertices,
+                    "vertex_reduction": 1 - tier_vertices / vertices,
+                    "payload_bytes": tier_payload,
+                    "payload_reduction": 1 - tier_payload / payload,
+                }
+            )
+            self._logger.info(
+                f"Zoom {zoom}: {tier_vertices}/{vertices} vertices, "
+                f"{len(tier)}/{len(self.gdf)} features"
+            )
+        return pd.DataFrame(rows)
@@ -1,13 +1,25 @@
+from functools import lru_cache
+
 import pandas as pd
 import numpy as np
-import jinja2
-from ipywidgets import HTML
+
+from .breaks import (
+    DEFAULT_SAMPLE_SIZE,
+    get_sorted_values,
+    interval_breaks,
+    jenks_breaks,
+    quantile_breaks,
+)
 
 MAX_QCUT_ITERS = 10
 
+EXPRESSION_CACHE_SIZE = 256
+
+DEFAULT_ALPHA = 255
+
 NULL_COLOR_RGB = [204, 204, 204]
 
-ACCEPTED_BREAKS_METHODS = ['equal-size', 'equal-interval']
+ACCEPTED_BREAKS_METHODS = ['equal-size', 'equal-interval', 'jenks']
 
 # CartoColors palettes, see https://carto.com/carto-colors/
 PALETTES_HEX = {
@@ -101,6 +113,66 @@ PALETTES_HEX = {
 }
 
 
+def hex_palette_to_rgb(hex_palette: list) -> np.ndarray:
+    """Vectorized conversion of hex color codes to RGB
+
+    Args:
+        hex_palette (list): Hex color codes, e.g. ['#f3e79b', '#fac484']
+
+    Returns:
+        np.ndarray: (N, 3) array of RGB values
+    """
+    hex_str = "".join(color.lstrip("#") for color in hex_palette)
+    rgb = np.frombuffer(bytes.fromhex(hex_str), dtype=np.uint8)
+    return rgb.reshape(-1, 3).astype(int)
+
+
+# Lookup table of RGB palettes, decoded once at import
+PALETTES_RGB = {
+    name: hex_palette_to_rgb(hex_palette)
+    for name, hex_palette in PALETTES_HEX.items()
+}
+
+
+LEGEND_TEMPLATE_SOURCE = '''
+    <style>
+      .legend {
+        width: 300px;
+      }
+      .square {
+        height: 10px;
+        width: 10px;
+        border: 1px solid grey;
+      }
+      .left {
+        float: left;
+      }
+      .right {
+        float: right;
+      }
+    </style>
+    <h2>{{ title }}</h2>
+    {% for label in labels %}
+    <div class='legend'>
+      <div class="square left"
+        style="background:rgba({{ label['color'] }})"></div>
+      <span class="right">{{label['text']}}</span>
+      <br />
+    </div>
+    {% endfor %}
+    <br />
+    <p>{{ footer }}</p>
+    '''
+
+
+# Compiled once, on first use, the same template renders every legend
+@lru_cache(maxsize=None)
+def _legend_template():
+    import jinja2
+
+    return jinja2.Template(LEGEND_TEMPLATE_SOURCE)
+
+
 def _get_equal_break_legend_values(
     breaks_values: np.ndarray,
     palette_steps: np.ndarray,
@@ -131,6 +203,15 @@ def _get_category_legend_values(
             for i, c in enumerate(display_categories)] + others_category
 
 
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _render_legend(labels: tuple, title: str, footer: str) -> str:
+    return _legend_template().render(
+        labels=[{"text": text, "color": color} for text, color in labels],
+        title=title,
+        footer=footer,
+    )
+
+
 def create_legend(
     labels: list,
     title: str,
@@ -154,40 +235,15 @@ def create_legend(
     for label in labels:
         assert list(label['color']) and list(label['text'])
         assert len(label['color']) in (3, 4)
-        label['color'] = ', '.join([str(c) for c in label['color']])
-    legend_template = jinja2.Template('''
-    <style>
-      .legend {
-        width: 300px;
-      }
-      .square {
-        height: 10px;
-        width: 10px;
-        border: 1px solid grey;
-      }
-      .left {
-        float: left;
-      }
-      .right {
-        float: right;
-      }
-    </style>
-    <h2>{{ title }}</h2>
-    {% for label in labels %}
-    <div class='legend'>
-      <div class="square left"
-        style="background:rgba({{ label['color'] }})"></div>
-      <span class="right">{{label['text']}}</span>
-      <br />
-    </div>
-    {% endfor %}
-    <br />
-    <p>{{ footer }}</p>
-    ''')
-    html_str = legend_template.render(
-        labels=labels, title=title, footer=footer
+    rendered_labels = tuple(
+        (label['text'], ', '.join([str(c) for c in label['color']]))
+        for label in labels
     )
+    html_str = _render_legend(rendered_labels, title, footer)
     if as_html is True:
+        # Deferred, ipywidgets pulls in IPython
+        from ipywidgets import HTML
+
         return HTML(html_str)
     else:
         return html_str
@@ -211,51 +267,164 @@ def hex_to_rgb(hex: str) -> tuple:
     return tuple(rgb)
 
 
-def get_rgb_palette(palette: str) -> np.array:
+def get_rgb_palette(palette) -> np.array:
     """Function to get RGB palette
 
     Args:
-        palette (str): Palette name
+        palette (str or list): Palette name or list of hex color codes
 
     Returns:
         np.array: RGB palette
     """
-    norm_palette = palette.lower()
-    hex_palette = PALETTES_HEX.get(norm_palette)
-    if hex_palette:
-        return np.array([hex_to_rgb(hex) for hex in hex_palette])
+    if not isinstance(palette, str):
+        return hex_palette_to_rgb(palette)
+    rgb_palette = PALETTES_RGB.get(palette.lower())
+    if rgb_palette is not None:
+        return rgb_palette.copy()
+
+
+def _palette_key(palette):
+    """Hashable key identifying a palette name or list of hex codes"""
+    if isinstance(palette, str):
+        return palette.lower()
+    return tuple(palette)
+
+
+def _rgba_lookup_table(
+    palette_steps: np.ndarray, null_color: list, alpha: int = DEFAULT_ALPHA
+) -> np.ndarray:
+    """Stack palette steps and the null color (last row) as uint8 RGBA"""
+    null_rgba = list(null_color) + [alpha] * (4 - len(null_color))
+    lut = np.empty((len(palette_steps) + 1, 4), dtype=np.uint8)
+    lut[:-1, :3] = np.asarray(palette_steps)[:, :3]
+    lut[:-1, 3] = alpha
+    lut[-1] = null_rgba
+    return lut
+
+
+def breaks_to_colors(
+    values,
+    breaks_values: np.ndarray,
+    palette_steps: np.ndarray,
+    null_color: list = NULL_COLOR_RGB,
+    alpha: int = DEFAULT_ALPHA,
+) -> np.ndarray:
+    """Function to color values by the first break they are lower or equal to
+
+    Same rules as the expression built by `equal_color_intervals`: values
+    above the last break and nulls get `null_color`.
+
+    Args:
+        values (array-like): Numeric values
+        breaks_values (np.ndarray): Sorted breaks values
+        palette_steps (np.ndarray): RGB color for each break
+        null_color (list, optional): RGB(A) color for null values.
+                                     Defaults to NULL_COLOR_RGB.
+        alpha (int, optional): Opacity of palette colors.
+                               Defaults to DEFAULT_ALPHA.
+
+    Returns:
+        np.ndarray: (N, 4) uint8 RGBA colors
+    """
+    values = np.asarray(values, dtype=float)
+    lut = _rgba_lookup_table(palette_steps, null_color, alpha)
+    # NaN sorts after every break, so nulls fall into the null color row
+    codes = np.searchsorted(np.asarray(breaks_values), values, side="left")
+    return lut[np.minimum(codes, len(lut) - 1)]
+
+
+def categories_to_colors(
+    values,
+    categories,
+    palette_steps: np.ndarray,
+    null_color: list = NULL_COLOR_RGB,
+    alpha: int = DEFAULT_ALPHA,
+) -> np.ndarray:
+    """Function to color values by their position in a list of categories
+
+    Args:
+        values (array-like): Category values
+        categories (array-like): Categories, one per palette step. Values
+                                 in other categories get `null_color`.
+        palette_steps (np.ndarray): RGB color for each category
+        null_color (list, optional): RGB(A) color for null values.
+                                     Defaults to NULL_COLOR_RGB.
+        alpha (int, optional): Opacity of palette colors.
+                               Defaults to DEFAULT_ALPHA.
+
+    Returns:
+        np.ndarray: (N, 4) uint8 RGBA colors
+    """
+    lut = _rgba_lookup_table(palette_steps, null_color, alpha)
+    codes = pd.Index(list(categories)[:len(palette_steps)]).get_indexer(
+        pd.Index(values)
+    )
+    codes[codes < 0] = len(lut) - 1
+    return lut[codes]
+
+
+def assign_color_column(df, colors: np.ndarray, col: str = 'color'):
+    """Function to attach per-row colors to a DataFrame
+
+    The layer then reads them with `get_fill_color='@@=color'` instead of
+    evaluating a deck.gl expression for every feature.
+
+    Args:
+        df (pd.DataFrame or gpd.GeoDataFrame): DataFrame
+        colors (np.ndarray): (N, 4) colors aligned with the rows of `df`
+        col (str, optional): Color column name. Defaults to 'color'.
+
+    Returns:
+        pd.DataFrame or gpd.GeoDataFrame: Copy of `df` with the color column
+    """
+    return df.assign(**{col: colors.tolist()})
 
 
 def get_df_breaks_values(
     df,
     col: str,
     intervals: int,
-    how='equal-size'
+    how='equal-size',
+    mode: str = 'exact',
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
 ) -> np.ndarray:
     """Function to get intervals from a DataFrame
 
+    The column is sorted once (see `get_sorted_values`) and every method
+    derives its breaks from the sorted values, so repeated calls on the
+    same data with other methods or interval counts do not sort it again.
+
     Args:
-        df (pd.DataFrame or gpd.GeoDataFrame): DataFrame
+        df (pd.DataFrame or gpd.GeoDataFrame): DataFrame. In 'streaming'
+                                               mode, also an iterable of
+                                               DataFrame chunks.
         col (str): Column name
         intervals (int): Number of intervals
+        how (str, optional): Methods are 'equal-size', 'equal-interval'
+                             and 'jenks'. Defaults to 'equal-size'.
+        mode (str, optional): 'exact', 'sample' or 'streaming'.
+                              Defaults to 'exact'.
+        sample_size (int, optional): Values sampled in 'sample' mode.
+                                     Defaults to DEFAULT_SAMPLE_SIZE.
 
     Returns:
         np.ndarray: Breaks values
     """
     breaks = intervals - 1
-    series = df[col].dropna()
     if how not in (ACCEPTED_BREAKS_METHODS):
         raise ValueError(
             f"Invalid breaks method. Must be one of {ACCEPTED_BREAKS_METHODS}")
+    if isinstance(df, pd.DataFrame):
+        series = df[col]
+    else:
+        series = (chunk[col] for chunk in df)
+    sorted_values = get_sorted_values(
+        series, mode=mode, sample_size=sample_size
+    )
     if how == 'equal-size':
         num_iters = 0
         while True:
-            breaks_values = pd.qcut(
-                series,
-                q=breaks,
-                retbins=True,
-                duplicates="drop"
-            )[1]
+            breaks_values = quantile_breaks(sorted_values, breaks)
             num_iters += 1
 
             if (len(breaks_values) >= breaks) or (num_iters > MAX_QCUT_ITERS):
@@ -264,12 +433,10 @@ def get_df_breaks_values(
                 breaks += 1
 
     elif how == 'equal-interval':
-        breaks_values = pd.cut(
-            series,
-            bins=breaks,
-            retbins=True,
-            duplicates="drop"
-        )[1]
+        breaks_values = interval_breaks(sorted_values, breaks)
+
+    elif how == 'jenks':
+        breaks_values = jenks_breaks(sorted_values, breaks)
     return breaks_values
 
 
@@ -288,6 +455,51 @@ def get_palette_steps(palette: str, steps: int) -> np.ndarray:
     return rgb_palette[row_indices]
 
 
+# Expressions and legend labels only depend on these hashable arguments, so
+# re-rendering a layer with the same breaks skips rebuilding them
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _equal_intervals_expression(
+    col: str, palette_key, breaks_values: tuple, null_color: tuple
+) -> tuple:
+    palette_steps = get_palette_steps(
+        palette=palette_key, steps=len(breaks_values)
+    )
+
+    value_color_list = zip(breaks_values, palette_steps)
+
+    exp_list = [f"{col} <= {val} ? {color}" for val, color in value_color_list]
+
+    deckgl_expression = f"{' : '.join(exp_list)} : {list(null_color)}"
+
+    labels_dict_list = _get_equal_break_legend_values(
+        np.array(breaks_values),
+        palette_steps,
+        null_color=list(null_color),
+    )
+    return deckgl_expression, tuple(labels_dict_list)
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def _category_expression(
+    col: str, palette_key, categories: tuple, null_color: tuple
+) -> tuple:
+    palette_steps = get_rgb_palette(palette_key)[:len(categories)]
+
+    value_color_list = zip(categories, palette_steps)
+
+    exp_list = [f"{col} === '{val}' ? {color}" for
+                val, color in value_color_list]
+
+    deckgl_expression = f"{' : '.join(exp_list)} : {list(null_color)}"
+
+    labels_dict_list = _get_category_legend_values(
+        categories,
+        palette_steps,
+        null_color=list(null_color)
+    )
+    return deckgl_expression, tuple(labels_dict_list)
+
+
 def equal_color_intervals(
     df,
     col: str,
@@ -299,6 +511,9 @@ def equal_color_intervals(
     legend_title: str = None,
     legend_footer: str = None,
     legend_as_html: bool = True,
+    as_colors: bool = False,
+    alpha: int = DEFAULT_ALPHA,
+    breaks_mode: str = 'exact',
 ) -> str:
     """Function to generate a deck.gl expression to color bins
 
@@ -307,10 +522,18 @@ def equal_color_intervals(
         col (str): Column name
         palette (str): Palette name
         breaks (int): Number of breaks
-        how (str, optional): How to calculate the breaks.
-                             Methods are 'equal-size' and 'equal-interval'.
+        how (str, optional): How to calculate the breaks. Methods are
+                             'equal-size', 'equal-interval' and 'jenks'.
+        breaks_mode (str, optional): 'exact', 'sample' or 'streaming', see
+                                     `get_df_breaks_values`.
+                                     Defaults to 'exact'.
         null_color (list, optional): RGB color list for null values.
                                      Defaults to NULL_COLOR_RGB.
+        as_colors (bool, optional): Return a (N, 4) uint8 RGBA array with
+                                    the color of each row instead of the
+                                    expression. Defaults to False.
+        alpha (int, optional): Opacity used with `as_colors`.
+                               Defaults to DEFAULT_ALPHA.
 
     Raises:
         ValueError: If the number of breaks is lower than 1.
@@ -318,7 +541,7 @@ def equal_color_intervals(
                     of palette steps
 
     Returns:
-        str: Deck.gl expression
+        str or np.ndarray: Deck.gl expression or RGBA colors
     """
     legend = None
 
@@ -340,27 +563,30 @@ def equal_color_intervals(
         df=df,
         col=col,
         intervals=intervals,
-        how=how
+        how=how,
+        mode=breaks_mode,
     )
 
-    palette_steps = get_palette_steps(
-        palette=palette, steps=len(breaks_values)
+    deckgl_expression, labels = _equal_intervals_expression(
+        col,
+        _palette_key(palette),
+        tuple(breaks_values),
+        tuple(null_color),
     )
 
-    value_color_list = zip(breaks_values, palette_steps)
-
-    exp_list = [f"{col} <= {val} ? {color}" for val, color in value_color_list]
-
-    deckgl_expression = f"{' : '.join(exp_list)} : {null_color}"
+    if as_colors is True:
+        deckgl_expression = breaks_to_colors(
+            df[col],
+            breaks_values,
+            get_palette_steps(palette=palette, steps=len(breaks_values)),
+            null_color=null_color,
+            alpha=alpha,
+        )
 
     if return_legend is True:
         title = legend_title if legend_title else col
-        labels_dict_list = _get_equal_break_legend_values(
-            breaks_values,
-            palette_steps
-        )
         legend = create_legend(
-            labels=labels_dict_list,
+            labels=[dict(label) for label in labels],
             title=title,
             footer=legend_footer,
             as_html=legend_as_html,
@@ -378,6 +604,8 @@ def category_color_intervals(
     legend_title: str = None,
     legend_footer: str = None,
     legend_as_html: bool = True,
+    as_colors: bool = False,
+    alpha: int = DEFAULT_ALPHA,
 ) -> str:
     """Function to generate a deck.gl expression to color categories
 
@@ -387,34 +615,39 @@ def category_color_intervals(
         palette (str): Palette name
         null_color (list, optional): Null color RGB value.
                                     Defaults to NULL_COLOR_RGB.
+        as_colors (bool, optional): Return a (N, 4) uint8 RGBA array with
+                                    the color of each row instead of the
+                                    expression. Defaults to False.
+        alpha (int, optional): Opacity used with `as_colors`.
+                               Defaults to DEFAULT_ALPHA.
 
     Returns:
-        str: Deck.gl expression
+        str or np.ndarray: Deck.gl expression or RGBA colors
     """
     legend = None
 
-    full_palette_values = get_rgb_palette(palette)
-
     categories = df[col].unique()
 
-    palette_steps = full_palette_values[:len(categories)]
-
-    value_color_list = zip(categories, palette_steps)
-
-    exp_list = [f"{col} === '{val}' ? {color}" for
-                val, color in value_color_list]
+    deckgl_expression, labels = _category_expression(
+        col,
+        _palette_key(palette),
+        tuple(categories),
+        tuple(null_color),
+    )
 
-    deckgl_expression = f"{' : '.join(exp_list)} : {null_color}"
+    if as_colors is True:
+        deckgl_expression = categories_to_colors(
+            df[col],
+            categories,
+            get_rgb_palette(palette),
+            null_color=null_color,
+            alpha=alpha,
+        )
 
     if return_legend is True:
         title = legend_title if legend_title else col
-        labels_dict_list = _get_category_legend_values(
-            categories,
-            palette_steps,
-            null_color=null_color
-        )
         legend = create_legend(
-            labels=labels_dict_list,
+            labels=[dict(label) for label in labels],
             title=title,
             footer=legend_footer,
             as_html=legend_as_html,
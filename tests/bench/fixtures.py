@@ -0,0 +1,143 @@
+"""Synthetic Madrid-scale fixtures for the benchmarks."""
+from contextlib import contextmanager
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from rasterio.io import MemoryFile
+from rasterio.transform import from_bounds
+
+# Madrid municipality bounds in EPSG:4326 and EPSG:25830
+MADRID_BOUNDS = (-3.89, 40.31, -3.52, 40.56)
+MADRID_METRIC_BOUNDS = (425_000, 4_462_000, 456_000, 4_490_000)
+
+LANE_TYPES = ["CICLOCARRIL", "CARRIL BICI", "SENDA CICLABLE", "PISTA BICI"]
+
+
+def madrid_points(n: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """Accident-like points, clustered around a few hotspots.
+
+    Args:
+        n (int): Number of points.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        gpd.GeoDataFrame: Points in EPSG:4326 with accident attributes.
+    """
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = MADRID_BOUNDS
+    n_clustered = n // 2
+    centers = np.column_stack(
+        [rng.uniform(minx, maxx, 20), rng.uniform(miny, maxy, 20)]
+    )
+    clustered = centers[rng.integers(0, 20, n_clustered)] + rng.normal(
+        0, 0.005, (n_clustered, 2)
+    )
+    uniform = np.column_stack(
+        [
+            rng.uniform(minx, maxx, n - n_clustered),
+            rng.uniform(miny, maxy, n - n_clustered),
+        ]
+    )
+    xy = rng.permutation(np.vstack([clustered, uniform]))
+    return gpd.GeoDataFrame(
+        {
+            "num_expediente": np.arange(n),
+            "cod_lesividad": rng.integers(1, 15, n),
+            "distrito": rng.choice(
+                ["CENTRO", "RETIRO", "SALAMANCA", "CHAMBERÍ", "TETUÁN"], n
+            ),
+            "fecha": pd.Timestamp("2022-01-01")
+            + pd.to_timedelta(rng.integers(0, 365 * 24, n), unit="h"),
+        },
+        geometry=gpd.points_from_xy(xy[:, 0], xy[:, 1]),
+        crs="EPSG:4326",
+    )
+
+
+def lane_network(
+    n_lanes: int, segments_per_lane: int = 5, seed: int = 0
+) -> gpd.GeoDataFrame:
+    """Bike lane-like network of random polylines.
+
+    Args:
+        n_lanes (int): Number of lanes.
+        segments_per_lane (int, optional): Segments per lane. Defaults to 5.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        gpd.GeoDataFrame: One row per segment in EPSG:4326, with the
+                          columns of the bike lane layer.
+    """
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = MADRID_METRIC_BOUNDS
+    n = n_lanes * segments_per_lane
+    n_vertices = segments_per_lane * 9 + 1
+    starts = np.column_stack(
+        [rng.uniform(minx, maxx, n_lanes), rng.uniform(miny, maxy, n_lanes)]
+    )
+    # Each lane is a random walk with vertices 30-80 m apart, split into
+    # segments of 10 vertices sharing their end points
+    steps = rng.normal(0, 1, (n_lanes, n_vertices - 1, 2))
+    steps *= rng.uniform(30, 80, (n_lanes, n_vertices - 1, 1)) / (
+        np.linalg.norm(steps, axis=2, keepdims=True)
+    )
+    walks = np.concatenate(
+        [starts[:, None, :], starts[:, None, :] + np.cumsum(steps, axis=1)],
+        axis=1,
+    )
+    segments = np.stack(
+        [walks[:, 9 * i:9 * i + 10] for i in range(segments_per_lane)],
+        axis=1,
+    )
+    geoms = shapely.linestrings(segments.reshape(n, 10, 2))
+    return gpd.GeoDataFrame(
+        {
+            "TIPO_VIA": rng.choice(LANE_TYPES, n),
+            "ID_VIA": np.repeat(np.arange(n_lanes), segments_per_lane),
+            "id_segmento": np.arange(n),
+        },
+        geometry=geoms,
+        crs="EPSG:25830",
+    ).to_crs("EPSG:4326")
+
+
+@contextmanager
+def madrid_raster(width: int, height: int = None, seed: int = 0):
+    """Single band float32 raster covering Madrid, e.g. a noise map.
+
+    The raster is an in-memory GeoTIFF, opened for the duration of the
+    context.
+
+    Args:
+        width (int): Number of columns.
+        height (int, optional): Number of rows. Defaults to `width`.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Yields:
+        tuple: (band, raster) as taken by `raster_band_to_pandas_h3`.
+    """
+    height = height or width
+    rng = np.random.default_rng(seed)
+    # Smooth field plus noise, so neighbouring pixels are correlated
+    y, x = np.mgrid[0:1:complex(0, height), 0:1:complex(0, width)]
+    band = (
+        50
+        + 20 * np.sin(6 * x) * np.cos(4 * y)
+        + rng.normal(0, 2, (height, width))
+    ).astype(np.float32)
+    profile = {
+        "driver": "GTiff",
+        "width": width,
+        "height": height,
+        "count": 1,
+        "dtype": "float32",
+        "crs": "EPSG:4326",
+        "transform": from_bounds(*MADRID_BOUNDS, width, height),
+    }
+    with MemoryFile() as memory_file:
+        with memory_file.open(**profile) as dataset:
+            dataset.write(band, 1)
+        with memory_file.open() as raster:
+            yield raster.read(1), raster
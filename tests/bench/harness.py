@@ -0,0 +1,135 @@
+"""Timing, memory and baseline helpers for the benchmarks."""
+import json
+import platform
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+
+DEFAULT_REPEAT = 5
+
+DEFAULT_WARMUP = 1
+
+# Allowed slowdown of the median latency before a run is a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure(
+    func: Callable[[], object],
+    items: int = 1,
+    repeat: int = DEFAULT_REPEAT,
+    warmup: int = DEFAULT_WARMUP,
+) -> dict:
+    """Function to time a benchmark and record its peak memory
+
+    `func` runs `warmup` times untimed, then `repeat` times timed. Peak
+    memory comes from one extra run under tracemalloc, so tracing does not
+    slow down the timed runs. It covers Python and NumPy allocations, not
+    buffers allocated by native libraries such as GEOS or Arrow.
+
+    Args:
+        func (Callable): Benchmark body, called without arguments.
+        items (int, optional): Items processed per call, e.g. rows or
+                               addresses, for the throughput. Defaults to 1.
+        repeat (int, optional): Timed runs. Defaults to DEFAULT_REPEAT.
+        warmup (int, optional): Untimed runs. Defaults to DEFAULT_WARMUP.
+
+    Returns:
+        dict: Items per call, latency percentiles in milliseconds,
+              throughput in items per second at the median latency and
+              peak traced memory in MiB.
+    """
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies = np.array(latencies)
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "items": items,
+        "repeat": repeat,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "throughput": items / p50,
+        "peak_memory_mb": peak / 2**20,
+    }
+
+
+def environment() -> dict:
+    """Function to describe the machine a run comes from"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def save_baseline(report: dict, path: str):
+    """Function to save a suite report as a JSON baseline
+
+    Args:
+        report (dict): Report with 'environment', 'params' and 'results'.
+        path (str): Output JSON file.
+    """
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str) -> dict:
+    """Function to load a JSON baseline saved by `save_baseline`"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE
+) -> list:
+    """Function to compare benchmark results against a baseline
+
+    Benchmarks skipped or missing on either side are left out.
+
+    Args:
+        results (dict): Benchmark name mapped to `measure` output.
+        baseline (dict): Same structure, from a saved baseline.
+        tolerance (float, optional): Allowed relative increase of the median
+                                     latency. Defaults to DEFAULT_TOLERANCE.
+
+    Returns:
+        list: One dict per benchmark with the baseline and current median
+              latency and peak memory, their ratios and whether the
+              latency regressed.
+    """
+    rows = []
+    for name in sorted(results.keys() & baseline.keys()):
+        current, previous = results[name], baseline[name]
+        if "p50_ms" not in current or "p50_ms" not in previous:
+            continue
+        latency_ratio = current["p50_ms"] / previous["p50_ms"]
+        rows.append(
+            {
+                "name": name,
+                "baseline_p50_ms": previous["p50_ms"],
+                "p50_ms": current["p50_ms"],
+                "latency_ratio": latency_ratio,
+                "memory_ratio": (
+                    current["peak_memory_mb"] / previous["peak_memory_mb"]
+                    if previous["peak_memory_mb"]
+                    else None
+                ),
+                "regression": latency_ratio > 1 + tolerance,
+            }
+        )
+    return rows
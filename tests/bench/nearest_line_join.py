@@ -0,0 +1,142 @@
+"""Benchmark of nearest_line_join against the notebook's PostGIS query.
+
+Synthetic accidents and bike lanes are assigned in process and, when
+DB_HOST points to a database with PostGIS, loaded with write_gdf and
+assigned with the notebook's JOIN LATERAL query. The outputs are
+compared lane by lane.
+
+Usage:
+    python -m tests.bench.nearest_line_join --points 50000 --lanes 2000
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from research.analysis.join.nearest import (
+    DEFAULT_BEYOND_THRESHOLD,
+    DEFAULT_DISTANCE_THRESHOLD,
+    nearest_line_join,
+)
+from tests.bench.fixtures import lane_network, madrid_points
+
+POINTS_TABLE = "bench_accidentes_bicicletas"
+
+LINES_TABLE = "bench_carriles_bicicleta"
+
+# Notebook query, on the benchmark tables
+POSTGIS_QUERY = f"""
+SELECT a.*,
+        b."TIPO_VIA" as tipo_via_cercana,
+        b."ID_VIA" as id_via,
+        b.id_segmento as id_carril,
+        ST_Distance(a.geometry::geography, b.geometry::geography) as distancia
+FROM {POINTS_TABLE} a
+JOIN LATERAL (
+  SELECT "TIPO_VIA", "ID_VIA", id_segmento, geometry
+  FROM {LINES_TABLE}
+  WHERE "TIPO_VIA" is not NULL
+  ORDER BY a.geometry <-> {LINES_TABLE}.geometry
+  LIMIT 1
+) AS b
+ON true
+"""
+
+
+def _has_postgis(db_client) -> bool:
+    rows = db_client.run_in_transaction(
+        "SELECT count(*) AS n FROM pg_extension WHERE extname = 'postgis'"
+    )
+    return rows[0]["n"] > 0
+
+
+def run_postgis(points_gdf, lines_gdf, threshold) -> tuple:
+    from research.connections import DBClient
+
+    with DBClient() as db_client:
+        if not _has_postgis(db_client):
+            return None, None
+        db_client.write_gdf(points_gdf, POINTS_TABLE, if_exists="replace")
+        db_client.write_gdf(lines_gdf, LINES_TABLE, if_exists="replace")
+        try:
+            start = time.perf_counter()
+            result = db_client.read_sql(
+                POSTGIS_QUERY, geom_col="geometry", cache=False
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            db_client.run_in_transaction(
+                f"DROP TABLE {POINTS_TABLE}, {LINES_TABLE}"
+            )
+    # Threshold applied as in the notebook
+    beyond = result["distancia"] > threshold
+    for col, value in DEFAULT_BEYOND_THRESHOLD.items():
+        result[col] = result[col].where(~beyond, value)
+    return result, elapsed
+
+
+def run(n_points: int, n_lanes: int, n_workers: int = None) -> dict:
+    points_gdf = madrid_points(n_points)
+    lines_gdf = lane_network(n_lanes)
+    threshold = DEFAULT_DISTANCE_THRESHOLD
+
+    start = time.perf_counter()
+    result = nearest_line_join(points_gdf, lines_gdf, n_workers=n_workers)
+    report = {
+        "points": n_points,
+        "lane_segments": len(lines_gdf),
+        "n_workers": n_workers,
+        "nearest_line_join_seconds": time.perf_counter() - start,
+        "postgis_seconds": None,
+    }
+    if not os.environ.get("DB_HOST"):
+        report["postgis"] = "skipped, DB_HOST is not set"
+        return report
+
+    postgis_result, elapsed = run_postgis(points_gdf, lines_gdf, threshold)
+    if postgis_result is None:
+        report["postgis"] = "skipped, PostGIS is not installed"
+        return report
+    postgis_result = postgis_result.set_index("num_expediente").loc[
+        result["num_expediente"]
+    ]
+    same_segment = (
+        postgis_result["id_carril"].to_numpy()
+        == result["id_carril"].to_numpy()
+    ) | (postgis_result["id_carril"].isna() & result["id_carril"].isna())
+    report.update(
+        {
+            "postgis_seconds": elapsed,
+            "same_segment_ratio": float(np.mean(same_segment)),
+            "same_tipo_via_ratio": float(
+                np.mean(
+                    postgis_result["tipo_via_cercana"].to_numpy()
+                    == result["tipo_via_cercana"].to_numpy()
+                )
+            ),
+            "max_distance_diff_m": float(
+                np.nanmax(
+                    np.abs(
+                        postgis_result["distancia"].to_numpy()
+                        - result["distancia"].to_numpy()
+                    )
+                )
+            ),
+        }
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--lanes", type=int, default=2_000)
+    parser.add_argument("--n-workers", type=int, default=None)
+    args = parser.parse_args()
+    print(json.dumps(run(args.points, args.lanes, args.n_workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark of vectorized points_to_h3 against per-point point_to_h3.
+
+The per-point version is timed on a sample and extrapolated to the full
+size, since running it on 10M points takes minutes.
+
+Usage:
+    python -m tests.bench.points_to_h3 --n 10000000 --resolution 9
+"""
+import argparse
+import json
+import time
+
+import geopandas as gpd
+import numpy as np
+
+from research.analysis.transform.h3 import point_to_h3, points_to_h3
+from tests.bench.fixtures import MADRID_BOUNDS
+
+
+def random_points(n: int, seed: int = 0) -> gpd.GeoSeries:
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = MADRID_BOUNDS
+    return gpd.GeoSeries.from_xy(
+        rng.uniform(minx, maxx, n), rng.uniform(miny, maxy, n), crs=4326
+    )
+
+
+def run(n: int, resolution: int, sample: int, n_workers: int = None):
+    points = random_points(n)
+
+    start = time.perf_counter()
+    cells = points_to_h3(points, resolution, n_workers=n_workers)
+    vectorized = time.perf_counter() - start
+
+    sample = min(sample, n)
+    start = time.perf_counter()
+    sample_cells = points[:sample].apply(point_to_h3, resolution=resolution)
+    per_point = (time.perf_counter() - start) * n / sample
+
+    # Both paths must agree
+    expected = sample_cells.map(lambda cell: int(cell, 16)).to_numpy()
+    assert (cells[:sample].to_numpy() == expected).all()
+    return {
+        "n": n,
+        "resolution": resolution,
+        "n_workers": n_workers,
+        "points_to_h3_seconds": vectorized,
+        "point_to_h3_apply_seconds": per_point,
+        "per_point_sample": sample,
+        "speedup": per_point / vectorized,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=10_000_000)
+    parser.add_argument("--resolution", type=int, default=9)
+    parser.add_argument("--sample", type=int, default=200_000)
+    parser.add_argument("--n-workers", type=int, default=None)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            run(args.n, args.resolution, args.sample, args.n_workers),
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
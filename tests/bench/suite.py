@@ -0,0 +1,387 @@
+"""Benchmark suite for DBClient, H3 transforms, viz styling and geocoding.
+
+Every benchmark runs on synthetic Madrid-scale fixtures and reports its
+throughput, p50/p95 latency and peak memory. Results can be saved as a
+JSON baseline and later runs compared against it; the command exits with
+status 1 when a median latency regresses beyond the tolerance. The
+database benchmarks need DB_HOST (and PostGIS for geometry columns) and
+are reported as skipped otherwise.
+
+Usage:
+    python -m tests.bench.suite --size small \\
+        --save tests/bench/baselines/small.json
+    python -m tests.bench.suite --size small \\
+        --compare tests/bench/baselines/small.json
+"""
+import argparse
+import fnmatch
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+
+from research.analysis.transform.h3 import (
+    point_to_h3,
+    points_to_h3,
+    raster_band_to_pandas_h3,
+)
+from research.utils.geocoder import Geocoder
+from research.viz import breaks
+from research.viz.plot import (
+    category_color_intervals,
+    equal_color_intervals,
+    get_df_breaks_values,
+)
+from tests.bench.fixtures import madrid_points, madrid_raster
+from tests.bench.harness import (
+    DEFAULT_REPEAT,
+    DEFAULT_TOLERANCE,
+    compare,
+    environment,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+
+SIZES = {
+    "small": {
+        "points": 10_000,
+        "raster_size": 250,
+        "addresses": 200,
+        "db_rows": 10_000,
+    },
+    "madrid": {
+        "points": 200_000,
+        "raster_size": 2_000,
+        "addresses": 2_000,
+        "db_rows": 200_000,
+    },
+}
+
+H3_RESOLUTION = 9
+
+# point_to_h3 is per point, so it runs on a sample of the points
+POINT_TO_H3_SAMPLE = 10_000
+
+DB_TABLE = "bench_suite_accidentes"
+
+DB_TRANSACTION_CALLS = 50
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def _clear_breaks_cache():
+    # Every run must sort the column, not hit the cache of the last one
+    with breaks._sorted_cache_lock:
+        breaks._sorted_cache.clear()
+
+
+@benchmark("point_to_h3")
+def bench_point_to_h3(params: dict, repeat: int) -> dict:
+    points = madrid_points(min(params["points"], POINT_TO_H3_SAMPLE)).geometry
+    return measure(
+        lambda: [point_to_h3(point, H3_RESOLUTION) for point in points],
+        items=len(points),
+        repeat=repeat,
+    )
+
+
+@benchmark("points_to_h3")
+def bench_points_to_h3(params: dict, repeat: int) -> dict:
+    points = madrid_points(params["points"]).geometry
+    return measure(
+        lambda: points_to_h3(points, H3_RESOLUTION, n_workers=1),
+        items=len(points),
+        repeat=repeat,
+    )
+
+
+@benchmark("raster_band_to_pandas_h3")
+def bench_raster_band_to_pandas_h3(params: dict, repeat: int) -> dict:
+    size = params["raster_size"]
+    with madrid_raster(size) as (band, raster):
+        return measure(
+            lambda: raster_band_to_pandas_h3(band, raster),
+            items=band.size,
+            repeat=repeat,
+        )
+
+
+def _values_df(params: dict) -> pd.DataFrame:
+    points_df = madrid_points(params["points"])
+    return pd.DataFrame(
+        {
+            "cod_lesividad": points_df["cod_lesividad"].astype(float),
+            "distrito": points_df["distrito"],
+        }
+    )
+
+
+def _bench_breaks(params: dict, repeat: int, **kwargs) -> dict:
+    df = _values_df(params)
+
+    def run():
+        _clear_breaks_cache()
+        return get_df_breaks_values(df, "cod_lesividad", 7, **kwargs)
+
+    return measure(run, items=len(df), repeat=repeat)
+
+
+@benchmark("get_df_breaks_values[equal-size]")
+def bench_breaks_equal_size(params: dict, repeat: int) -> dict:
+    return _bench_breaks(params, repeat, how="equal-size")
+
+
+@benchmark("get_df_breaks_values[equal-interval]")
+def bench_breaks_equal_interval(params: dict, repeat: int) -> dict:
+    return _bench_breaks(params, repeat, how="equal-interval")
+
+
+@benchmark("get_df_breaks_values[streaming]")
+def bench_breaks_streaming(params: dict, repeat: int) -> dict:
+    return _bench_breaks(params, repeat, mode="streaming")
+
+
+@benchmark("equal_color_intervals")
+def bench_equal_color_intervals(params: dict, repeat: int) -> dict:
+    df = _values_df(params)
+
+    def run():
+        _clear_breaks_cache()
+        return equal_color_intervals(
+            df, "cod_lesividad", "sunset", 7, as_colors=True
+        )
+
+    return measure(run, items=len(df), repeat=repeat)
+
+
+@benchmark("category_color_intervals")
+def bench_category_color_intervals(params: dict, repeat: int) -> dict:
+    df = _values_df(params)
+    return measure(
+        lambda: category_color_intervals(
+            df, "distrito", "pastel", as_colors=True
+        ),
+        items=len(df),
+        repeat=repeat,
+    )
+
+
+def _stub_geocoder(n_addresses: int) -> tuple:
+    rng = np.random.default_rng(0)
+    points = {
+        f"Calle {i}, Madrid": Point(
+            rng.uniform(-3.89, -3.52), rng.uniform(40.31, 40.56)
+        )
+        for i in range(n_addresses)
+    }
+    geocoder = Geocoder(
+        "stub", geocode_func=points.get, rate_limit=0,
+        cache_size=n_addresses,
+    )
+    return geocoder, list(points)
+
+
+@benchmark("geocode_address[miss]")
+def bench_geocode_address_miss(params: dict, repeat: int) -> dict:
+    geocoder, addresses = _stub_geocoder(params["addresses"])
+
+    def run():
+        geocoder.cache.clear()
+        return [geocoder.geocode_address(address) for address in addresses]
+
+    return measure(run, items=len(addresses), repeat=repeat)
+
+
+@benchmark("geocode_address[hit]")
+def bench_geocode_address_hit(params: dict, repeat: int) -> dict:
+    geocoder, addresses = _stub_geocoder(params["addresses"])
+    for address in addresses:
+        geocoder.geocode_address(address)
+    return measure(
+        lambda: [geocoder.geocode_address(address) for address in addresses],
+        items=len(addresses),
+        repeat=repeat,
+    )
+
+
+def _has_postgis(db_client) -> bool:
+    rows = db_client.run_in_transaction(
+        "SELECT count(*) AS n FROM pg_extension WHERE extname = 'postgis'"
+    )
+    return rows[0]["n"] > 0
+
+
+def _bench_db(func):
+    """Run `func(db_client)` on a fresh client, or skip without DB_HOST"""
+    if not os.environ.get("DB_HOST"):
+        return {"skipped": "DB_HOST is not set"}
+    from research.connections import DBClient
+
+    with DBClient() as db_client:
+        return func(db_client)
+
+
+@benchmark("DBClient.read_sql")
+def bench_read_sql(params: dict, repeat: int) -> dict:
+    def run(db_client):
+        db_client.run_in_transaction(
+            f"""
+            DROP TABLE IF EXISTS {DB_TABLE};
+            CREATE TABLE {DB_TABLE} AS
+            SELECT i AS num_expediente,
+                   mod(i, 14) + 1 AS cod_lesividad,
+                   'DISTRITO ' || mod(i, 21) AS distrito,
+                   timestamp '2022-01-01' + i * interval '1 minute' AS fecha
+            FROM generate_series(1, %s) AS i
+            """,
+            (params["db_rows"],),
+        )
+        try:
+            return measure(
+                lambda: db_client.read_sql(
+                    f"SELECT * FROM {DB_TABLE}", cache=False
+                ),
+                items=params["db_rows"],
+                repeat=repeat,
+            )
+        finally:
+            db_client.run_in_transaction(f"DROP TABLE {DB_TABLE}")
+
+    return _bench_db(run)
+
+
+@benchmark("DBClient.read_sql[geometry]")
+def bench_read_sql_geometry(params: dict, repeat: int) -> dict:
+    def run(db_client):
+        if not _has_postgis(db_client):
+            return {"skipped": "PostGIS is not installed"}
+        points_gdf = madrid_points(params["db_rows"])
+        db_client.write_gdf(points_gdf, DB_TABLE, if_exists="replace")
+        try:
+            return measure(
+                lambda: db_client.read_sql(
+                    f"SELECT * FROM {DB_TABLE}",
+                    geom_col="geometry",
+                    binary_geom=True,
+                    cache=False,
+                ),
+                items=len(points_gdf),
+                repeat=repeat,
+            )
+        finally:
+            db_client.run_in_transaction(f"DROP TABLE {DB_TABLE}")
+
+    return _bench_db(run)
+
+
+@benchmark("DBClient.run_in_transaction")
+def bench_run_in_transaction(params: dict, repeat: int) -> dict:
+    def run(db_client):
+        db_client.run_in_transaction(
+            f"""
+            DROP TABLE IF EXISTS {DB_TABLE};
+            CREATE TABLE {DB_TABLE} (id int PRIMARY KEY, n int);
+            INSERT INTO {DB_TABLE} SELECT i, 0 FROM generate_series(1, 100) i
+            """
+        )
+
+        def transactions():
+            # Short writes, as issued by the notebook's update statements
+            for i in range(DB_TRANSACTION_CALLS):
+                db_client.run_in_transaction(
+                    f"UPDATE {DB_TABLE} SET n = n + 1 WHERE id = %s",
+                    (i % 100 + 1,),
+                )
+
+        try:
+            return measure(
+                transactions, items=DB_TRANSACTION_CALLS, repeat=repeat
+            )
+        finally:
+            db_client.run_in_transaction(f"DROP TABLE {DB_TABLE}")
+
+    return _bench_db(run)
+
+
+def run(params: dict, repeat: int = DEFAULT_REPEAT, only: str = None):
+    """Function to run the selected benchmarks
+
+    Args:
+        params (dict): Fixture sizes, see SIZES.
+        repeat (int, optional): Timed runs per benchmark.
+                                Defaults to DEFAULT_REPEAT.
+        only (str, optional): fnmatch pattern of benchmark names.
+                              Defaults to None (every benchmark).
+
+    Returns:
+        dict: Report with the environment, params and results per
+              benchmark.
+    """
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if only and not fnmatch.fnmatch(name, only):
+            continue
+        results[name] = func(params, repeat)
+        print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+    return {
+        "environment": environment(),
+        "params": {**params, "repeat": repeat},
+        "results": results,
+    }
+
+
+def _format_comparison(rows: list) -> str:
+    lines = [
+        f"{'benchmark':<38} {'baseline':>10} {'current':>10} {'ratio':>7}"
+    ]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['name']:<38} {row['baseline_p50_ms']:>8.1f}ms "
+            f"{row['p50_ms']:>8.1f}ms {row['latency_ratio']:>7.2f}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", help="fnmatch pattern of benchmark names")
+    parser.add_argument("--save", help="write the report to this baseline")
+    parser.add_argument("--compare", help="baseline to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE
+    )
+    args = parser.parse_args()
+
+    report = run(SIZES[args.size], repeat=args.repeat, only=args.only)
+    if args.save:
+        save_baseline(report, args.save)
+    if not args.compare:
+        print(json.dumps(report, indent=2))
+        return
+
+    baseline = load_baseline(args.compare)
+    if baseline["params"] != report["params"]:
+        print("Warning: baseline was run with other params", file=sys.stderr)
+    rows = compare(report["results"], baseline["results"], args.tolerance)
+    print(_format_comparison(rows))
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
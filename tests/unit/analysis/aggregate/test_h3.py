@@ -0,0 +1,119 @@
+import h3
+import numpy as np
+import pandas as pd
+import pytest
+
+from research.analysis.aggregate import (
+    aggregate_cells,
+    build_rollups,
+    compact_uniform,
+    rollup,
+)
+from research.analysis.transform import cells_resolution, cells_to_parent
+
+SOL = h3.str_to_int(h3.latlng_to_cell(40.4168, -3.7038, 9))
+
+
+def test_build_rollups_empty():
+    empty_df = aggregate_cells(np.array([], dtype=np.uint64))
+    assert build_rollups(empty_df, [7, 8]) == {}
+
+
+def test_build_rollups_matches_direct_aggregation():
+    cells = np.array(
+        [h3.str_to_int(cell) for cell in h3.grid_disk(h3.int_to_str(SOL), 3)],
+        dtype=np.uint64,
+    )
+    values = np.arange(len(cells), dtype=np.float64)
+    levels = build_rollups(aggregate_cells(cells, values), [7, 8])
+    assert sorted(levels) == [7, 8, 9]
+
+    parents = np.array(
+        [
+            h3.str_to_int(h3.cell_to_parent(h3.int_to_str(int(cell)), 7))
+            for cell in cells
+        ],
+        dtype=np.uint64,
+    )
+    expected = aggregate_cells(parents, values)
+    pd.testing.assert_frame_equal(
+        levels[7].reset_index(drop=True),
+        expected[levels[7].columns].reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def to_int(cells) -> np.ndarray:
+    return np.array(sorted(h3.str_to_int(cell) for cell in cells), np.uint64)
+
+
+def children(cell: str, resolution: int) -> np.ndarray:
+    return to_int(h3.cell_to_children(cell, resolution))
+
+
+def compacted(df) -> set:
+    return set(df["h3"].tolist())
+
+
+@pytest.fixture
+def uniform_cells():
+    # A disk at res 9 around Sol plus every res 9 cell of a pentagon at
+    # res 7, whose children are 1 pentagon and 5 hexagons per level
+    pentagon = sorted(h3.get_pentagons(7))[0]
+    return np.r_[
+        to_int(h3.grid_disk(h3.int_to_str(SOL), 6)), children(pentagon, 9)
+    ]
+
+
+def test_compact_uniform_matches_h3(uniform_cells):
+    df = pd.DataFrame({"h3": uniform_cells, "value": 1.0})
+    result = compact_uniform(df, "value")
+    expected = h3.compact_cells(
+        [h3.int_to_str(int(cell)) for cell in uniform_cells]
+    )
+    assert compacted(result) == set(to_int(expected).tolist())
+    assert len(result) < len(df)
+    assert (result["value"] == 1.0).all()
+
+
+def test_compact_uniform_min_resolution(uniform_cells):
+    df = pd.DataFrame({"h3": uniform_cells, "value": 1.0})
+    result = compact_uniform(df, "value", min_resolution=8)
+    assert set(cells_resolution(result["h3"].values)) == {8, 9}
+    assert len(result) > len(compact_uniform(df, "value"))
+
+
+def test_compact_uniform_keeps_non_uniform_groups():
+    parent = h3.cell_to_parent(h3.int_to_str(SOL), 8)
+    cells = children(parent, 9)
+    values = np.ones(len(cells))
+    values[0] = 2.0
+    df = pd.DataFrame({"h3": cells, "value": values})
+    assert compacted(compact_uniform(df, "value")) == set(cells.tolist())
+
+    # Uniform, but incomplete
+    df = pd.DataFrame({"h3": cells[1:], "value": 1.0})
+    assert compacted(compact_uniform(df, "value")) == set(cells[1:].tolist())
+
+
+def test_rollup_mean():
+    cells = to_int(h3.grid_disk(h3.int_to_str(SOL), 3))
+    values = np.arange(len(cells), dtype=np.float64)
+    agg_df = aggregate_cells(cells, values, stats=["count", "sum", "mean"])
+    result = rollup(agg_df, 7)
+    parents = cells_to_parent(cells, 7)
+    expected = pd.Series(values).groupby(parents).mean()
+    np.testing.assert_array_equal(result["h3"], expected.index)
+    np.testing.assert_allclose(result["mean"], expected.values)
+
+    with pytest.raises(ValueError):
+        rollup(agg_df[["h3", "mean"]], 7)
+
+
+def test_build_rollups_skips_finer_resolutions():
+    agg_df = aggregate_cells(to_int(h3.grid_disk(h3.int_to_str(SOL), 2)))
+    levels = build_rollups(agg_df, [10, 9, 8])
+    assert sorted(levels) == [8, 9]
+    assert levels[9] is agg_df
+    assert levels[8]["count"].sum() == agg_df["count"].sum()
+
@@ -0,0 +1,143 @@
+import h3
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from research.analysis.construct import (
+    fill_cells,
+    getis_ord_g_star,
+    h3_weights,
+    local_moran,
+)
+
+SOL = h3.latlng_to_cell(40.4168, -3.7038, 9)
+
+
+def disk(cell: str, k: int) -> list:
+    return [h3.str_to_int(c) for c in h3.grid_disk(cell, k)]
+
+
+@pytest.fixture
+def cells():
+    # Study area with a hole, so some neighbours are missing
+    hole = sorted(disk(SOL, 2))[3]
+    cells = np.array(disk(SOL, 4), dtype=np.uint64)
+    return np.sort(cells[cells != hole])
+
+
+@pytest.fixture
+def values(cells):
+    rng = np.random.default_rng(0)
+    return rng.poisson(3, len(cells)).astype(np.float64)
+
+
+def brute_force_weights(cells, k, include_self) -> np.ndarray:
+    index = {int(cell): i for i, cell in enumerate(cells)}
+    weights = np.zeros((len(cells), len(cells)))
+    for i, cell in enumerate(cells):
+        for neighbour in disk(h3.int_to_str(int(cell)), k):
+            j = index.get(neighbour)
+            if j is not None and (include_self or j != i):
+                weights[i, j] = 1
+    return weights
+
+
+@pytest.mark.parametrize("k", [1, 2])
+@pytest.mark.parametrize("include_self", [False, True])
+def test_h3_weights_match_brute_force(cells, k, include_self):
+    expected = brute_force_weights(cells, k, include_self)
+    weights = h3_weights(cells, k=k, include_self=include_self)
+    np.testing.assert_array_equal(weights.toarray(), expected)
+
+    row_standardized = h3_weights(
+        cells, k=k, include_self=include_self, transform="r"
+    )
+    np.testing.assert_allclose(
+        row_standardized.toarray(),
+        expected / expected.sum(axis=1, keepdims=True),
+    )
+
+
+def test_h3_weights_rejects_duplicates(cells):
+    with pytest.raises(ValueError):
+        h3_weights(np.r_[cells, cells[:1]])
+
+
+def test_getis_ord_g_star_matches_brute_force(cells, values):
+    weights = brute_force_weights(cells, 1, include_self=True)
+    n = len(values)
+    mean = values.mean()
+    s = np.sqrt((values**2).sum() / n - mean**2)
+    expected = np.empty(n)
+    for i in range(n):
+        w = weights[i]
+        expected[i] = (w @ values - mean * w.sum()) / (
+            s * np.sqrt((n * (w**2).sum() - w.sum() ** 2) / (n - 1))
+        )
+
+    result = getis_ord_g_star(cells, values)
+    np.testing.assert_array_equal(result["h3"], cells)
+    np.testing.assert_allclose(result["z"], expected)
+    np.testing.assert_allclose(result["p"], 2 * norm.sf(np.abs(expected)))
+
+
+def test_local_moran_matches_brute_force(cells, values):
+    weights = brute_force_weights(cells, 1, include_self=False)
+    weights /= weights.sum(axis=1, keepdims=True)
+    n = len(values)
+    z = values - values.mean()
+    m2 = (z**2).sum() / n
+    b2 = (z**4).sum() / n / m2**2
+
+    result = local_moran(cells, values)
+    for i in range(n):
+        w = weights[i]
+        local_i = z[i] / m2 * (w @ z)
+        wi, wi2 = w.sum(), (w**2).sum()
+        expected_i = -wi / (n - 1)
+        variance = (
+            wi2 * (n - b2) / (n - 1)
+            + (wi**2 - wi2) * (2 * b2 - n) / ((n - 1) * (n - 2))
+            - expected_i**2
+        )
+        assert result["I"][i] == pytest.approx(local_i)
+        assert result["z"][i] == pytest.approx(
+            (local_i - expected_i) / np.sqrt(variance)
+        )
+
+    # With row standardized weights, the mean local I is the global I
+    global_i = (z @ weights @ z) / (z @ z)
+    assert result["I"].mean() == pytest.approx(global_i)
+
+
+def test_fill_cells_adds_k_ring_cells():
+    sol = h3.str_to_int(SOL)
+    result = fill_cells([sol], [5.0], k=1)
+    assert sorted(result["h3"]) == sorted(disk(SOL, 1))
+    assert result["value"].sum() == 5.0
+    assert result.loc[result["h3"] == sol, "value"].item() == 5.0
+    assert (result["value"] == 0).sum() == 6
+
+
+def test_fill_cells_with_area_cells(cells, values):
+    non_empty = values > 0
+    result = fill_cells(
+        cells[non_empty], values[non_empty], area_cells=cells, fill_value=0
+    )
+    np.testing.assert_array_equal(result["h3"], cells)
+    np.testing.assert_array_equal(result["value"], values)
+
+
+def test_fill_cells_changes_g_star(cells, values):
+    # Gi* on the non-empty cells only differs from Gi* on the study area
+    non_empty = values > 0
+    assert not non_empty.all()
+    sparse_result = getis_ord_g_star(cells[non_empty], values[non_empty])
+    filled = fill_cells(cells[non_empty], values[non_empty], area_cells=cells)
+    filled_result = getis_ord_g_star(filled["h3"], filled["value"])
+    np.testing.assert_allclose(
+        filled_result["z"], getis_ord_g_star(cells, values)["z"]
+    )
+    assert not np.allclose(
+        sparse_result["z"], filled_result["z"][non_empty]
+    )
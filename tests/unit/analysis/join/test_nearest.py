@@ -0,0 +1,91 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from research.analysis.join import nearest_line_join
+
+X0, Y0 = 440_000, 4_474_000
+
+
+@pytest.fixture
+def lines_gdf():
+    return gpd.GeoDataFrame(
+        {
+            "TIPO_VIA": ["CICLOCARRIL", "CARRIL BICI"],
+            "ID_VIA": [10, 20],
+            "id_segmento": [1, 2],
+        },
+        geometry=[
+            shapely.LineString([(X0, Y0), (X0 + 1000, Y0)]),
+            shapely.LineString([(X0, Y0 + 500), (X0 + 1000, Y0 + 500)]),
+        ],
+        crs="EPSG:25830",
+    ).to_crs("EPSG:4326")
+
+
+@pytest.fixture
+def points_gdf():
+    return gpd.GeoDataFrame(
+        {"num_expediente": [7, 8, 9]},
+        geometry=[
+            shapely.Point(X0 + 10, Y0 + 10),
+            shapely.Point(X0 + 10, Y0 + 100),
+            shapely.Point(X0 + 500, Y0 + 480),
+        ],
+        index=[30, 10, 20],
+        crs="EPSG:25830",
+    ).to_crs("EPSG:4326")
+
+
+def test_nearest_line_join_matches_notebook_threshold(points_gdf, lines_gdf):
+    result = nearest_line_join(points_gdf, lines_gdf)
+    assert result.index.tolist() == [30, 10, 20]
+    assert result["tipo_via_cercana"].tolist() == [
+        "CICLOCARRIL",
+        "Ninguna",
+        "CARRIL BICI",
+    ]
+    assert result["id_via"].tolist() == [10, 10, 20]
+    np.testing.assert_array_equal(result["id_carril"], [1, np.nan, 2])
+    np.testing.assert_allclose(result["distancia"], [10, 100, 20], atol=0.01)
+
+
+def test_nearest_line_join_without_threshold(points_gdf, lines_gdf):
+    result = nearest_line_join(points_gdf, lines_gdf, threshold=None)
+    assert result["tipo_via_cercana"].tolist() == [
+        "CICLOCARRIL",
+        "CICLOCARRIL",
+        "CARRIL BICI",
+    ]
+    assert result["id_carril"].tolist() == [1, 1, 2]
+
+
+def test_nearest_line_join_max_distance(points_gdf, lines_gdf):
+    result = nearest_line_join(
+        points_gdf, lines_gdf, max_distance=50, threshold=None
+    )
+    assert result["id_carril"].isna().tolist() == [False, True, False]
+    assert np.isnan(result["distancia"].iloc[1])
+
+
+def test_nearest_line_join_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lines = shapely.linestrings(
+        rng.uniform(0, 1000, (50, 4, 2)) + [X0, Y0]
+    )
+    points = shapely.points(rng.uniform(0, 1000, (500, 2)) + [X0, Y0])
+    lines_gdf = gpd.GeoDataFrame(
+        {"TIPO_VIA": "CICLOCARRIL", "ID_VIA": 1, "id_segmento": range(50)},
+        geometry=lines,
+        crs="EPSG:25830",
+    )
+    points_gdf = gpd.GeoDataFrame(geometry=points, crs="EPSG:25830")
+    result = nearest_line_join(
+        points_gdf, lines_gdf, threshold=None, chunksize=64
+    )
+    distances = shapely.distance(points[:, None], lines[None, :])
+    np.testing.assert_allclose(result["distancia"], distances.min(axis=1))
+    np.testing.assert_array_equal(
+        result["id_carril"], distances.argmin(axis=1)
+    )
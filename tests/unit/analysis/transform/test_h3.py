@@ -0,0 +1,253 @@
+import geopandas as gpd
+import h3
+import numpy as np
+import pandas as pd
+import pytest
+import rasterio
+from h3ronpy.raster import raster_to_dataframe
+from rasterio.transform import from_bounds
+from shapely.geometry import LineString, Point
+
+from research.analysis.transform import (
+    cells_resolution,
+    cells_to_parent,
+    cells_to_str,
+    h3_column_to_str,
+    iter_raster_h3_tiles,
+    point_to_h3,
+    points_to_h3,
+    raster_band_to_pandas_h3,
+    raster_bands_to_pandas_h3,
+    resolve_h3_resolution,
+)
+from research.analysis.transform.h3 import _cached_h3_resolution
+
+RESOLUTION = 9
+
+RASTER_BOUNDS = (-3.75, 40.38, -3.65, 40.45)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    lng = rng.uniform(-3.89, -3.52, 200)
+    lat = rng.uniform(40.31, 40.56, 200)
+    # Non-default index, which the result must keep
+    return gpd.GeoSeries(
+        gpd.points_from_xy(lng, lat), index=np.arange(200) * 2
+    )
+
+
+def write_raster(path, dtype, nodata=None, count=1, width=60, height=50):
+    """Random raster with a nodata corner, and NaNs in float rasters"""
+    rng = np.random.default_rng(0)
+    data = rng.integers(1, 5, (count, height, width)).astype(dtype)
+    data[:, :5, :7] = 0 if nodata is None else nodata
+    if np.issubdtype(np.dtype(dtype), np.floating):
+        data[0, 10:12, 10:12] = np.nan
+    profile = {
+        "driver": "GTiff",
+        "width": width,
+        "height": height,
+        "count": count,
+        "dtype": dtype,
+        "crs": "EPSG:4326",
+        "transform": from_bounds(*RASTER_BOUNDS, width, height),
+        "nodata": nodata,
+    }
+    with rasterio.open(path, "w", **profile) as dataset:
+        dataset.write(data)
+    return str(path)
+
+
+def sort_cells(h3_df: pd.DataFrame) -> pd.DataFrame:
+    # h3ronpy converts in parallel, so the row order is not fixed
+    return h3_df.sort_values("h3").reset_index(drop=True)
+
+
+@pytest.fixture
+def raster_path(tmp_path):
+    return write_raster(tmp_path / "raster.tif", "uint8")
+
+
+def expected_cells(points) -> np.ndarray:
+    return np.array(
+        [h3.str_to_int(point_to_h3(point, RESOLUTION)) for point in points],
+        dtype=np.uint64,
+    )
+
+
+def test_points_to_h3_matches_h3(points):
+    result = points_to_h3(points, RESOLUTION)
+    assert isinstance(result, pd.Series)
+    assert result.dtype == np.uint64
+    pd.testing.assert_index_equal(result.index, points.index)
+    np.testing.assert_array_equal(result.values, expected_cells(points))
+
+
+@pytest.mark.parametrize("chunksize", [7, 1_000])
+def test_points_to_h3_from_coordinates(points, chunksize):
+    coords = np.column_stack([points.x, points.y])
+    result = points_to_h3(coords, RESOLUTION, chunksize=chunksize)
+    np.testing.assert_array_equal(result, expected_cells(points))
+
+
+def test_points_to_h3_invalid_geometries(points):
+    values = points.values.copy()
+    invalid = {
+        0: None,
+        1: Point(),
+        2: LineString([(-3.7, 40.4), (-3.6, 40.5)]),
+        3: Point(np.nan, 40.4),
+    }
+    for i, geometry in invalid.items():
+        values[i] = geometry
+    result = points_to_h3(values, RESOLUTION, as_str=True)
+    assert result[:4].tolist() == [None] * 4
+    assert result[4:].tolist() == [
+        point_to_h3(point, RESOLUTION) for point in points.values[4:]
+    ]
+
+
+def test_points_to_h3_workers(points):
+    result = points_to_h3(points, RESOLUTION, chunksize=50, n_workers=2)
+    np.testing.assert_array_equal(result.values, expected_cells(points))
+
+
+def test_cells_to_str_matches_h3(points):
+    cells = np.r_[expected_cells(points), np.uint64(0)]
+    result = cells_to_str(cells, chunksize=64)
+    assert result.dtype == object
+    assert result[:-1].tolist() == [h3.int_to_str(int(c)) for c in cells[:-1]]
+    assert result[-1] is None
+
+
+def test_cells_to_parent_and_resolution_match_h3(points):
+    pentagon = sorted(h3.get_pentagons(7))[0]
+    pentagon_children = [
+        h3.str_to_int(cell) for cell in h3.cell_to_children(pentagon, 9)
+    ]
+    cells = np.r_[
+        expected_cells(points),
+        np.array(pentagon_children, dtype=np.uint64),
+        np.uint64(0),
+    ]
+    assert (cells_resolution(cells[:-1]) == RESOLUTION).all()
+    for resolution in (0, 5, 7, 9):
+        expected = [
+            h3.str_to_int(
+                h3.cell_to_parent(h3.int_to_str(int(cell)), resolution)
+            )
+            for cell in cells[:-1]
+        ]
+        parents = cells_to_parent(cells, resolution)
+        np.testing.assert_array_equal(parents[:-1], expected)
+        assert parents[-1] == 0
+        assert (cells_resolution(parents[:-1]) == resolution).all()
+
+
+def test_raster_band_to_pandas_h3_keeps_uint64(raster_path):
+    with rasterio.open(raster_path) as raster:
+        h3_df = raster_band_to_pandas_h3(raster.read(1), raster)
+        str_df = raster_band_to_pandas_h3(
+            raster.read(1), raster, h3_as_str=True
+        )
+    assert h3_df["h3"].dtype == np.uint64
+    assert not h3_df["h3"].duplicated().any()
+    h3_df, str_df = sort_cells(h3_df), sort_cells(str_df)
+    assert str_df["h3"].tolist() == [
+        h3.int_to_str(int(cell)) for cell in h3_df["h3"]
+    ]
+    pd.testing.assert_frame_equal(h3_column_to_str(h3_df), str_df)
+
+
+@pytest.mark.parametrize(
+    "dtype, nodata",
+    [("uint8", 0), ("float32", -9999.0), ("float32", np.nan),
+     ("float32", None)],
+)
+def test_raster_band_to_pandas_h3_drops_nodata(tmp_path, dtype, nodata):
+    path = write_raster(tmp_path / "raster.tif", dtype, nodata)
+    with rasterio.open(path) as raster:
+        band = raster.read(1)
+        h3_df = raster_band_to_pandas_h3(band, raster)
+        all_df = raster_to_dataframe(
+            band,
+            raster.transform,
+            resolve_h3_resolution(band.shape, raster.transform, raster.crs),
+            compact=False,
+        ).to_pandas()
+    if nodata is None or np.isnan(nodata):
+        expected = all_df[all_df["value"].notna()]
+    else:
+        expected = all_df[all_df["value"] != nodata]
+        # NaN is only nodata when the raster says so
+        assert expected["value"].isna().any() == (dtype == "float32")
+    assert len(expected) < len(all_df)
+    pd.testing.assert_frame_equal(
+        sort_cells(h3_df), sort_cells(expected.rename(columns={"cell": "h3"}))
+    )
+
+
+@pytest.mark.parametrize(
+    "dtype, nodata", [("uint8", 0), ("float32", -9999.0), ("float32", None)]
+)
+def test_raster_bands_to_pandas_h3_matches_per_band(tmp_path, dtype, nodata):
+    path = write_raster(tmp_path / "raster.tif", dtype, nodata, count=3)
+    with rasterio.open(path) as raster:
+        h3_df = raster_bands_to_pandas_h3(raster, bands=[3, 1])
+        expected = None
+        for band in (3, 1):
+            band_df = raster_band_to_pandas_h3(
+                raster.read(band), raster
+            ).rename(columns={"value": f"band_{band}"})
+            expected = (
+                band_df
+                if expected is None
+                else expected.merge(band_df, on="h3", how="outer")
+            )
+    assert list(h3_df.columns) == ["h3", "band_3", "band_1"]
+    pd.testing.assert_frame_equal(
+        sort_cells(h3_df),
+        sort_cells(expected[h3_df.columns]),
+        check_dtype=False,
+    )
+
+
+def test_resolve_h3_resolution_is_memoized(raster_path):
+    _cached_h3_resolution.cache_clear()
+    with rasterio.open(raster_path) as raster:
+        resolutions = {
+            resolve_h3_resolution(raster.shape, raster.transform, raster.crs)
+            for _ in range(3)
+        }
+        raster_band_to_pandas_h3(raster.read(1), raster)
+    info = _cached_h3_resolution.cache_info()
+    assert len(resolutions) == 1
+    assert (info.misses, info.hits) == (1, 3)
+
+
+@pytest.mark.parametrize(
+    "dtype, nodata", [("uint8", 0), ("float32", -9999.0), ("float32", None)]
+)
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"tile_size": 16},
+        {"tile_size": 16, "overlap": 3},
+        {"tile_size": None},
+        {"tile_size": 25, "n_workers": 2},
+    ],
+)
+def test_iter_raster_h3_tiles_matches_full_band(
+    tmp_path, dtype, nodata, kwargs
+):
+    path = write_raster(tmp_path / "raster.tif", dtype, nodata)
+    with rasterio.open(path) as raster:
+        expected = raster_band_to_pandas_h3(raster.read(1), raster)
+    tiles = list(iter_raster_h3_tiles(path, **kwargs))
+    if kwargs["tile_size"]:
+        assert len(tiles) > 1
+    h3_df = pd.concat(tiles, ignore_index=True)
+    assert not h3_df["h3"].duplicated().any()
+    pd.testing.assert_frame_equal(sort_cells(h3_df), sort_cells(expected))
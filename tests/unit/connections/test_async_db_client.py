@@ -0,0 +1,125 @@
+import asyncio
+import os
+
+import pytest
+import shapely
+from shapely.geometry import Point
+
+from research.connections.async_db_client import AsyncDBClient
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("DB_HOST"), reason="DB_HOST is not set"
+)
+
+WKB_QUERY = """
+    SELECT i AS id, decode(%s, 'hex') AS geometry
+    FROM generate_series(1, 3) AS i
+"""
+
+
+def ewkb_hex(point, srid=None) -> str:
+    if srid:
+        point = shapely.set_srid(point, srid)
+    return shapely.to_wkb(point, hex=True, include_srid=bool(srid))
+
+
+@pytest.fixture
+def db_client():
+    return AsyncDBClient(pool_size=1, max_overflow=1)
+
+
+async def _read_and_close(db_client, *args, **kwargs):
+    async with db_client:
+        return await db_client.read_sql(*args, **kwargs)
+
+
+def test_read_sql_wkb_geometry(db_client):
+    point = Point(440_000, 4_474_000)
+    gdf = asyncio.run(
+        _read_and_close(
+            db_client,
+            WKB_QUERY,
+            geom_col="geometry",
+            params=(ewkb_hex(point, srid=25830),),
+        )
+    )
+    assert list(gdf["id"]) == [1, 2, 3]
+    assert gdf.crs.to_epsg() == 25830
+    assert gdf.geometry.geom_equals(point).all()
+
+
+def test_read_sql_wkb_geometry_without_srid(db_client):
+    gdf = asyncio.run(
+        _read_and_close(
+            db_client,
+            WKB_QUERY,
+            geom_col="geometry",
+            crs="EPSG:4326",
+            params=(ewkb_hex(Point(-3.7, 40.4)),),
+        )
+    )
+    assert gdf.crs.to_epsg() == 4326
+
+
+def test_read_sql_missing_geom_col(db_client):
+    with pytest.raises(ValueError):
+        asyncio.run(
+            _read_and_close(
+                db_client, "SELECT 1 AS id", geom_col="geometry"
+            )
+        )
+
+
+def test_read_sql_postgis_geometry(db_client):
+    async def read():
+        async with db_client:
+            installed = await db_client.run(
+                "SELECT 1 FROM pg_extension WHERE extname = 'postgis'"
+            )
+            if not installed:
+                return None
+            return await db_client.read_sql(
+                "SELECT ST_SetSRID(ST_MakePoint(%s, %s), 25830) AS geometry",
+                geom_col="geometry",
+                params=(440_000.0, 4_474_000.0),
+            )
+
+    gdf = asyncio.run(read())
+    if gdf is None:
+        pytest.skip("PostGIS is not installed")
+    assert gdf.crs.to_epsg() == 25830
+    assert gdf.geometry[0].equals(Point(440_000, 4_474_000))
+
+
+def test_run(db_client):
+    async def run():
+        async with db_client:
+            rows = await db_client.run("SELECT %s::int AS n", (1,))
+            no_rows = await db_client.run("SET LOCAL work_mem = '8MB'")
+            return rows, no_rows
+
+    assert asyncio.run(run()) == ([{"n": 1}], None)
+
+
+def test_gather_queries_keeps_order(db_client):
+    async def gather():
+        async with db_client:
+            return await db_client.gather_queries(
+                [
+                    {"query": "SELECT %s::int AS n", "params": (n,)}
+                    for n in range(6)
+                ],
+                max_concurrency=2,
+            )
+
+    results = asyncio.run(gather())
+    assert [df["n"].item() for df in results] == list(range(6))
+
+
+def test_reused_across_event_loops(db_client):
+    # Without closing, the pool of the first loop is left behind
+    query = "SELECT 1 AS n"
+    assert asyncio.run(db_client.read_sql(query))["n"].item() == 1
+    assert asyncio.run(db_client.read_sql(query))["n"].item() == 1
+    assert asyncio.run(_read_and_close(db_client, query))["n"].item() == 1
+    assert db_client.pool_stats() is None
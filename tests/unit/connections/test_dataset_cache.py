@@ -0,0 +1,133 @@
+import io
+import uuid
+import zipfile
+
+import fsspec
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+
+from research.connections.dataset_cache import DatasetCache
+
+
+@pytest.fixture
+def memory_fs():
+    fs = fsspec.filesystem("memory")
+    root = f"/datasets-{uuid.uuid4().hex}"
+    yield fs, root
+    fs.rm(root, recursive=True)
+
+
+@pytest.fixture
+def lanes_gdf():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-3.89, -3.52, 500)
+    y = rng.uniform(40.31, 40.56, 500)
+    return gpd.GeoDataFrame(
+        {
+            "TIPO_VIA": rng.choice(["CICLOCARRIL", "CARRIL BICI"], 500),
+            "ID_VIA": np.arange(500),
+        },
+        geometry=gpd.points_from_xy(x, y),
+        crs="EPSG:4326",
+    )
+
+
+def zipped_shapefile(gdf, tmp_path) -> bytes:
+    shp_dir = tmp_path / "shp"
+    shp_dir.mkdir(parents=True)
+    gdf.to_file(shp_dir / "carriles.shp")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for path in shp_dir.iterdir():
+            zf.write(path, path.name)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def source(memory_fs, lanes_gdf, tmp_path):
+    fs, root = memory_fs
+    path = f"memory://{root}/carriles.zip"
+    fs.pipe(path, zipped_shapefile(lanes_gdf, tmp_path))
+    return path
+
+
+@pytest.fixture
+def datasets(tmp_path, monkeypatch):
+    datasets = DatasetCache(str(tmp_path / "cache"), row_group_size=50)
+    conversions = []
+    convert = datasets._convert
+    monkeypatch.setattr(
+        datasets,
+        "_convert",
+        lambda *args: conversions.append(args[0]) or convert(*args),
+    )
+    datasets.conversions = conversions
+    return datasets
+
+
+def sorted_by_id(df):
+    return df.sort_values("ID_VIA").reset_index(drop=True)
+
+
+def test_load_converts_zipped_shapefile(datasets, source, lanes_gdf):
+    gdf = datasets.load(source)
+    assert isinstance(gdf, gpd.GeoDataFrame)
+    assert gdf.crs.equals(lanes_gdf.crs)
+    pd.testing.assert_frame_equal(
+        sorted_by_id(gdf)[["TIPO_VIA", "ID_VIA"]],
+        lanes_gdf[["TIPO_VIA", "ID_VIA"]],
+        check_dtype=False,
+    )
+    assert sorted_by_id(gdf).geom_equals(lanes_gdf.geometry).all()
+    assert datasets.conversions == [source]
+
+
+def test_load_reuses_conversion(datasets, source):
+    first_path = datasets.cache_path(source)
+    datasets.load(source)
+    datasets.load(source, columns=["ID_VIA"])
+    assert datasets.cache_path(source) == first_path
+    assert datasets.conversions == [source]
+
+
+def test_load_reconverts_changed_source(
+    datasets, source, lanes_gdf, memory_fs, tmp_path
+):
+    first_path = datasets.cache_path(source)
+    fs, _ = memory_fs
+    fs.pipe(source, zipped_shapefile(lanes_gdf.head(10), tmp_path / "new"))
+    assert len(datasets.load(source)) == 10
+    assert datasets.cache_path(source) != first_path
+    assert len(datasets.conversions) == 2
+
+
+def test_load_columns(datasets, source):
+    df = datasets.load(source, columns=["ID_VIA"])
+    assert type(df) is pd.DataFrame
+    assert list(df.columns) == ["ID_VIA"]
+
+    gdf = datasets.load(source, columns=["TIPO_VIA", "geometry"])
+    assert isinstance(gdf, gpd.GeoDataFrame)
+    assert list(gdf.columns) == ["TIPO_VIA", "geometry"]
+
+
+def test_load_bbox(datasets, source, lanes_gdf):
+    bbox = (-3.72, 40.40, -3.68, 40.43)
+    gdf = datasets.load(source, bbox=bbox)
+    expected = lanes_gdf.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+    assert 0 < len(gdf) < len(lanes_gdf)
+    assert sorted(gdf["ID_VIA"]) == sorted(expected["ID_VIA"])
+
+
+def test_load_bbox_requires_geometry(datasets, source):
+    with pytest.raises(ValueError):
+        datasets.load(source, columns=["ID_VIA"], bbox=(0, 0, 1, 1))
+
+
+def test_clear(datasets, source):
+    datasets.load(source)
+    datasets.clear()
+    datasets.load(source)
+    assert len(datasets.conversions) == 2
@@ -0,0 +1,326 @@
+import csv
+import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from psycopg2 import sql
+from psycopg2.pool import PoolError
+from shapely.geometry import Point
+
+from research.connections import DBClient, QueryCache
+from research.connections.db_client import COPY_NULL, SRID_COLUMN
+
+
+@pytest.fixture
+def db_client():
+    if not os.environ.get("DB_HOST"):
+        pytest.skip("DB_HOST is not set")
+    with DBClient(pool_size=1, max_overflow=1, pool_timeout=1) as client:
+        yield client
+
+
+@pytest.fixture
+def offline_client():
+    # No connection is opened until a query runs
+    return DBClient(host="offline")
+
+
+def render(composable) -> str:
+    """Render psycopg2 SQL composables without a connection"""
+    if isinstance(composable, sql.Composed):
+        return "".join(render(part) for part in composable.seq)
+    if isinstance(composable, sql.Identifier):
+        return ".".join(
+            '"' + name.replace('"', '""') + '"'
+            for name in composable.strings
+        )
+    if isinstance(composable, sql.SQL):
+        return composable.string
+    raise TypeError(f"Cannot render {composable!r}")
+
+
+@pytest.fixture
+def accidents_gdf():
+    return gpd.GeoDataFrame(
+        {
+            "num_expediente": [1, 2, 3],
+            "lesividad": [1.5, np.nan, 3.0],
+            "distrito": ["CENTRO", None, "RETIRO"],
+            "fecha": pd.to_datetime(["2022-01-01", "2022-01-02", None]),
+            "atropello": [True, False, True],
+        },
+        geometry=[Point(-3.7, 40.4), None, Point(-3.69, 40.42)],
+        crs="EPSG:4326",
+    )
+
+
+def test_create_table_sql(offline_client, accidents_gdf):
+    query = offline_client._create_table_sql(
+        accidents_gdf, "public.Accidentes", "geometry", 4326
+    )
+    assert render(query) == (
+        'CREATE TABLE "public"."Accidentes" ('
+        '"num_expediente" BIGINT, "lesividad" DOUBLE PRECISION, '
+        '"distrito" TEXT, "fecha" TIMESTAMP, "atropello" BOOLEAN, '
+        '"geometry" geometry(Geometry, 4326))'
+    )
+
+
+def test_copy_chunk_buffer_writes_hex_ewkb_csv(offline_client, accidents_gdf):
+    buffer = offline_client._copy_chunk_buffer(
+        accidents_gdf, "geometry", 4326
+    )
+    rows = list(csv.reader(buffer))
+    assert [row[:5] for row in rows] == [
+        ["1", "1.5", "CENTRO", "2022-01-01", "True"],
+        ["2", COPY_NULL, COPY_NULL, "2022-01-02", "False"],
+        ["3", "3.0", "RETIRO", COPY_NULL, "True"],
+    ]
+    assert rows[1][5] == COPY_NULL
+    geoms = shapely.from_wkb([rows[0][5], rows[2][5]])
+    assert shapely.get_srid(geoms).tolist() == [4326, 4326]
+    assert shapely.equals(geoms, accidents_gdf.geometry[[0, 2]].values).all()
+    # The source frame keeps its geometries
+    assert accidents_gdf.geometry[0].equals(Point(-3.7, 40.4))
+
+
+def test_pool_opens_connections_on_demand(db_client):
+    with db_client.raw_connection():
+        assert db_client.pool_stats()["raw"]["in_use"] == 1
+    assert db_client.pool_stats()["raw"]["idle"] == 1
+
+
+def test_pool_raises_after_timeout_when_exhausted(db_client):
+    with db_client.raw_connection(), db_client.raw_connection():
+        with pytest.raises(PoolError):
+            db_client.run_in_transaction("SELECT 1")
+
+
+def test_pool_waits_for_a_free_connection(db_client):
+    results = []
+
+    def run():
+        results.append(db_client.run_in_transaction("SELECT pg_sleep(0.05)"))
+
+    threads = [threading.Thread(target=run) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 10
+    assert db_client.pool_stats()["raw"]["in_use"] == 0
+
+
+def test_table_exists_keeps_identifier_case(db_client):
+    with db_client.raw_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute('CREATE TEMP TABLE "MixedCase" (id int)')
+        assert db_client._table_exists(cursor, "MixedCase")
+        assert not db_client._table_exists(cursor, "mixedcase")
+        connection.rollback()
+
+
+def test_read_sql_skips_cache_without_source_tables(db_client, tmp_path):
+    db_client.query_cache = QueryCache(str(tmp_path))
+    db_client.read_sql("SELECT * FROM generate_series(1, 3) AS id")
+    assert db_client.query_cache.size_bytes == 0
+
+
+def test_read_sql_cache_key_includes_binary_geom(db_client, tmp_path):
+    db_client.query_cache = QueryCache(str(tmp_path))
+    db_client.run_in_transaction(
+        "CREATE TABLE IF NOT EXISTS test_read_sql_cache (id int)"
+    )
+    try:
+        db_client.read_sql("SELECT id FROM test_read_sql_cache")
+        keys = {
+            db_client.query_cache.make_key(
+                "SELECT id FROM test_read_sql_cache",
+                fingerprint=db_client.table_fingerprint(
+                    ["test_read_sql_cache"]
+                ),
+                geom_col=None,
+                crs="EPSG:4326",
+                parse_dates=None,
+                binary_geom=binary_geom,
+            )
+            for binary_geom in (False, True)
+        }
+        assert len(keys) == 2
+        assert sum(
+            db_client.query_cache.get(key) is not None for key in keys
+        ) == 1
+    finally:
+        db_client.run_in_transaction("DROP TABLE test_read_sql_cache")
+
+
+def test_read_sql_skips_cache_for_views(db_client, tmp_path):
+    db_client.query_cache = QueryCache(str(tmp_path))
+    db_client.run_in_transaction(
+        """
+        CREATE TABLE IF NOT EXISTS test_read_sql_cache (id int);
+        CREATE OR REPLACE VIEW test_read_sql_cache_view AS
+        SELECT id FROM test_read_sql_cache
+        """
+    )
+    try:
+        fingerprint = db_client.table_fingerprint(
+            ["test_read_sql_cache", "test_read_sql_cache_view"]
+        )
+        assert [row[-1] for row in fingerprint] == [True, False]
+        db_client.read_sql(
+            "SELECT * FROM test_read_sql_cache, test_read_sql_cache_view"
+        )
+        assert db_client.query_cache.size_bytes == 0
+    finally:
+        db_client.run_in_transaction(
+            "DROP VIEW test_read_sql_cache_view; "
+            "DROP TABLE test_read_sql_cache"
+        )
+
+
+def test_execute_many_prepared_deallocates_on_error(db_client):
+    db_client.run_in_transaction(
+        "CREATE TABLE IF NOT EXISTS test_execute_many (id int PRIMARY KEY)"
+    )
+    try:
+        with pytest.raises(Exception):
+            db_client.execute_many(
+                "INSERT INTO test_execute_many VALUES (%s)",
+                [(1,), (1,)],
+                prepared=True,
+            )
+        with db_client.raw_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT count(*) FROM pg_prepared_statements")
+            assert cursor.fetchone()[0] == 0
+            connection.rollback()
+    finally:
+        db_client.run_in_transaction("DROP TABLE test_execute_many")
+
+
+Column = namedtuple("Column", ["name"])
+
+
+class FakeCursor:
+    """Named cursor returning `rows` in fetchmany batches"""
+
+    def __init__(self, rows, columns):
+        self.rows = list(rows)
+        self.columns = columns
+        self.executed = []
+        self.description = None
+        self.closed = False
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        self.description = [Column(name) for name in self.columns]
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.cursor_names = []
+        self.rolled_back = False
+
+    def cursor(self, name=None):
+        self.cursor_names.append(name)
+        return self._cursor
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def fake_connection(monkeypatch, db_client, rows, columns):
+    connection = FakeConnection(FakeCursor(rows, columns))
+
+    @contextmanager
+    def raw_connection():
+        yield connection
+
+    monkeypatch.setattr(db_client, "raw_connection", raw_connection)
+    return connection
+
+
+def test_read_sql_iter_batches_with_params(offline_client, monkeypatch):
+    rows = [
+        (i, shapely.to_wkb(Point(-3.7, 40.4 + i / 100))) for i in range(5)
+    ]
+    connection = fake_connection(
+        monkeypatch, offline_client, rows, ["id", "geometry"]
+    )
+    batches = list(
+        offline_client.read_sql_iter(
+            "SELECT * FROM accidentes WHERE distrito = %s",
+            chunksize=2,
+            geom_col="geometry",
+            crs="EPSG:25830",
+            params=("CENTRO",),
+        )
+    )
+    cursor = connection._cursor
+    assert cursor.executed == [
+        ("SELECT * FROM accidentes WHERE distrito = %s", ("CENTRO",))
+    ]
+    # Server-side cursor, closed and rolled back once exhausted
+    assert connection.cursor_names[0].startswith("read_sql_iter_")
+    assert cursor.closed and connection.rolled_back
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert all(batch.crs.to_epsg() == 25830 for batch in batches)
+    assert pd.concat(batches)["id"].tolist() == list(range(5))
+    assert batches[2].geometry[0].equals(Point(-3.7, 40.44))
+
+
+def test_rows_to_gdf_parses_wkb(offline_client):
+    rows = [
+        (1, shapely.to_wkb(Point(1, 2))),
+        (2, None),
+        (3, shapely.to_wkb(Point(3, 4), hex=True)),
+    ]
+    gdf = offline_client._rows_to_gdf(
+        rows, ["id", "geometry"], geom_col="geometry", crs="EPSG:4326"
+    )
+    assert gdf.crs.to_epsg() == 4326
+    assert gdf.geometry.name == "geometry"
+    assert gdf.geometry[0].equals(Point(1, 2))
+    assert gdf.geometry[1] is None
+    assert gdf.geometry[2].equals(Point(3, 4))
+
+
+def test_rows_to_gdf_without_geometry(offline_client):
+    df = offline_client._rows_to_gdf([(1, "a")], ["id", "name"])
+    assert df.to_dict("records") == [{"id": 1, "name": "a"}]
+
+
+@pytest.mark.parametrize(
+    "srids, expected",
+    [
+        ([25830, 25830], 25830),
+        ([0, 25830], 25830),
+        ([None, 25830], 25830),
+        ([0, None], 4326),
+    ],
+)
+def test_set_crs_from_srid(offline_client, srids, expected):
+    gdf = offline_client._rows_to_gdf(
+        [(shapely.to_wkb(Point(1, 2)), srid) for srid in srids],
+        ["geometry", SRID_COLUMN],
+        geom_col="geometry",
+        crs=None,
+    )
+    gdf = offline_client._set_crs_from_srid(gdf, "EPSG:4326")
+    assert SRID_COLUMN not in gdf
+    assert gdf.crs.to_epsg() == expected
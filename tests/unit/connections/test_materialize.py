@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from research.connections import (
+    DBClient,
+    DerivedTable,
+    MaterializationPipeline,
+)
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("DB_HOST"), reason="DB_HOST is not set"
+)
+
+
+@pytest.fixture
+def db_client():
+    with DBClient() as client:
+        client.run_in_transaction(
+            """
+            CREATE TABLE test_source (id int, ts int);
+            INSERT INTO test_source VALUES (1, 1), (2, NULL), (3, 2);
+            """
+        )
+        try:
+            yield client
+        finally:
+            client.run_in_transaction(
+                """
+                DROP TABLE IF EXISTS test_source, test_derived,
+                    materialization_state CASCADE
+                """
+            )
+
+
+def rows(db_client, query):
+    return [tuple(row.values()) for row in db_client.run_in_transaction(query)]
+
+
+def test_incremental_refresh_skips_null_watermarks(db_client):
+    table = DerivedTable(
+        "test_derived", "SELECT * FROM test_source", watermark_column="ts"
+    )
+    pipeline = MaterializationPipeline(db_client, [table])
+    pipeline._build(table, full_refresh=False)
+    db_client.run_in_transaction(
+        "INSERT INTO test_source VALUES (4, 3), (5, NULL)"
+    )
+    pipeline._build(table, full_refresh=False)
+    pipeline._build(table, full_refresh=False)
+    assert rows(db_client, "SELECT * FROM test_derived ORDER BY id") == [
+        (1, 1),
+        (2, None),
+        (3, 2),
+        (4, 3),
+    ]
+
+
+def test_rebuild_keeps_grants_and_dependent_views(db_client):
+    table = DerivedTable("test_derived", "SELECT id FROM test_source")
+    pipeline = MaterializationPipeline(db_client, [table])
+    pipeline._build(table, full_refresh=True)
+    db_client.run_in_transaction("GRANT SELECT ON test_derived TO PUBLIC")
+    acl_query = "SELECT relacl::text FROM pg_class WHERE relname = %s"
+    acl = db_client.run_in_transaction(acl_query, ("test_derived",))
+
+    pipeline._build(table, full_refresh=True)
+    assert db_client.run_in_transaction(acl_query, ("test_derived",)) == acl
+
+    db_client.run_in_transaction(
+        "CREATE VIEW test_derived_view AS SELECT * FROM test_derived"
+    )
+    db_client.run_in_transaction("INSERT INTO test_source VALUES (4, 3)")
+    pipeline._build(table, full_refresh=True)
+    assert rows(db_client, "SELECT count(*) FROM test_derived_view") == [
+        (4,)
+    ]
+    assert db_client.run_in_transaction(acl_query, ("test_derived",)) == acl
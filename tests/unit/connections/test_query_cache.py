@@ -0,0 +1,171 @@
+import os
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from geopandas.testing import assert_geodataframe_equal
+from shapely.geometry import Point
+
+from research.connections.db_client import DBClient
+from research.connections.query_cache import QueryCache, referenced_tables
+
+
+@pytest.fixture
+def query_cache(tmp_path):
+    return QueryCache(str(tmp_path / "cache"))
+
+
+@pytest.fixture
+def points_gdf():
+    return gpd.GeoDataFrame(
+        {"id": [1, 2, 3]},
+        geometry=[Point(-3.70, 40.41), Point(-3.69, 40.42), None],
+        crs="EPSG:4326",
+    )
+
+
+def mixed_types_df():
+    # pyarrow cannot write an object column mixing ints and strings
+    return pd.DataFrame({"value": pd.Series([1, "x"], dtype=object)})
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT * FROM a, b WHERE a.id = b.id", ["a", "b"]),
+        ("SELECT * FROM a AS x, b y JOIN c ON true", ["a", "b", "c"]),
+        (
+            'SELECT * FROM public."Mixed Case" m, "other"."T" AS t',
+            ['"other"."T"', 'public."Mixed Case"'],
+        ),
+        ("select * from  schema . tbl x , tbl2", ["schema.tbl", "tbl2"]),
+        (
+            "SELECT * FROM generate_series(1, 3) AS g(i), accidentes a",
+            ["accidentes"],
+        ),
+        ("SELECT * FROM (SELECT * FROM a) q, b", ["a", "b"]),
+        (
+            "SELECT * FROM a JOIN LATERAL (SELECT * FROM b LIMIT 1) l "
+            "ON true",
+            ["a", "b"],
+        ),
+        ("SELECT * FROM a\nWHERE id IN (SELECT id FROM b)", ["a", "b"]),
+        ("SELECT * FROM a, LATERAL f(a.id) g, c", ["a", "c"]),
+        ("SELECT extract(year FROM fecha) FROM a", ["a", "fecha"]),
+    ],
+)
+def test_referenced_tables(query, expected):
+    assert referenced_tables(query) == expected
+
+
+def test_set_get_roundtrip(query_cache, points_gdf):
+    query_cache.set("points", points_gdf, tables=["accidentes"])
+    assert_geodataframe_equal(query_cache.get("points"), points_gdf)
+
+    query_cache.set("ids", pd.DataFrame({"id": [1, 2]}))
+    result = query_cache.get("ids")
+    assert isinstance(result, gpd.GeoDataFrame)
+    assert list(result["id"]) == [1, 2]
+
+
+def test_get_miss(query_cache):
+    assert query_cache.get("missing") is None
+
+
+def test_get_drops_unreadable_entry(query_cache, points_gdf):
+    query_cache.set("points", points_gdf)
+    with open(query_cache._meta_path("points"), "w") as fp:
+        fp.write("{not json")
+    assert query_cache.get("points") is None
+    assert query_cache.size_bytes == 0
+
+
+def test_set_failure_leaves_no_entry(query_cache):
+    with pytest.raises(Exception):
+        query_cache.set("mixed", mixed_types_df())
+    assert os.listdir(query_cache.directory) == []
+    assert query_cache.get("mixed") is None
+
+
+def test_evicts_least_recently_read(query_cache, points_gdf):
+    for i, key in enumerate(["a", "b", "c"]):
+        query_cache.set(key, points_gdf)
+        os.utime(query_cache._data_path(key), (i, i))
+    entry_bytes = os.path.getsize(query_cache._data_path("a"))
+    # Reading "a" makes "b" the least recently read entry
+    query_cache.get("a")
+    query_cache.max_bytes = 3 * entry_bytes
+    query_cache.set("d", points_gdf)
+    assert query_cache.get("b") is None
+    assert all(query_cache.get(key) is not None for key in "acd")
+
+
+def test_invalidate(query_cache, points_gdf):
+    query_cache.set("accidents", points_gdf, tables=["public.accidentes"])
+    query_cache.set("lanes", points_gdf, tables=['"Carriles"'])
+    query_cache.set("both", points_gdf, tables=["accidentes", "carriles"])
+
+    query_cache.invalidate(table='public."Accidentes"')
+    assert query_cache.get("accidents") is None
+    assert query_cache.get("both") is None
+    assert query_cache.get("lanes") is not None
+
+    query_cache.invalidate(key="lanes")
+    assert query_cache.get("lanes") is None
+
+
+def test_clear(query_cache, points_gdf):
+    query_cache.set("points", points_gdf)
+    query_cache.clear()
+    assert query_cache.size_bytes == 0
+
+
+@pytest.fixture
+def offline_client(query_cache, monkeypatch):
+    db_client = DBClient(host="offline", query_cache=query_cache)
+    db_client.reads = []
+
+    def read_sql(query, *args):
+        db_client.reads.append(query)
+        return db_client.result
+
+    monkeypatch.setattr(db_client, "_read_sql", read_sql)
+    return db_client
+
+
+def fingerprint(monkeypatch, db_client, rows):
+    monkeypatch.setattr(db_client, "table_fingerprint", lambda tables: rows)
+
+
+def test_read_sql_uses_cache(offline_client, monkeypatch):
+    fingerprint(
+        monkeypatch, offline_client, [("accidentes", 1, 1, 0, 0, 0, True)]
+    )
+    offline_client.result = gpd.GeoDataFrame({"id": [1, 2]})
+    for _ in range(2):
+        result = offline_client.read_sql("SELECT id FROM accidentes")
+        assert list(result["id"]) == [1, 2]
+    assert len(offline_client.reads) == 1
+
+
+def test_read_sql_skips_cache_for_views(offline_client, monkeypatch):
+    fingerprint(
+        monkeypatch,
+        offline_client,
+        [("accidentes", 1, 1, 0, 0, 0, True), ("v", 2, 0, 0, 0, 0, False)],
+    )
+    offline_client.result = gpd.GeoDataFrame({"id": [1, 2]})
+    offline_client.read_sql("SELECT * FROM accidentes, v")
+    assert offline_client.query_cache.size_bytes == 0
+
+
+def test_read_sql_returns_result_when_caching_fails(
+    offline_client, monkeypatch
+):
+    fingerprint(
+        monkeypatch, offline_client, [("accidentes", 1, 1, 0, 0, 0, True)]
+    )
+    offline_client.result = gpd.GeoDataFrame(mixed_types_df())
+    result = offline_client.read_sql("SELECT value FROM accidentes")
+    assert result is offline_client.result
+    assert offline_client.query_cache.size_bytes == 0
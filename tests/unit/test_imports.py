@@ -0,0 +1,53 @@
+import importlib
+import json
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+import research
+
+HEAVY_MODULES = [
+    "geopandas",
+    "psycopg2",
+    "sqlalchemy",
+    "rasterio",
+    "h3ronpy",
+    "ipywidgets",
+    "jinja2",
+]
+
+ROOT = pathlib.Path(research.__file__).parent
+
+PACKAGES = sorted(
+    ".".join(("research",) + path.parent.relative_to(ROOT).parts)
+    for path in ROOT.rglob("__init__.py")
+)
+
+
+@pytest.mark.parametrize("package", PACKAGES)
+def test_import_does_not_load_heavy_modules(package):
+    # A fresh interpreter, since this one has already imported everything
+    code = (
+        "import importlib, json, sys\n"
+        f"importlib.import_module({package!r})\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} "
+        "if m in sys.modules]))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT.parent,
+    ).stdout
+    assert json.loads(output) == []
+
+
+@pytest.mark.parametrize("package", PACKAGES)
+def test_lazy_attributes_resolve(package):
+    module = importlib.import_module(package)
+    for name in getattr(module, "__all__", []):
+        assert getattr(module, name) is not None
+    assert set(getattr(module, "__all__", [])) <= set(dir(module))
@@ -0,0 +1,92 @@
+import pytest
+from shapely.geometry import Point
+
+from research.utils.cache import (
+    MISSING,
+    BaseCache,
+    LRUCache,
+    SQLiteCache,
+    make_cache_key,
+)
+
+
+@pytest.fixture(params=["lru", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "lru":
+        yield LRUCache(maxsize=3)
+    else:
+        sqlite_cache = SQLiteCache(str(tmp_path / "cache.db"), maxsize=3)
+        yield sqlite_cache
+        sqlite_cache.close()
+
+
+def test_base_cache_is_abstract():
+    with pytest.raises(TypeError):
+        BaseCache()
+
+
+def test_make_cache_key_normalizes_address():
+    assert make_cache_key("  Calle de  ALCALÁ 1 ", "Photon") == (
+        make_cache_key("calle de alcalá 1", "Photon")
+    )
+    assert make_cache_key("a", "Photon") != make_cache_key("a", "GoogleV3")
+
+
+def test_get_set(cache):
+    assert cache.get("a") is MISSING
+    assert cache.get("a", default=None) is None
+    cache.set("a", Point(1, 2))
+    assert cache.get("a") == Point(1, 2)
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_none_is_a_cached_value(cache):
+    cache.set("a", None)
+    assert cache.get("a") is None
+    assert "a" in cache
+
+
+def test_contains_does_not_count_hits(cache):
+    cache.set("a", 1)
+    assert "a" in cache
+    assert "b" not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_ttl_expiration(cache, monkeypatch):
+    now = 1_000.0
+    monkeypatch.setattr("research.utils.cache.time.time", lambda: now)
+    cache.set("a", None, ttl=10)
+    assert "a" in cache
+    now += 11
+    assert "a" not in cache
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+def test_lru_eviction(cache, monkeypatch):
+    clock = iter(range(1_000, 2_000))
+    monkeypatch.setattr(
+        "research.utils.cache.time.time", lambda: float(next(clock))
+    )
+    for key in "abc":
+        cache.set(key, key)
+    cache.get("a")
+    cache.set("d", "d")
+    assert len(cache) == 3
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+
+
+def test_sqlite_cache_persists(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path)
+    cache.set("a", Point(1, 2))
+    cache.close()
+
+    reopened = SQLiteCache(path)
+    assert reopened.get("a") == Point(1, 2)
+    reopened.clear()
+    assert len(reopened) == 0
+    reopened.close()
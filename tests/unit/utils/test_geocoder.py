@@ -0,0 +1,184 @@
+import threading
+import time
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+from research.utils.cache import MISSING, SQLiteCache
+from research.utils.geocoder import Geocoder
+
+PROVIDER = "stub"
+
+
+class StubProvider:
+    """Local geocoding provider resolving addresses from a dict.
+
+    Unknown addresses return None. `failures` makes an address raise that
+    many ConnectionErrors before answering.
+    """
+
+    def __init__(self, points: dict, failures: dict = None):
+        self.points = points
+        self.failures = dict(failures or {})
+        self.calls = []
+
+    def __call__(self, name: str) -> Point:
+        self.calls.append(name)
+        if self.failures.get(name):
+            self.failures[name] -= 1
+            raise ConnectionError(f"Timeout geocoding '{name}'")
+        return self.points.get(name)
+
+
+def make_geocoder(provider, **kwargs) -> Geocoder:
+    return Geocoder(PROVIDER, geocode_func=provider, rate_limit=0, **kwargs)
+
+
+def test_geocode_address_caches_result():
+    provider = StubProvider({"Sol": Point(-3.70, 40.41)})
+    geocoder = make_geocoder(provider)
+    assert geocoder.geocode_address("Sol") == Point(-3.70, 40.41)
+    assert geocoder.geocode_address(" sol ") == Point(-3.70, 40.41)
+    assert provider.calls == ["Sol"]
+
+
+def test_geocode_address_caches_not_found():
+    provider = StubProvider({})
+    geocoder = make_geocoder(provider)
+    assert geocoder.geocode_address("Nowhere") is None
+    assert geocoder.geocode_address("Nowhere") is None
+    assert provider.calls == ["Nowhere"]
+
+
+def test_geocode_address_does_not_cache_errors(tmp_path):
+    cache_path = str(tmp_path / "geocoder.db")
+    provider = StubProvider(
+        {"Sol": Point(-3.70, 40.41)}, failures={"Sol": 1}
+    )
+    assert make_geocoder(provider, cache_path=cache_path).geocode_address(
+        "Sol"
+    ) is None
+    assert SQLiteCache(cache_path).get(f"{PROVIDER}|sol") is MISSING
+
+    # A fresh geocoder on the same cache file retries the address
+    geocoder = make_geocoder(provider, cache_path=cache_path)
+    assert geocoder.geocode_address("Sol") == Point(-3.70, 40.41)
+    assert provider.calls == ["Sol", "Sol"]
+
+
+@pytest.mark.parametrize("cached", [True, False])
+def test_geocode_address_cached_flag(cached):
+    provider = StubProvider({"Sol": Point(-3.70, 40.41)})
+    geocoder = make_geocoder(provider)
+    geocoder.geocode_address("Sol")
+    geocoder.geocode_address("Sol", cached=cached)
+    assert len(provider.calls) == (1 if cached else 2)
+
+
+def test_geocode_many_deduplicates_addresses():
+    provider = StubProvider({"Sol": Point(-3.70, 40.41)})
+    geocoder = make_geocoder(provider)
+    points = geocoder.geocode_many(["Sol", "SOL", "Nowhere", " sol", "Sol"])
+    assert points == [Point(-3.70, 40.41)] * 2 + [None] + [
+        Point(-3.70, 40.41)
+    ] * 2
+    assert sorted(provider.calls) == ["Nowhere", "Sol"]
+
+
+def test_geocode_many_uses_cache():
+    provider = StubProvider({"Sol": Point(-3.70, 40.41)})
+    geocoder = make_geocoder(provider)
+    geocoder.geocode_address("Sol")
+    geocoder.geocode_many(["Sol", "Nowhere"])
+    geocoder.geocode_many(["Sol", "Nowhere"])
+    assert provider.calls == ["Sol", "Nowhere"]
+
+
+def test_geocode_series_aligns_to_index():
+    provider = StubProvider(
+        {"Sol": Point(-3.70, 40.41), "Atocha": Point(-3.69, 40.40)}
+    )
+    series = pd.Series(
+        ["Atocha", "Nowhere", "Sol", "Atocha"], index=[10, 3, 7, 1]
+    )
+    geoseries = make_geocoder(provider).geocode_series(series)
+    assert isinstance(geoseries, gpd.GeoSeries)
+    assert geoseries.crs == "EPSG:4326"
+    assert geoseries.index.tolist() == [10, 3, 7, 1]
+    assert geoseries.loc[10] == Point(-3.69, 40.40)
+    assert geoseries.loc[3] is None
+    assert geoseries.loc[7] == Point(-3.70, 40.41)
+
+
+def test_geocode_many_retries_with_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(
+        "research.utils.geocoder.time.sleep", delays.append
+    )
+    provider = StubProvider(
+        {"Sol": Point(-3.70, 40.41)}, failures={"Sol": 2}
+    )
+    geocoder = make_geocoder(provider)
+    points = geocoder.geocode_many(["Sol"], max_retries=3, backoff=0.5)
+    assert points == [Point(-3.70, 40.41)]
+    assert provider.calls == ["Sol"] * 3
+    assert delays == [0.5, 1.0]
+
+
+def test_geocode_many_does_not_cache_errors(monkeypatch):
+    monkeypatch.setattr("research.utils.geocoder.time.sleep", lambda _: None)
+    provider = StubProvider(
+        {"Sol": Point(-3.70, 40.41)}, failures={"Sol": 3}
+    )
+    geocoder = make_geocoder(provider)
+    assert geocoder.geocode_many(["Sol", "Nowhere"], max_retries=2) == [
+        None,
+        None,
+    ]
+    assert geocoder.cache.get(f"{PROVIDER}|sol") is MISSING
+    assert geocoder.cache.get(f"{PROVIDER}|nowhere") is None
+
+    assert geocoder.geocode_many(["Sol", "Nowhere"]) == [
+        Point(-3.70, 40.41),
+        None,
+    ]
+    assert provider.calls.count("Nowhere") == 1
+
+
+def test_geocode_many_reports_progress():
+    provider = StubProvider({})
+    progress = []
+    make_geocoder(provider).geocode_many(
+        ["a", "b", "c", "a"], progress=lambda done, total: progress.append(
+            (done, total)
+        )
+    )
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_geocode_many_runs_concurrently():
+    lock = threading.Lock()
+    in_flight, peak = 0, 0
+
+    def slow_provider(name):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return Point(0, 0)
+
+    addresses = [f"Calle {i}" for i in range(100)]
+    start = time.perf_counter()
+    points = make_geocoder(slow_provider).geocode_many(
+        addresses, max_workers=10
+    )
+    elapsed = time.perf_counter() - start
+    assert len(points) == 100
+    assert 1 < peak <= 10
+    # 100 sequential calls take at least 1s
+    assert elapsed < 1.0
@@ -0,0 +1,210 @@
+import json
+import logging
+import math
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+import research
+from research.utils.instrumentation import (
+    Histogram,
+    Metrics,
+    instrument,
+    metrics,
+)
+from research.utils.utils import LOGGER_NAME, init_logger, safe_run
+
+
+@pytest.fixture
+def enabled_metrics():
+    # The module-level registry, used by `instrument` and `safe_run`
+    was_enabled = metrics.enabled
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.reset()
+    metrics.enabled = was_enabled
+
+
+def test_histogram_bucket_counts():
+    histogram = Histogram(buckets=(0.1, 1.0, math.inf))
+    for value in (0.05, 0.1, 0.5, 2.0, 30.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 2]
+    assert histogram.to_dict() == {
+        "count": 5,
+        "sum": pytest.approx(32.65),
+        "buckets": {"0.1": 2, "1.0": 3, "+Inf": 5},
+    }
+
+
+def test_timer_records_rows_and_bytes():
+    registry = Metrics(enabled=True)
+    with registry.timer("db_read_sql") as timer:
+        timer.rows = 10
+        timer.bytes = 2_048
+    with registry.timer("db_read_sql") as timer:
+        timer.rows = 5
+    snapshot = registry.snapshot()
+    assert snapshot["counters"] == {
+        "db_read_sql_calls_total": 2,
+        "db_read_sql_rows_total": 15,
+        "db_read_sql_bytes_total": 2_048,
+    }
+    assert snapshot["histograms"]["db_read_sql_seconds"]["count"] == 2
+
+
+def test_timer_counts_errors():
+    registry = Metrics(enabled=True)
+    with pytest.raises(RuntimeError):
+        with registry.timer("geocode"):
+            raise RuntimeError("Timeout")
+    counters = registry.snapshot()["counters"]
+    assert counters["geocode_calls_total"] == 1
+    assert counters["geocode_errors_total"] == 1
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+    with registry.timer("db_read_sql") as timer:
+        timer.rows = 10
+    registry.observe("latency_seconds", 0.5)
+    registry.increment("calls_total")
+    registry.record_cache("geocoder", hit=True)
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"] == {}
+    assert snapshot["counters"] == {}
+    assert not hasattr(timer, "rows")
+
+
+def test_cache_hit_ratios():
+    registry = Metrics(enabled=True)
+    for hit in (True, True, True, False):
+        registry.record_cache("geocoder", hit)
+    assert registry.snapshot()["cache_hit_ratios"] == {"geocoder": 0.75}
+
+
+def test_to_prometheus():
+    registry = Metrics(enabled=True)
+    registry.observe("read_seconds", 0.02, buckets=(0.01, 0.1, math.inf))
+    registry.increment("read_calls_total")
+    registry.record_cache("geocoder", hit=False)
+    assert registry.to_prometheus().splitlines() == [
+        "# TYPE read_seconds histogram",
+        'read_seconds_bucket{le="0.01"} 0',
+        'read_seconds_bucket{le="0.1"} 1',
+        'read_seconds_bucket{le="+Inf"} 1',
+        "read_seconds_sum 0.02",
+        "read_seconds_count 1",
+        "# TYPE geocoder_cache_misses_total counter",
+        "geocoder_cache_misses_total 1",
+        "# TYPE read_calls_total counter",
+        "read_calls_total 1",
+    ]
+
+
+def test_dump(tmp_path):
+    registry = Metrics(enabled=True)
+    registry.increment("read_calls_total", 3)
+
+    registry.dump(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as fp:
+        assert json.load(fp)["counters"] == {"read_calls_total": 3}
+
+    registry.dump(str(tmp_path / "metrics.prom"))
+    with open(tmp_path / "metrics.prom") as fp:
+        assert fp.read() == registry.to_prometheus()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "metrics.json",
+        "metrics.prom",
+    ]
+
+    with pytest.raises(ValueError):
+        registry.dump(str(tmp_path / "metrics.csv"), fmt="csv")
+
+
+def test_instrument_success(enabled_metrics):
+    @instrument("load_rows")
+    def load_rows(n):
+        return list(range(n))
+
+    assert load_rows(3) == [0, 1, 2]
+    assert load_rows.__name__ == "load_rows"
+    counters = enabled_metrics.snapshot()["counters"]
+    assert counters == {"load_rows_calls_total": 1, "load_rows_rows_total": 3}
+
+
+def test_instrument_error(enabled_metrics):
+    @instrument()
+    def fail():
+        raise KeyError("missing")
+
+    with pytest.raises(KeyError):
+        fail()
+    snapshot = enabled_metrics.snapshot()
+    name = "test_instrument_error_<locals>_fail"
+    assert snapshot["counters"] == {
+        f"{name}_calls_total": 1,
+        f"{name}_errors_total": 1,
+    }
+    assert snapshot["histograms"][f"{name}_seconds"]["count"] == 1
+
+
+def test_instrument_disabled():
+    was_enabled = metrics.enabled
+    metrics.disable()
+    try:
+        calls = instrument("noop")(lambda: [1])
+        assert calls() == [1]
+        assert "noop_calls_total" not in metrics.snapshot()["counters"]
+    finally:
+        metrics.enabled = was_enabled
+
+
+class Client:
+    @safe_run
+    def update(self, fail):
+        if fail:
+            raise ValueError("Invalid table")
+        return "ok"
+
+
+def test_safe_run_counts_errors(enabled_metrics, caplog):
+    logger = init_logger()
+    logger.addHandler(caplog.handler)
+    try:
+        client = Client()
+        assert client.update(False) == "ok"
+        assert client.update(True) is None
+    finally:
+        logger.removeHandler(caplog.handler)
+    counters = enabled_metrics.snapshot()["counters"]
+    assert counters["client_update_calls_total"] == 2
+    assert counters["client_update_errors_total"] == 1
+    assert "Invalid table" in caplog.text
+
+
+def test_init_logger_adds_no_duplicate_handlers():
+    # A fresh interpreter, since pytest adds its own handlers to loggers
+    code = (
+        "import importlib, logging\n"
+        "from research.utils import utils\n"
+        "import research.connections.db_client\n"
+        "for _ in range(3):\n"
+        "    utils.init_logger()\n"
+        "    importlib.reload(utils).init_logger()\n"
+        f"print(len(logging.getLogger({LOGGER_NAME!r}).handlers))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=pathlib.Path(research.__file__).parent.parent,
+    ).stdout
+    assert output.strip() == "1"
+    logger = init_logger()
+    assert logger is logging.getLogger(LOGGER_NAME)
+    assert not logger.propagate
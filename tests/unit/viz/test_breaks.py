@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from research.viz import breaks
+from research.viz.breaks import (
+    QuantileSketch,
+    SortedValues,
+    get_sorted_values,
+    interval_breaks,
+    jenks_breaks,
+    quantile_breaks,
+)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.lognormal(size=10_000))
+    values[::100] = np.nan
+    return values
+
+
+@pytest.mark.parametrize("n_breaks", [2, 3, 5, 7, 10])
+def test_quantile_breaks_match_qcut(series, n_breaks):
+    _, expected = pd.qcut(
+        series, q=n_breaks, retbins=True, duplicates="drop"
+    )
+    sorted_values = get_sorted_values(series)
+    np.testing.assert_array_equal(
+        quantile_breaks(sorted_values, n_breaks), expected
+    )
+
+
+def test_quantile_breaks_drop_duplicates():
+    series = pd.Series([1.0] * 8 + [2.0, 3.0])
+    _, expected = pd.qcut(series, q=5, retbins=True, duplicates="drop")
+    np.testing.assert_array_equal(
+        quantile_breaks(get_sorted_values(series), 5), expected
+    )
+
+
+@pytest.mark.parametrize("n_breaks", [1, 2, 3])
+def test_quantile_breaks_constant_column(n_breaks):
+    series = pd.Series([3.0] * 10)
+    _, expected = pd.qcut(series, q=n_breaks, retbins=True, duplicates="drop")
+    np.testing.assert_array_equal(
+        quantile_breaks(get_sorted_values(series), n_breaks), expected
+    )
+
+
+@pytest.mark.parametrize("n_breaks", [2, 5, 10])
+def test_interval_breaks_match_cut(series, n_breaks):
+    _, expected = pd.cut(series, bins=n_breaks, retbins=True)
+    np.testing.assert_allclose(
+        interval_breaks(get_sorted_values(series), n_breaks), expected
+    )
+
+
+def test_interval_breaks_constant_column():
+    series = pd.Series([3.0, 3.0, 3.0])
+    _, expected = pd.cut(series, bins=4, retbins=True)
+    np.testing.assert_allclose(
+        interval_breaks(get_sorted_values(series), 4), expected
+    )
+
+
+def test_sorted_values_quantile_matches_numpy(series):
+    q = np.linspace(0, 1, 21)
+    np.testing.assert_allclose(
+        SortedValues.from_values(series).quantile(q),
+        np.quantile(series.dropna(), q),
+    )
+
+
+def test_empty_column_raises():
+    with pytest.raises(ValueError):
+        get_sorted_values(pd.Series([np.nan, np.nan]))
+
+
+def test_invalid_mode_raises(series):
+    with pytest.raises(ValueError):
+        get_sorted_values(series, mode="unknown")
+
+
+def test_chunked_input_only_in_streaming(series):
+    with pytest.raises(ValueError):
+        get_sorted_values(iter([series]), mode="exact")
+
+
+def test_sample_mode_keeps_extremes(series):
+    sorted_values = get_sorted_values(series, mode="sample", sample_size=100)
+    assert sorted_values.count == 100
+    assert sorted_values.min == series.min()
+    assert sorted_values.max == series.max()
+
+
+def test_streaming_approximates_exact(series):
+    exact = quantile_breaks(get_sorted_values(series), 10)
+    sketch = get_sorted_values(series, mode="streaming", chunksize=1_000)
+    assert isinstance(sketch, QuantileSketch)
+    assert sketch.min == series.min() and sketch.max == series.max()
+    np.testing.assert_allclose(quantile_breaks(sketch, 10), exact, rtol=0.02)
+
+
+def test_streaming_chunks_match_series(series):
+    chunks = (series[i:i + 1_000] for i in range(0, len(series), 1_000))
+    from_chunks = get_sorted_values(chunks, mode="streaming")
+    from_series = get_sorted_values(
+        series, mode="streaming", chunksize=1_000
+    )
+    q = np.linspace(0, 1, 11)
+    np.testing.assert_allclose(
+        from_chunks.quantile(q), from_series.quantile(q)
+    )
+
+
+def test_sorted_values_are_cached(series, monkeypatch):
+    breaks._sorted_cache.clear()
+    first = get_sorted_values(series)
+    # Same values in another order share the cache entry
+    assert get_sorted_values(series.sample(frac=1, random_state=0)) is first
+    assert get_sorted_values(series, mode="sample") is not first
+
+    monkeypatch.setattr(breaks, "SORTED_CACHE_SIZE", 1)
+    get_sorted_values(series + 1)
+    assert len(breaks._sorted_cache) == 1
+    assert get_sorted_values(series) is not first
+
+
+def test_jenks_breaks_separate_clusters():
+    values = pd.Series(np.r_[np.full(50, 1.0), np.full(50, 10.0), 100.0])
+    result = jenks_breaks(get_sorted_values(values), 3)
+    np.testing.assert_array_equal(result, [1.0, 1.0, 10.0, 100.0])
+
+
+def test_jenks_breaks_not_available_in_streaming(series):
+    sketch = get_sorted_values(series, mode="streaming")
+    with pytest.raises(ValueError):
+        jenks_breaks(sketch, 5)
@@ -0,0 +1,131 @@
+import json
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import LineString, MultiLineString, MultiPoint, Point
+
+from research.viz.layers import gdf_to_layer_data, payload_size
+
+
+@pytest.fixture
+def points_gdf():
+    return gpd.GeoDataFrame(
+        {"n_accidentes": [1, 2, 3, 4]},
+        geometry=[
+            Point(-3.703791, 40.416775),
+            MultiPoint([(-3.7, 40.4), (-3.71, 40.41)]),
+            None,
+            Point(-3.69, 40.42),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+@pytest.fixture
+def lines_gdf():
+    return gpd.GeoDataFrame(
+        {"tipo": ["a", "b"]},
+        geometry=[
+            LineString([(-3.7, 40.4), (-3.71, 40.41), (-3.72, 40.4)]),
+            MultiLineString(
+                [[(-3.6, 40.3), (-3.61, 40.31)], [(-3.5, 40.2), (-3.51, 40.2)]]
+            ),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+def test_points_split_parts_and_drop_nulls(points_gdf):
+    colors = np.arange(16, dtype=np.uint8).reshape(4, 4)
+    data, layer_props = gdf_to_layer_data(
+        points_gdf,
+        {"getFillColor": colors, "getRadius": "n_accidentes"},
+    )
+    assert layer_props == {
+        "getPosition": "position",
+        "getFillColor": "fill_color",
+        "getRadius": "radius",
+    }
+    assert data == [
+        {
+            "position": [-3.703791, 40.416775],
+            "fill_color": [0, 1, 2, 3],
+            "radius": 1,
+        },
+        {"position": [-3.7, 40.4], "fill_color": [4, 5, 6, 7], "radius": 2},
+        {
+            "position": [-3.71, 40.41],
+            "fill_color": [4, 5, 6, 7],
+            "radius": 2,
+        },
+        {
+            "position": [-3.69, 40.42],
+            "fill_color": [12, 13, 14, 15],
+            "radius": 4,
+        },
+    ]
+
+
+def test_paths_keep_one_record_per_part(lines_gdf):
+    data, layer_props = gdf_to_layer_data(
+        lines_gdf, {"getColor": [[1, 1, 1], [2, 2, 2]]}
+    )
+    assert layer_props == {"getPath": "path", "getColor": "color"}
+    assert [record["path"] for record in data] == [
+        [[-3.7, 40.4], [-3.71, 40.41], [-3.72, 40.4]],
+        [[-3.6, 40.3], [-3.61, 40.31]],
+        [[-3.5, 40.2], [-3.51, 40.2]],
+    ]
+    assert [record["color"] for record in data] == [
+        [1, 1, 1],
+        [2, 2, 2],
+        [2, 2, 2],
+    ]
+
+
+def test_reprojects_to_wgs84(points_gdf):
+    data, _ = gdf_to_layer_data(points_gdf.to_crs("EPSG:25830"))
+    np.testing.assert_allclose(data[0]["position"], [-3.703791, 40.416775])
+
+
+def test_mixed_geometries_raise(points_gdf, lines_gdf):
+    mixed = gpd.GeoDataFrame(
+        geometry=[points_gdf.geometry[0], lines_gdf.geometry[0]],
+        crs="EPSG:4326",
+    )
+    with pytest.raises(ValueError):
+        gdf_to_layer_data(mixed)
+
+
+def test_misaligned_attributes_raise(points_gdf):
+    with pytest.raises(ValueError):
+        gdf_to_layer_data(points_gdf, {"getRadius": [1, 2, 3]})
+
+
+def test_quantize_shrinks_payload(points_gdf):
+    data, _ = gdf_to_layer_data(points_gdf)
+    quantized, _ = gdf_to_layer_data(points_gdf, quantize=3)
+    assert quantized[0]["position"] == [-3.704, 40.417]
+    assert payload_size(quantized) < payload_size(data)
+
+
+def test_data_is_json_serializable(points_gdf):
+    data, _ = gdf_to_layer_data(
+        points_gdf, {"getRadius": "n_accidentes"}, quantize=5
+    )
+    assert json.loads(json.dumps(data)) == data
+
+
+def test_deck_to_html_embeds_records(lines_gdf):
+    pdk = pytest.importorskip("pydeck")
+    data, layer_props = gdf_to_layer_data(
+        lines_gdf, {"getColor": [[1, 1, 1], [2, 2, 2]]}
+    )
+    deck = pdk.Deck(layers=[pdk.Layer("PathLayer", data=data, **layer_props)])
+    layer = json.loads(deck.to_json())["layers"][0]
+    assert layer["data"] == data
+    assert layer["getPath"] == "@@=path"
+    assert layer["getColor"] == "@@=color"
+    html = deck.to_html(as_string=True)
+    assert '"getPath": "@@=path"' in html and '"path": [' in html
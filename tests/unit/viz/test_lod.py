@@ -0,0 +1,120 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import LineString, Point, box
+
+from research.viz.lod import (
+    EARTH_CIRCUMFERENCE,
+    LevelOfDetail,
+    meters_per_pixel,
+)
+
+SOL = (440_000, 4_474_000)
+
+
+@pytest.fixture
+def features_gdf():
+    # Wiggly 2 km lanes, 1 m wide kiosks and accident points, in meters
+    x = np.linspace(0, 2_000, 400)
+    lanes = [
+        LineString(np.c_[SOL[0] + x, SOL[1] + 500 * i + np.sin(x / 5)])
+        for i in range(5)
+    ]
+    kiosks = [
+        box(SOL[0] + 100 * i, SOL[1] - 100, SOL[0] + 100 * i + 1, SOL[1] - 99)
+        for i in range(5)
+    ]
+    points = [Point(SOL[0] + 100 * i, SOL[1] - 200) for i in range(5)]
+    return gpd.GeoDataFrame(
+        {"kind": ["lane"] * 5 + ["kiosk"] * 5 + ["point"] * 5},
+        geometry=lanes + kiosks + points,
+        crs="EPSG:25830",
+    )
+
+
+@pytest.fixture
+def lod(features_gdf):
+    return LevelOfDetail(features_gdf.to_crs("EPSG:4326"))
+
+
+def test_meters_per_pixel():
+    assert meters_per_pixel(0, 0) == pytest.approx(EARTH_CIRCUMFERENCE / 512)
+    assert meters_per_pixel(13, 40.4) == pytest.approx(
+        meters_per_pixel(12, 40.4) / 2
+    )
+
+
+def test_tolerance(lod):
+    assert 40.3 < lod.latitude < 40.5
+    for zoom in (10, 13.5, 16):
+        assert lod.tolerance(zoom) == pytest.approx(
+            lod.pixels * meters_per_pixel(zoom, lod.latitude)
+        )
+
+
+def test_at_zoom_drops_sub_pixel_features(lod):
+    kinds = lod.at_zoom(12)["kind"].value_counts()
+    assert kinds.to_dict() == {"lane": 5, "point": 5}
+    assert (lod.at_zoom(20)["kind"] == "kiosk").sum() == 5
+
+
+@pytest.mark.parametrize("zoom", [0, 10, 20])
+def test_at_zoom_keeps_points(lod, zoom):
+    points = lod.at_zoom(zoom).query("kind == 'point'")
+    assert len(points) == 5
+    assert points.geom_equals(lod.gdf.geometry[points.index]).all()
+
+
+def test_at_zoom_simplifies_lines(lod):
+    lanes = lod.gdf.query("kind == 'lane'").index
+    coarse = shapely.get_num_coordinates(lod.at_zoom(10).geometry[lanes])
+    fine = shapely.get_num_coordinates(lod.at_zoom(16).geometry[lanes])
+    original = shapely.get_num_coordinates(lod.gdf.geometry[lanes])
+    assert (coarse < fine).all() and (fine <= original).all()
+
+
+def test_at_zoom_is_cached(lod):
+    assert lod.at_zoom(12) is lod.at_zoom(12)
+    assert lod.tiers([12, 13])[12] is lod.at_zoom(12)
+
+
+@pytest.mark.parametrize("crs", ["EPSG:4326", "EPSG:25830", "EPSG:3857"])
+def test_at_zoom_keeps_input_crs(features_gdf, crs):
+    gdf = features_gdf.to_crs(crs)
+    tier = LevelOfDetail(gdf).at_zoom(20)
+    assert tier.crs.equals(gdf.crs)
+    points = tier.query("kind == 'point'")
+    np.testing.assert_allclose(
+        shapely.get_coordinates(points.geometry),
+        shapely.get_coordinates(gdf.geometry[points.index]),
+    )
+
+
+def test_requires_crs(features_gdf):
+    with pytest.raises(ValueError):
+        LevelOfDetail(features_gdf.set_crs(None, allow_override=True))
+
+
+def test_report(lod):
+    zooms = [10, 12, 14]
+    report = lod.report(zooms)
+    assert report["zoom"].tolist() == zooms
+
+    vertices = shapely.get_num_coordinates(lod.gdf.geometry).sum()
+    payload = sum(len(wkb) for wkb in shapely.to_wkb(lod.gdf.geometry))
+    for row in report.itertuples():
+        tier = lod.at_zoom(row.zoom)
+        tier_vertices = shapely.get_num_coordinates(tier.geometry).sum()
+        tier_payload = sum(len(wkb) for wkb in shapely.to_wkb(tier.geometry))
+        assert row.features == len(tier)
+        assert row.dropped_features == len(lod.gdf) - len(tier)
+        assert row.vertices == tier_vertices
+        assert row.vertex_reduction == pytest.approx(
+            1 - tier_vertices / vertices
+        )
+        assert row.payload_bytes == tier_payload
+        assert row.payload_reduction == pytest.approx(
+            1 - tier_payload / payload
+        )
+    assert report["vertex_reduction"].is_monotonic_decreasing
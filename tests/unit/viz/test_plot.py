@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from research.viz.plot import (
+    NULL_COLOR_RGB,
+    PALETTES_HEX,
+    _equal_intervals_expression,
+    assign_color_column,
+    breaks_to_colors,
+    categories_to_colors,
+    category_color_intervals,
+    create_legend,
+    equal_color_intervals,
+    get_df_breaks_values,
+    get_palette_steps,
+    get_rgb_palette,
+    hex_palette_to_rgb,
+    hex_to_rgb,
+)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "value": [1.0, 2.0, 3.0, 4.0, np.nan, 6.0],
+            "category": ["a", "b", "a", "c", None, "b"],
+        }
+    )
+
+
+@pytest.mark.parametrize("name", sorted(PALETTES_HEX))
+def test_hex_palette_to_rgb_matches_hex_to_rgb(name):
+    expected = [hex_to_rgb(color) for color in PALETTES_HEX[name]]
+    assert hex_palette_to_rgb(PALETTES_HEX[name]).tolist() == [
+        list(color) for color in expected
+    ]
+
+
+def test_get_rgb_palette_by_name_or_hex_list():
+    assert get_rgb_palette("Sunset").tolist() == get_rgb_palette(
+        PALETTES_HEX["sunset"]
+    ).tolist()
+    assert get_rgb_palette("unknown") is None
+
+
+def test_get_rgb_palette_returns_a_copy():
+    palette = get_rgb_palette("sunset")
+    palette[0] = 0
+    assert get_rgb_palette("sunset")[0].tolist() != [0, 0, 0]
+
+
+def test_equal_color_intervals_expression(df):
+    expression, _ = equal_color_intervals(
+        df, "value", ["#000000", "#ffffff"], 2, how="equal-interval"
+    )
+    assert expression == (
+        "value <= 0.995 ? [0 0 0] : value <= 6.0 ? [255 255 255] : "
+        "[204, 204, 204]"
+    )
+
+
+def test_equal_color_intervals_memoizes_expression(df):
+    _equal_intervals_expression.cache_clear()
+    for _ in range(3):
+        equal_color_intervals(df, "value", "sunset", 3)
+    info = _equal_intervals_expression.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_category_color_intervals_expression(df):
+    expression, legend = category_color_intervals(
+        df,
+        "category",
+        ["#ff0000", "#00ff00", "#0000ff"],
+        return_legend=True,
+        legend_as_html=False,
+    )
+    assert expression.startswith(
+        "category === 'a' ? [255   0   0] : category === 'b' ? [  0 255   0]"
+    )
+    assert "Others" in legend
+
+
+def test_create_legend_does_not_mutate_labels():
+    labels = [{"text": "a", "color": [1, 2, 3]}]
+    html = create_legend(labels, "Title", "Footer", as_html=False)
+    assert labels == [{"text": "a", "color": [1, 2, 3]}]
+    assert "Title" in html and "1, 2, 3" in html
+
+
+def expression_colors(values, breaks_values, palette_steps):
+    """Colors assigned by the deck.gl ternary expression, row by row"""
+    colors = []
+    for value in values:
+        color = NULL_COLOR_RGB
+        for break_value, step in zip(breaks_values, palette_steps):
+            if value <= break_value:
+                color = list(step)
+                break
+        colors.append(color + [255])
+    return colors
+
+
+@pytest.mark.parametrize("how", ["equal-size", "equal-interval"])
+def test_equal_color_intervals_colors_match_expression(how):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"value": rng.normal(size=1000)})
+    df.loc[::50, "value"] = np.nan
+    colors, _ = equal_color_intervals(
+        df, "value", "sunset", 5, how=how, as_colors=True
+    )
+    breaks_values = get_df_breaks_values(df, "value", 5, how=how)
+    palette_steps = get_palette_steps("sunset", len(breaks_values))
+    assert colors.dtype == np.uint8
+    assert colors.tolist() == expression_colors(
+        df["value"], breaks_values, palette_steps
+    )
+
+
+@pytest.mark.parametrize(
+    "intervals, expected", [(2, [3.0, 3.0]), (3, [3.0]), (5, [3.0])]
+)
+def test_get_df_breaks_values_constant_column(intervals, expected):
+    # Same edges as the former pd.qcut(duplicates="drop") implementation
+    df = pd.DataFrame({"value": [3.0] * 10 + [np.nan]})
+    breaks_values = get_df_breaks_values(df, "value", intervals)
+    assert breaks_values.tolist() == expected
+
+
+def test_breaks_to_colors_values_above_last_break():
+    colors = breaks_to_colors(
+        [0, 1, 2, 3], np.array([1, 2]), np.array([[1, 1, 1], [2, 2, 2]]),
+        alpha=128,
+    )
+    assert colors.tolist() == [
+        [1, 1, 1, 128],
+        [1, 1, 1, 128],
+        [2, 2, 2, 128],
+        NULL_COLOR_RGB + [128],
+    ]
+
+
+def test_categories_to_colors(df):
+    colors = categories_to_colors(
+        df["category"],
+        ["a", "b"],
+        np.array([[1, 1, 1], [2, 2, 2]]),
+        null_color=[0, 0, 0, 0],
+    )
+    assert colors.tolist() == [
+        [1, 1, 1, 255],
+        [2, 2, 2, 255],
+        [1, 1, 1, 255],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+        [2, 2, 2, 255],
+    ]
+
+
+def test_category_color_intervals_as_colors(df):
+    colors, _ = category_color_intervals(
+        df, "category", "pastel", as_colors=True
+    )
+    palette = get_rgb_palette("pastel")
+    codes = pd.Index(df["category"].unique()).get_indexer(df["category"])
+    assert colors[:, :3].tolist() == palette[codes].tolist()
+
+
+def test_assign_color_column(df):
+    colors = categories_to_colors(
+        df["category"], ["a"], np.array([[1, 1, 1]])
+    )
+    colored = assign_color_column(df, colors)
+    assert "color" not in df
+    assert colored["color"].iloc[0] == [1, 1, 1, 255]